@@ -0,0 +1,66 @@
+"""
+Benchmark the rendering of a synthetic Examples table.
+
+Usage: python -m benchmarks.bench_table [--rows 100000] [--columns 30]
+
+Unlike the suite, which times the same table as its synthetic_table_100k corpus,
+this also measures the peak memory of the generation.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from reformat_gherkin.formatter import LineGenerator
+from reformat_gherkin.options import AlignmentMode, TagLineMode
+from reformat_gherkin.parser import parse
+
+from .corpora import make_table_document
+
+
+def bench_table(n_rows: int, n_columns: int) -> dict:
+    document = make_table_document(n_rows, n_columns)
+
+    start = time.perf_counter()
+    ast = parse(document)
+    parse_seconds = time.perf_counter() - start
+
+    def generate() -> int:
+        line_generator = LineGenerator(
+            ast, AlignmentMode.NONE, TagLineMode.SINGLELINE, "  "
+        )
+        return sum(1 for _ in line_generator.generate())
+
+    start = time.perf_counter()
+    n_lines = generate()
+    generate_seconds = time.perf_counter() - start
+
+    # Memory is measured in a separate run, since tracing slows down the generation
+    tracemalloc.start()
+    generate()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "benchmark": "table",
+        "rows": n_rows,
+        "columns": n_columns,
+        "lines": n_lines,
+        "parse_seconds": round(parse_seconds, 4),
+        "generate_seconds": round(generate_seconds, 4),
+        "generate_peak_memory_bytes": peak_memory,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--columns", type=int, default=30)
+    args = parser.parse_args()
+
+    print(json.dumps(bench_table(args.rows, args.columns)))
+
+
+if __name__ == "__main__":
+    main()
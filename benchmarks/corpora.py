@@ -0,0 +1,144 @@
+"""
+The corpora of the benchmarks. A corpus is a list of documents, which are kept as
+bytes so that decoding them can be measured too.
+"""
+
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from attr import dataclass
+
+from .generator import CorpusConfig, generate_corpus, make_table_document
+
+TEST_DIR = Path(__file__).resolve().parent.parent / "tests"
+
+
+@dataclass(frozen=True)
+class Corpus:
+    name: str
+    # The names and the contents of the documents
+    documents: List[Tuple[str, bytes]]
+
+    @property
+    def size(self) -> int:
+        return sum(len(content) for _, content in self.documents)
+
+    @property
+    def line_count(self) -> int:
+        return sum(content.count(b"\n") + 1 for _, content in self.documents)
+
+
+def read_corpus(name: str, paths: List[Path]) -> Corpus:
+    return Corpus(name, [(path.name, path.read_bytes()) for path in sorted(paths)])
+
+
+def load_gherkin_test_data(scale: int) -> Corpus:
+    return read_corpus(
+        "gherkin_test_data", list((TEST_DIR / "gherkin_test_data").glob("*.feature"))
+    )
+
+
+def load_valid_data(scale: int) -> Corpus:
+    return read_corpus(
+        "valid_data", list((TEST_DIR / "data" / "valid").glob("*/input.feature"))
+    )
+
+
+def load_large_file(scale: int) -> Corpus:
+    return read_corpus(
+        "large_file", [TEST_DIR / "data" / "valid" / "large_file" / "input.feature"]
+    )
+
+
+def make_scenarios_document(n_scenarios: int) -> str:
+    """
+    Make a document with many short scenarios, with tags, comments, data tables,
+    doc strings, and examples.
+    """
+    lines = ["Feature: Many scenarios", "", "  Background:", "    Given a user", ""]
+    for index in range(n_scenarios):
+        lines.extend(
+            [
+                f"  # Scenario number {index}",
+                f"  @tag{index % 7} @slow",
+                f"  Scenario Outline: Scenario {index}",
+                "    Given a value of <value>",
+                "      | name | value |",
+                f"      | x{index} | {index * 31 % 997} |",
+                f"    When the value is doubled {index % 5} times",
+                '      """',
+                f"      Some text for {index}",
+                '      """',
+                "    Then the result is <result>",
+                "",
+                "    Examples:",
+                "      | value | result |",
+                f"      | {index} | {index * 2} |",
+                f"      | {index + 1} | {index * 2 + 2} |",
+                "",
+            ]
+        )
+
+    return "\n".join(lines)
+
+
+def make_synthetic_scenarios(scale: int) -> Corpus:
+    content = make_scenarios_document(1000 * scale)
+
+    return Corpus("synthetic_scenarios", [("scenarios.feature", content.encode())])
+
+
+def make_synthetic_table(scale: int) -> Corpus:
+    content = make_table_document(5000 * scale, 20)
+
+    return Corpus("synthetic_table", [("table.feature", content.encode())])
+
+
+def make_synthetic_table_100k(scale: int) -> Corpus:
+    # A fixed size, to track the rendering of tables at the size they were tuned for
+    content = make_table_document(100_000, 30)
+
+    return Corpus("synthetic_table_100k", [("table.feature", content.encode())])
+
+
+def make_generated(scale: int) -> Corpus:
+    config = CorpusConfig(seed=0, files=50 * scale)
+
+    return Corpus(
+        "generated",
+        [(path, content.encode()) for path, content in generate_corpus(config)],
+    )
+
+
+def make_stress(scale: int) -> Corpus:
+    # A tenth of the default sizes of the generator, so that the suite runs in a
+    # reasonable time
+    config = CorpusConfig(
+        files=0,
+        stress=True,
+        table_rows=10_000 * scale,
+        comment_lines=1_000 * scale,
+        doc_string_bytes=400_000 * scale,
+        rules=100 * scale,
+    )
+
+    return Corpus(
+        "stress",
+        [(path, content.encode()) for path, content in generate_corpus(config)],
+    )
+
+
+CORPORA: Dict[str, Callable[[int], Corpus]] = {
+    "gherkin_test_data": load_gherkin_test_data,
+    "valid_data": load_valid_data,
+    "large_file": load_large_file,
+    "synthetic_scenarios": make_synthetic_scenarios,
+    "synthetic_table": make_synthetic_table,
+    "generated": make_generated,
+    "stress": make_stress,
+    "synthetic_table_100k": make_synthetic_table_100k,
+}
+
+# The corpora which are too large to be run by default, and must be selected with
+# --corpus
+OPT_IN_CORPORA = {"synthetic_table_100k"}
@@ -0,0 +1,467 @@
+"""
+Generate a deterministic corpus of synthetic feature files, for benchmarks and
+stress tests. The same seed and parameters always produce the same files.
+
+Usage: python -m benchmarks.generator OUTPUT_DIR [--seed 0] [--files 100]
+                                      [--scenarios 20] [--distribution lognormal]
+                                      [--mix NAME=WEIGHT]... [--language CODE]...
+                                      [--stress]
+"""
+
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import attr
+from attr import dataclass
+from gherkin.dialect import Dialect
+
+# The dialects used for the documents which are not in English, with various
+# scripts and keywords with and without trailing spaces
+DEFAULT_LANGUAGES = ("fr", "de", "es", "ru", "ja", "zh-CN", "ar", "vi", "uk", "em")
+
+DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+WORDS = (
+    "account admin amount basket button café cart checkout client date discount "
+    "email error form invoice item login naïve order page password payment price "
+    "product profile report search session Straße total user value 東京 数据 данные "
+    "résumé 😀"
+).split()
+
+
+@dataclass(frozen=True)
+class FeatureMix:
+    """
+    The probabilities of the optional parts of the generated documents.
+    """
+
+    # Per document
+    background: float = 0.4
+    rule: float = 0.15
+    description: float = 0.5
+    non_english: float = 0.2
+    # Per scenario
+    outline: float = 0.3
+    tags: float = 0.5
+    comment: float = 0.3
+    # Per step
+    data_table: float = 0.15
+    doc_string: float = 0.05
+
+
+@dataclass(frozen=True)
+class CorpusConfig:
+    seed: int = 0
+    files: int = 100
+    # The mean number of scenarios in a file
+    scenarios: int = 20
+    # How the number of scenarios varies between files, see DISTRIBUTIONS
+    distribution: str = "lognormal"
+    mix: FeatureMix = FeatureMix()
+    languages: Tuple[str, ...] = DEFAULT_LANGUAGES
+    # If True, add one file of each kind of extreme input
+    stress: bool = False
+    table_rows: int = 100_000
+    comment_lines: int = 10_000
+    doc_string_bytes: int = 4_000_000
+    rules: int = 1_000
+
+
+@dataclass(frozen=True)
+class Keywords:
+    """
+    The keywords of a dialect, and the header line which selects it.
+    """
+
+    header: Optional[str]
+    feature: str
+    background: str
+    rule: str
+    scenario: str
+    scenario_outline: str
+    examples: str
+    steps: Tuple[str, str, str, str]
+
+    @classmethod
+    def for_language(cls, language: str) -> "Keywords":
+        dialect = Dialect.for_name(language)
+
+        def step_keyword(keywords: List[str]) -> str:
+            # "* " is a keyword of every dialect
+            return next(keyword for keyword in keywords if keyword != "* ")
+
+        return cls(
+            header=None if language == "en" else f"# language: {language}",
+            feature=dialect.feature_keywords[0],
+            background=dialect.background_keywords[0],
+            rule=dialect.rule_keywords[0],
+            scenario=dialect.scenario_keywords[0],
+            scenario_outline=dialect.scenario_outline_keywords[0],
+            examples=dialect.examples_keywords[0],
+            steps=(
+                step_keyword(dialect.given_keywords),
+                step_keyword(dialect.when_keywords),
+                step_keyword(dialect.then_keywords),
+                step_keyword(dialect.and_keywords),
+            ),
+        )
+
+
+def words(rng: random.Random, count: int) -> str:
+    # Lines starting with a keyword, a tag, or a comment would change the meaning of
+    # a description, so every text starts with a lowercase word.
+    return " ".join(["the", *rng.choices(WORDS, k=count)])
+
+
+def make_table(rng: random.Random, indent: str, rows: int, columns: int) -> List[str]:
+    lines = []
+    for _ in range(rows):
+        cells = []
+        for _ in range(columns):
+            cell = rng.choice(WORDS) * rng.randint(1, 3)
+            if rng.random() < 0.05:
+                cell += " \\| escaped"
+            cells.append(cell)
+        lines.append(f"{indent}| {' | '.join(cells)} |")
+
+    return lines
+
+
+def make_doc_string(rng: random.Random, indent: str, lines: int) -> List[str]:
+    delimiter = rng.choice(['"""', "```"])
+
+    return [
+        f"{indent}{delimiter}",
+        *(f"{indent}  {words(rng, rng.randint(0, 8))}" for _ in range(lines)),
+        f"{indent}{delimiter}",
+    ]
+
+
+def make_steps(
+    rng: random.Random,
+    mix: FeatureMix,
+    keywords: Keywords,
+    indent: str,
+    placeholders: Sequence[str] = (),
+) -> List[str]:
+    lines = []
+    for index in range(rng.randint(1, 6)):
+        keyword = keywords.steps[min(index, 3)]
+        text = words(rng, rng.randint(1, 8))
+        if placeholders:
+            text += f" <{rng.choice(placeholders)}>"
+        lines.append(f"{indent}{keyword}{text}")
+
+        if rng.random() < mix.data_table:
+            lines.extend(
+                make_table(rng, indent + "  ", rng.randint(1, 8), rng.randint(1, 5))
+            )
+        elif rng.random() < mix.doc_string:
+            lines.extend(make_doc_string(rng, indent + "  ", rng.randint(1, 10)))
+
+    return lines
+
+
+def make_scenario(
+    rng: random.Random, mix: FeatureMix, keywords: Keywords, indent: str
+) -> List[str]:
+    lines: List[str] = []
+    if rng.random() < mix.comment:
+        lines.extend(
+            f"{indent}# {words(rng, rng.randint(0, 6))}"
+            for _ in range(rng.randint(1, 3))
+        )
+    if rng.random() < mix.tags:
+        tags = rng.sample(["@smoke", "@slow", "@wip", "@api", "@ui", "@i18n"], 2)
+        lines.append(indent + " ".join(tags))
+
+    if rng.random() < mix.outline:
+        placeholders = [f"p{index}" for index in range(rng.randint(1, 4))]
+        lines.append(f"{indent}{keywords.scenario_outline}: {words(rng, 3)}")
+        lines.extend(make_steps(rng, mix, keywords, indent + "  ", placeholders))
+        lines.extend(["", f"{indent}  {keywords.examples}:"])
+        lines.append(f"{indent}    | {' | '.join(placeholders)} |")
+        lines.extend(
+            make_table(rng, indent + "    ", rng.randint(1, 10), len(placeholders))
+        )
+    else:
+        lines.append(f"{indent}{keywords.scenario}: {words(rng, 3)}")
+        lines.extend(make_steps(rng, mix, keywords, indent + "  "))
+
+    lines.append("")
+
+    return lines
+
+
+def make_background(
+    rng: random.Random, mix: FeatureMix, keywords: Keywords, indent: str
+) -> List[str]:
+    return [
+        f"{indent}{keywords.background}:",
+        *make_steps(rng, mix, keywords, indent + "  "),
+        "",
+    ]
+
+
+def make_document(rng: random.Random, config: CorpusConfig, n_scenarios: int) -> str:
+    """
+    Make a document with `n_scenarios` scenarios, and the parts chosen according
+    to the mix of the configuration.
+    """
+    mix = config.mix
+    language = "en"
+    if config.languages and rng.random() < mix.non_english:
+        language = rng.choice(config.languages)
+    keywords = Keywords.for_language(language)
+
+    lines = [] if keywords.header is None else [keywords.header]
+    if rng.random() < mix.tags:
+        lines.append("@feature")
+    lines.append(f"{keywords.feature}: {words(rng, 4)}")
+    if rng.random() < mix.description:
+        lines.extend(f"  {words(rng, 10)}" for _ in range(rng.randint(1, 3)))
+    lines.append("")
+
+    if rng.random() < mix.background:
+        lines.extend(make_background(rng, mix, keywords, "  "))
+
+    n_rules = rng.randint(1, 4) if rng.random() < mix.rule else 0
+    for rule_index in range(n_rules):
+        lines.extend([f"  {keywords.rule}: {words(rng, 3)}", ""])
+        if rng.random() < mix.background:
+            lines.extend(make_background(rng, mix, keywords, "    "))
+        for _ in range(n_scenarios // n_rules + (rule_index < n_scenarios % n_rules)):
+            lines.extend(make_scenario(rng, mix, keywords, "    "))
+
+    if not n_rules:
+        for _ in range(n_scenarios):
+            lines.extend(make_scenario(rng, mix, keywords, "  "))
+
+    return "\n".join(lines)
+
+
+def get_scenario_count(rng: random.Random, config: CorpusConfig) -> int:
+    mean = config.scenarios
+    if config.distribution == "fixed":
+        return mean
+    if config.distribution == "uniform":
+        return rng.randint(0, 2 * mean)
+    if config.distribution == "lognormal":
+        # A few files are much larger than the others, like in real projects
+        return min(round(rng.lognormvariate(0, 1) * mean / 1.65), 50 * mean)
+
+    raise ValueError(f"Unknown distribution: {config.distribution}")
+
+
+def make_table_document(n_rows: int, n_columns: int) -> str:
+    """
+    Make a document with a single large Examples table.
+    """
+    header = " | ".join(f"column {column}" for column in range(n_columns))
+    rows = [
+        " | ".join(f"value {row * 7 % 1000}.{column}" for column in range(n_columns))
+        for row in range(n_rows)
+    ]
+
+    return "\n".join(
+        [
+            "Feature: A large table",
+            "  Scenario Outline: Each row",
+            "    Given the <column 0>",
+            "",
+            "    Examples:",
+            f"      | {header} |",
+            *(f"      |{row}|" for row in rows),
+            "",
+        ]
+    )
+
+
+def make_comments_document(n_comments: int) -> str:
+    """
+    Make a document with a long run of consecutive comments between two scenarios.
+    """
+    return "\n".join(
+        [
+            "Feature: Many comments",
+            "  Scenario: Before",
+            "    Given a step",
+            "",
+            *(f"  # Comment {index}" for index in range(n_comments)),
+            "  Scenario: After",
+            "    Given a step",
+            "",
+        ]
+    )
+
+
+def make_doc_string_document(n_bytes: int) -> str:
+    """
+    Make a document with a doc string of about `n_bytes` bytes.
+    """
+    line = "      " + "lorem ipsum dolor sit amet " * 3
+    n_lines = max(n_bytes // (len(line) + 1), 1)
+
+    return "\n".join(
+        [
+            "Feature: A large doc string",
+            "  Scenario: Read",
+            "    Given the text",
+            '      """',
+            *(line for _ in range(n_lines)),
+            '      """',
+            "",
+        ]
+    )
+
+
+def make_rules_document(n_rules: int) -> str:
+    """
+    Make a document with many rules, each with a background and a few scenarios.
+    Rules cannot be nested in Gherkin, so this is the deepest structure there is.
+    """
+    lines = ["Feature: Many rules", "", "  Background:", "    Given a user", ""]
+    for index in range(n_rules):
+        lines.extend(
+            [
+                f"  @rule{index}",
+                f"  Rule: Rule {index}",
+                "",
+                "    Background:",
+                f"      Given the rule {index}",
+                "",
+                *(
+                    line
+                    for scenario in range(3)
+                    for line in [
+                        f"    Scenario: Scenario {index}.{scenario}",
+                        "      When something happens",
+                        "      Then it is checked",
+                        "",
+                    ]
+                ),
+            ]
+        )
+
+    return "\n".join(lines)
+
+
+def generate_stress_documents(config: CorpusConfig) -> Iterator[Tuple[str, str]]:
+    yield "stress/large_table.feature", make_table_document(config.table_rows, 10)
+    yield "stress/comments.feature", make_comments_document(config.comment_lines)
+    yield "stress/doc_string.feature", make_doc_string_document(config.doc_string_bytes)
+    yield "stress/rules.feature", make_rules_document(config.rules)
+
+
+def generate_corpus(config: CorpusConfig) -> Iterator[Tuple[str, str]]:
+    """
+    Generate the relative paths and the contents of the files of a corpus. Each
+    file has its own random generator, so that it does not depend on the number of
+    files.
+    """
+    for index in range(config.files):
+        rng = random.Random(f"{config.seed}-{index}")
+        path = f"area_{index % 10}/group_{index // 10 % 10}/feature_{index}.feature"
+
+        yield path, make_document(rng, config, get_scenario_count(rng, config))
+
+    if config.stress:
+        yield from generate_stress_documents(config)
+
+
+def write_corpus(config: CorpusConfig, directory: Path) -> List[Path]:
+    paths = []
+    for relative_path, content in generate_corpus(config):
+        path = directory / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+        paths.append(path)
+
+    return paths
+
+
+def parse_mix(values: Sequence[str]) -> FeatureMix:
+    weights: Dict[str, float] = {}
+    for value in values:
+        name, _, weight = value.partition("=")
+        weights[name.strip()] = float(weight)
+
+    return FeatureMix(**weights)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    defaults = CorpusConfig()
+    parser.add_argument("output", type=Path, help="Directory to write the files to.")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument(
+        "--scenarios",
+        type=int,
+        default=defaults.scenarios,
+        help="Mean number of scenarios in a file.",
+    )
+    parser.add_argument(
+        "--distribution", choices=DISTRIBUTIONS, default=defaults.distribution
+    )
+    parser.add_argument(
+        "--mix",
+        action="append",
+        default=[],
+        metavar="NAME=WEIGHT",
+        help=(
+            "Probability of a part of the documents, for example outline=0.5. "
+            f"The parts are: {', '.join(attr.fields_dict(FeatureMix))}."
+        ),
+    )
+    parser.add_argument(
+        "--language",
+        action="append",
+        help="Dialect of the documents which are not in English. [default: various]",
+    )
+    parser.add_argument(
+        "--stress",
+        action="store_true",
+        help="Also write a file with each kind of extreme input.",
+    )
+    parser.add_argument("--table-rows", type=int, default=defaults.table_rows)
+    parser.add_argument("--comment-lines", type=int, default=defaults.comment_lines)
+    parser.add_argument(
+        "--doc-string-bytes", type=int, default=defaults.doc_string_bytes
+    )
+    parser.add_argument("--rules", type=int, default=defaults.rules)
+    args = parser.parse_args(argv)
+
+    config = CorpusConfig(
+        seed=args.seed,
+        files=args.files,
+        scenarios=args.scenarios,
+        distribution=args.distribution,
+        mix=parse_mix(args.mix),
+        languages=tuple(args.language) if args.language else DEFAULT_LANGUAGES,
+        stress=args.stress,
+        table_rows=args.table_rows,
+        comment_lines=args.comment_lines,
+        doc_string_bytes=args.doc_string_bytes,
+        rules=args.rules,
+    )
+    paths = write_corpus(config, args.output)
+
+    print(
+        json.dumps(
+            {
+                "files": len(paths),
+                "bytes": sum(path.stat().st_size for path in paths),
+                "config": attr.asdict(config),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
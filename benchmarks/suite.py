@@ -0,0 +1,299 @@
+"""
+Time each phase of the reformatting pipeline over several corpora, and print the
+results as JSON, so that they can be compared across commits.
+
+Usage: python -m benchmarks [--corpus NAME]... [--phase NAME]... [--repeat 5]
+                            [--scale 1] [--output FILE]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from gherkin.parser import Parser
+
+from reformat_gherkin import core
+from reformat_gherkin.ast_node import GherkinDocument
+from reformat_gherkin.core import assert_equivalent, assert_stable, format_ast, reformat
+from reformat_gherkin.formatter import LineGenerator
+from reformat_gherkin.options import (
+    AlignmentMode,
+    NewlineMode,
+    Options,
+    TagLineMode,
+    WriteBackMode,
+)
+from reformat_gherkin.parser import (
+    StringOnlyTokenScanner,
+    build_document,
+    converter,
+    parse,
+)
+from reformat_gherkin.report import Report
+from reformat_gherkin.utils import decode_stream
+from reformat_gherkin.version import __version__
+
+from .corpora import CORPORA, OPT_IN_CORPORA, Corpus
+
+OPTIONS = Options(
+    write_back=WriteBackMode.CHECK,
+    step_keyword_alignment=AlignmentMode.NONE,
+    newline=NewlineMode.KEEP,
+    fast=False,
+    tag_line_mode=TagLineMode.SINGLELINE,
+    indent="  ",
+)
+
+# A phase prepares its inputs from the documents of a corpus, which is not timed,
+# and returns the function to time.
+Phase = Callable[[Corpus], Callable[[], Any]]
+
+
+def get_contents(corpus: Corpus) -> List[str]:
+    """
+    Get the decoded documents of a corpus, except the blank ones, which are not
+    parsed when reformatting.
+    """
+    contents = [
+        decode_stream(io.BytesIO(content))[0] for _, content in corpus.documents
+    ]
+
+    return [content for content in contents if content.strip()]
+
+
+def get_asts(corpus: Corpus) -> List[GherkinDocument]:
+    return [parse(content) for content in get_contents(corpus)]
+
+
+def phase_decode_stream(corpus: Corpus) -> Callable[[], Any]:
+    documents = [content for _, content in corpus.documents]
+
+    return lambda: [decode_stream(io.BytesIO(content)) for content in documents]
+
+
+def phase_gherkin_parse(corpus: Corpus) -> Callable[[], Any]:
+    contents = get_contents(corpus)
+
+    return lambda: [
+        Parser().parse(StringOnlyTokenScanner(content)) for content in contents
+    ]
+
+
+def get_parse_results(corpus: Corpus) -> List[Dict[str, Any]]:
+    return [
+        Parser().parse(StringOnlyTokenScanner(content))
+        for content in get_contents(corpus)
+    ]
+
+
+def phase_structure(corpus: Corpus) -> Callable[[], Any]:
+    results = get_parse_results(corpus)
+
+    return lambda: [build_document(result) for result in results]
+
+
+def phase_structure_cattrs(corpus: Corpus) -> Callable[[], Any]:
+    results = get_parse_results(corpus)
+
+    return lambda: [converter.structure(result, GherkinDocument) for result in results]
+
+
+def phase_line_generator(corpus: Corpus) -> Callable[[], Any]:
+    asts = get_asts(corpus)
+
+    return lambda: [LineGenerator.from_options(ast, OPTIONS) for ast in asts]
+
+
+def phase_generate(corpus: Corpus) -> Callable[[], Any]:
+    line_generators = [
+        LineGenerator.from_options(ast, OPTIONS) for ast in get_asts(corpus)
+    ]
+
+    return lambda: [
+        list(line_generator.generate()) for line_generator in line_generators
+    ]
+
+
+def phase_assert_equivalent(corpus: Corpus) -> Callable[[], Any]:
+    pairs = [
+        (content, dst, ast, parse(dst))
+        for content, ast in zip(get_contents(corpus), get_asts(corpus))
+        for dst in [format_ast(ast, options=OPTIONS)]
+    ]
+
+    def run() -> None:
+        for src, dst, src_ast, dst_ast in pairs:
+            assert_equivalent(src, dst, src_ast=src_ast, dst_ast=dst_ast)
+
+    return run
+
+
+def phase_assert_stable(corpus: Corpus) -> Callable[[], Any]:
+    pairs = [
+        (content, dst, parse(dst))
+        for content, ast in zip(get_contents(corpus), get_asts(corpus))
+        for dst in [format_ast(ast, options=OPTIONS)]
+    ]
+
+    def run() -> None:
+        # The contents which are known to be stable are not checked again
+        core._stable_digests.clear()
+        for src, dst, dst_ast in pairs:
+            assert_stable(src, dst, options=OPTIONS, dst_ast=dst_ast)
+
+    return run
+
+
+def phase_reformat(corpus: Corpus) -> Callable[[], Any]:
+    # The directory is removed when the returned function is garbage collected
+    directory = tempfile.TemporaryDirectory(prefix="reformat-gherkin-bench-")
+    names = []
+    for index, (name, content) in enumerate(corpus.documents):
+        names.append(f"{index}_{Path(name).name}")
+        (Path(directory.name) / names[-1]).write_bytes(content)
+
+    def run() -> Report:
+        core._stable_digests.clear()
+        paths = tuple(str(Path(directory.name) / name) for name in names)
+        report = Report(check=True)
+        with contextlib.redirect_stderr(io.StringIO()):
+            reformat(paths, report, options=OPTIONS, workers=1)
+
+        return report
+
+    return run
+
+
+PHASES: Dict[str, Phase] = {
+    "decode_stream": phase_decode_stream,
+    "gherkin_parse": phase_gherkin_parse,
+    "structure": phase_structure,
+    "structure_cattrs": phase_structure_cattrs,
+    "line_generator": phase_line_generator,
+    "generate": phase_generate,
+    "assert_equivalent": phase_assert_equivalent,
+    "assert_stable": phase_assert_stable,
+    "reformat": phase_reformat,
+}
+
+
+def time_phase(run: Callable[[], Any], repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def get_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    return result.stdout.strip()
+
+
+def run_benchmarks(
+    corpus_names: Sequence[str],
+    phase_names: Sequence[str],
+    *,
+    repeat: int,
+    scale: int,
+) -> Dict[str, Any]:
+    results = []
+    for corpus_name in corpus_names:
+        corpus = CORPORA[corpus_name](scale)
+        for phase_name in phase_names:
+            timings = time_phase(PHASES[phase_name](corpus), repeat)
+            results.append(
+                {
+                    "corpus": corpus.name,
+                    "phase": phase_name,
+                    "documents": len(corpus.documents),
+                    "bytes": corpus.size,
+                    "lines": corpus.line_count,
+                    "min_seconds": round(min(timings), 6),
+                    "median_seconds": round(statistics.median(timings), 6),
+                }
+            )
+
+    return {
+        "version": __version__,
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "scale": scale,
+        "results": results,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        choices=list(CORPORA),
+        help=(
+            "Corpus to benchmark. Can be given multiple times. "
+            "[default: all except synthetic_table_100k]"
+        ),
+    )
+    parser.add_argument(
+        "--phase",
+        action="append",
+        choices=list(PHASES),
+        help="Phase to benchmark. Can be given multiple times. [default: all]",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of timed runs of each phase. [default: 5]",
+    )
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=1,
+        help=(
+            "Multiply the size of the synthetic corpora, except "
+            "synthetic_table_100k. [default: 1]"
+        ),
+    )
+    parser.add_argument(
+        "--output", type=Path, help="Write the results to OUTPUT instead of stdout."
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.corpus or [name for name in CORPORA if name not in OPT_IN_CORPORA],
+        args.phase or list(PHASES),
+        repeat=args.repeat,
+        scale=args.scale,
+    )
+
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
@@ -0,0 +1,148 @@
+from http import HTTPStatus
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from .daemon import InvalidHeader, parse_options, reformat_request_body
+from .errors import BaseError
+from .options import Options
+from .report import Report
+
+# The headers of a frame, in addition to the option headers of the daemon
+CONTENT_LENGTH_HEADER = "Content-Length"
+FILENAME_HEADER = "X-Filename"
+STATUS_HEADER = "X-Status"
+
+# The maximum length of a header line, so that a stream which is not framed
+# is not read whole into memory
+MAX_HEADER_LINE = 65536
+
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+ERROR = "error"
+
+STATUS_FROM_HTTP_STATUS = {
+    HTTPStatus.OK: CHANGED,
+    HTTPStatus.NO_CONTENT: UNCHANGED,
+}
+
+
+class InvalidFrame(BaseError):
+    """
+    Raised when the input of a batch cannot be split into documents.
+    """
+
+
+def reformat_batch(
+    src: BinaryIO,
+    dst: BinaryIO,
+    report: Report,
+    *,
+    options: Options,
+) -> None:
+    """
+    Reformat each document framed in `src`, and write a frame with the status
+    and the result of each one to `dst`, in the same order.
+
+    A frame is a block of `Name: value` header lines ended by an empty line,
+    followed by a body of Content-Length bytes. The documents can set the same
+    option headers as the requests to the daemon, and the options which are not
+    set are taken from `options`. The X-Filename header, if given, is repeated
+    in the result, and used in the report.
+
+    The body of a result is the reformatted document if its X-Status is
+    "changed", the error if it is "error", and empty if it is "unchanged".
+    """
+    while True:
+        headers = read_headers(src)
+        if headers is None:
+            return
+
+        body = read_body(src, headers)
+        name = headers.get(FILENAME_HEADER, "stdin")
+        status, result = reformat_frame(headers, body, options)
+
+        if status == ERROR:
+            report.failed(Path(name), result.decode("utf-8", "replace"))
+        else:
+            report.done(name, status == CHANGED)
+
+        response_headers = {STATUS_HEADER: status}
+        if FILENAME_HEADER in headers:
+            response_headers[FILENAME_HEADER] = headers[FILENAME_HEADER]
+        write_frame(dst, response_headers, result)
+
+
+def read_headers(src: BinaryIO) -> Optional[Dict[str, str]]:
+    """
+    Read the headers of a frame, or return None at the end of the input. The
+    names of the headers are case-insensitive.
+    """
+    headers: Dict[str, str] = {}
+    while True:
+        line = src.readline(MAX_HEADER_LINE)
+        if not line:
+            if headers:
+                raise InvalidFrame("Unexpected end of input in the headers.")
+            return None
+
+        if not line.endswith(b"\n"):
+            raise InvalidFrame("Header line too long.")
+
+        line = line.rstrip(b"\r\n")
+        if not line:
+            return headers
+
+        try:
+            name, sep, value = line.decode("utf-8").partition(":")
+        except UnicodeDecodeError as e:
+            raise InvalidFrame(f"Cannot decode a header line: {e}") from e
+
+        if not sep:
+            raise InvalidFrame(f"Invalid header line: {line!r}")
+
+        headers[name.strip().title()] = value.strip()
+
+
+def read_body(src: BinaryIO, headers: Dict[str, str]) -> bytes:
+    try:
+        content_length = int(headers[CONTENT_LENGTH_HEADER])
+    except (KeyError, ValueError):
+        raise InvalidFrame(
+            f"Missing or invalid {CONTENT_LENGTH_HEADER} header."
+        ) from None
+
+    if content_length < 0:
+        raise InvalidFrame(f"Invalid {CONTENT_LENGTH_HEADER}: {content_length}")
+
+    body = src.read(content_length)
+    if len(body) != content_length:
+        raise InvalidFrame("Unexpected end of input in a document.")
+
+    return body
+
+
+def reformat_frame(
+    headers: Dict[str, str], body: bytes, options: Options
+) -> Tuple[str, bytes]:
+    """
+    Reformat the body of a frame, like the daemon reformats the body of a
+    request, and return the status and the result.
+    """
+    try:
+        document_options = parse_options(headers, defaults=options)
+    except InvalidHeader as e:
+        return ERROR, str(e).encode()
+
+    http_status, result = reformat_request_body(body, document_options)
+
+    return STATUS_FROM_HTTP_STATUS.get(http_status, ERROR), result
+
+
+def write_frame(dst: BinaryIO, headers: Dict[str, str], body: bytes) -> None:
+    lines = [f"{name}: {value}\n" for name, value in headers.items()]
+    lines.append(f"{CONTENT_LENGTH_HEADER}: {len(body)}\n\n")
+
+    dst.write("".join(lines).encode())
+    dst.write(body)
+    # The client may wait for the result before sending the next document
+    dst.flush()
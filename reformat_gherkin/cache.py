@@ -0,0 +1,189 @@
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Mapping, Optional, Set, Tuple
+
+import attr
+from attr import attrib, dataclass
+
+from .options import Options
+from .version import __version__
+
+CACHE_DIR_ENV = "REFORMAT_GHERKIN_CACHE_DIR"
+
+# These options don't affect the reformatted contents of a file
+CACHE_INSENSITIVE_OPTIONS = frozenset(["write_back", "fast"])
+
+
+def get_cache_dir() -> Path:
+    """
+    Get the user-level cache directory. The directory can be overridden with the
+    REFORMAT_GHERKIN_CACHE_DIR environment variable.
+
+    The directory is specific to the version of reformat-gherkin, so that files
+    formatted by another version are not skipped.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        base = Path(cache_dir)
+    elif sys.platform == "win32":  # pragma: no cover
+        local_app_data = os.environ.get("LOCALAPPDATA")
+        base = Path(local_app_data) if local_app_data else Path.home() / "AppData/Local"
+        base = base / "reformat-gherkin" / "Cache"
+    elif sys.platform == "darwin":  # pragma: no cover
+        base = Path.home() / "Library" / "Caches" / "reformat-gherkin"
+    else:
+        xdg_cache_home = os.environ.get("XDG_CACHE_HOME")
+        base = Path(xdg_cache_home) if xdg_cache_home else Path.home() / ".cache"
+        base = base / "reformat-gherkin"
+
+    return base / __version__
+
+
+def get_cache_key(options: Options) -> str:
+    """
+    Return a fingerprint of the options which affect the reformatted contents.
+    """
+    fingerprint = repr(
+        (
+            __version__,
+            attr.astuple(
+                options,
+                filter=lambda a, _: a.name not in CACHE_INSENSITIVE_OPTIONS,
+                retain_collection_types=True,
+            ),
+        )
+    )
+
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def get_file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@dataclass(frozen=True)
+class FileData:
+    st_mtime: float
+    st_size: int
+    hash: str
+
+    @classmethod
+    def from_path(cls, path: Path) -> "FileData":
+        stat = path.stat()
+        return cls(stat.st_mtime, stat.st_size, get_file_hash(path))
+
+    @classmethod
+    def from_contents(cls, stat: os.stat_result, contents: bytes) -> "FileData":
+        """
+        Make the data of a file from its contents, and its status taken before
+        they were read.
+        """
+        return cls(stat.st_mtime, stat.st_size, hashlib.sha256(contents).hexdigest())
+
+
+@dataclass
+class Cache:
+    """
+    A persistent record of the files which are known to be formatted with a given
+    set of options.
+
+    Several processes can use the same cache at once: the cache file is replaced
+    atomically, so it is never read half-written, and the entries written by other
+    processes since it was read are merged before writing. The cache file is not
+    locked, so the entries written by another process between this merge and the
+    replacement are lost, and their files are only reformatted again.
+    """
+
+    cache_file: Path
+    file_data: Dict[str, FileData] = attrib(factory=dict)
+
+    @classmethod
+    def read(cls, options: Options, cache_dir: Optional[Path] = None) -> "Cache":
+        if cache_dir is None:
+            cache_dir = get_cache_dir()
+
+        cache_file = cache_dir / f"cache.{get_cache_key(options)}.pickle"
+
+        return cls(cache_file, _read_cache_file(cache_file))
+
+    def is_changed(self, path: Path) -> bool:
+        """
+        Check if a file has been changed since it was last recorded in the cache.
+
+        A file whose modification time changed, but whose contents did not, is
+        considered unchanged. Its new modification time is recorded, so that its
+        contents don't have to be hashed again.
+        """
+        old_data = self.file_data.get(str(path))
+        if old_data is None:
+            return True
+
+        stat = path.stat()
+        if stat.st_size != old_data.st_size:
+            return True
+
+        if stat.st_mtime != old_data.st_mtime:
+            file_hash = get_file_hash(path)
+            if file_hash != old_data.hash:
+                return True
+
+            self.file_data[str(path)] = FileData(stat.st_mtime, stat.st_size, file_hash)
+
+        return False
+
+    def filtered_cached(self, paths: Iterable[Path]) -> Tuple[Set[Path], Set[Path]]:
+        """
+        Split an iterable of paths into two sets: the paths which need to be
+        reformatted, and the paths which are known to be formatted.
+        """
+        changed: Set[Path] = set()
+        done: Set[Path] = set()
+
+        for path in paths:
+            if self.is_changed(path):
+                changed.add(path)
+            else:
+                done.add(path)
+
+        return changed, done
+
+    def write(self, formatted: Mapping[Path, FileData]) -> None:
+        """
+        Record the given files as formatted, and write the cache to disk. The data
+        of the files are taken when they are reformatted, instead of here, so that
+        a file which is changed in the meantime is not recorded as formatted.
+        """
+        file_data = _read_cache_file(self.cache_file)
+        file_data.update(self.file_data)
+        file_data.update((str(path), data) for path, data in formatted.items())
+        self.file_data = file_data
+
+        import tempfile
+
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(
+                dir=str(self.cache_file.parent),
+                prefix=self.cache_file.name,
+                delete=False,
+            ) as f:
+                pickle.dump(file_data, f, protocol=4)
+            os.replace(f.name, self.cache_file)
+        except OSError:  # pragma: no cover
+            pass
+
+
+def _read_cache_file(cache_file: Path) -> Dict[str, FileData]:
+    try:
+        with cache_file.open("rb") as f:
+            file_data = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, ValueError, EOFError, AttributeError):
+        return {}
+
+    if not isinstance(file_data, dict):
+        return {}
+
+    return file_data
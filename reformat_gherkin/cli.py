@@ -1,23 +1,38 @@
-from typing import Optional, Tuple
+import re
+import sys
+from pathlib import Path
+from typing import Optional, Pattern, Tuple
 
 import click
 
 from .config import read_config_file
-from .core import reformat
+from .discovery import DEFAULT_EXCLUDES, DEFAULT_INCLUDES, SourceFilter
 from .errors import EmptySources
 from .options import (
     AlignmentMode,
+    LineRange,
     NewlineMode,
     Options,
     TagLineMode,
     WriteBackMode,
     get_indent_from_configuration,
 )
-from .report import Report
-from .utils import out
+from .report import Report, ReportFormat
+from .utils import err, out
 from .version import __version__
 
 
+def validate_regex(
+    ctx: click.Context,
+    param: click.Parameter,
+    value: Optional[str],
+) -> Optional[Pattern[str]]:
+    try:
+        return re.compile(value) if value is not None else None
+    except re.error as e:
+        raise click.BadParameter(f"Not a valid regular expression: {e}") from None
+
+
 @click.command()
 @click.argument(
     "src",
@@ -41,6 +56,31 @@ from .version import __version__
         "reformatted. Return code 123 means there was an internal error."
     ),
 )
+@click.option(
+    "-q",
+    "--quiet",
+    is_flag=True,
+    help=(
+        "Don't write the files which are reformatted, nor the summary, to stderr. "
+        "Errors are still written."
+    ),
+)
+@click.option(
+    "-v",
+    "--verbose",
+    is_flag=True,
+    help="Also write the files which are left unchanged to stderr.",
+)
+@click.option(
+    "--report-format",
+    type=click.Choice([report_format.value for report_format in ReportFormat]),
+    default=ReportFormat.TEXT.value,
+    help=(
+        "Write the report as text, or as a JSON summary with the lists of changed, "
+        "unchanged, and failed files, their counts, and the exit code. The report "
+        "is written to stderr. [default: text]"
+    ),
+)
 @click.option(
     "-a",
     "--alignment",
@@ -99,6 +139,133 @@ from .version import __version__
     default=False,
     help="Indent lines with tabs instead of spaces.",
 )
+@click.option(
+    "--line-ranges",
+    multiple=True,
+    metavar="START-END",
+    help=(
+        "Only reformat the scenarios, backgrounds, rules, or the feature header "
+        "overlapping the given range of lines (1-based, inclusive), and keep the "
+        "other lines as they are. Can be given multiple times. Only a single file "
+        "can be reformatted with this option."
+    ),
+)
+@click.option(
+    "-W",
+    "--workers",
+    type=click.IntRange(min=1),
+    help=(
+        "Number of parallel worker processes used to reformat files. "
+        "[default: number of CPUs available]"
+    ),
+)
+@click.option(
+    "--stdin-batch",
+    is_flag=True,
+    help=(
+        "Reformat a stream of framed documents read from stdin, and write a framed "
+        "result for each one to stdout. See the README for the format."
+    ),
+)
+@click.option(
+    "--fsync",
+    is_flag=True,
+    help=(
+        "Flush the files which are reformatted in place to disk, all at once at "
+        "the end of the run, before exiting."
+    ),
+)
+@click.option(
+    "--cache/--no-cache",
+    default=True,
+    help=(
+        "If --no-cache given, don't read or write the cache of files known to be "
+        "formatted. [default: --cache]"
+    ),
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False, dir_okay=True, writable=True),
+    help=(
+        "Store the cache of formatted files in DIRECTORY. [default: the user cache "
+        "directory, or $REFORMAT_GHERKIN_CACHE_DIR if set]"
+    ),
+)
+@click.option(
+    "--changed-since",
+    metavar="REF",
+    help=(
+        "Only reformat the files which git reports as modified, added, or untracked "
+        "since the commit REF. All the files are reformatted if git cannot list "
+        "the changed files."
+    ),
+)
+@click.option(
+    "--staged",
+    is_flag=True,
+    help=(
+        "Only reformat the files with changes staged in the git index, compared "
+        "to HEAD, or to the commit given by --changed-since."
+    ),
+)
+@click.option(
+    "--include",
+    type=str,
+    metavar="REGEX",
+    default=DEFAULT_INCLUDES,
+    callback=validate_regex,
+    help=(
+        "A regular expression that matches the files to reformat in SRC folders. "
+        "The paths are relative to the project root, with a leading /. "
+        f"[default: {DEFAULT_INCLUDES}]"
+    ),
+)
+@click.option(
+    "--exclude",
+    type=str,
+    metavar="REGEX",
+    default=DEFAULT_EXCLUDES,
+    callback=validate_regex,
+    help=(
+        "A regular expression that matches the files and directories to leave "
+        "out of SRC folders, in addition to those ignored by .gitignore files. "
+        "Directories end with a /. [default: common VCS, virtual environment, "
+        "and build directories]"
+    ),
+)
+@click.option(
+    "--extend-exclude",
+    type=str,
+    metavar="REGEX",
+    callback=validate_regex,
+    help="Like --exclude, but adds to the default patterns instead of replacing them.",
+)
+@click.option(
+    "--metrics-out",
+    type=click.Path(dir_okay=False, writable=True),
+    help=(
+        "Write the time spent in each phase, the sizes, and the cache status of "
+        "each file to FILE as lines of JSON, followed by a summary of the run."
+    ),
+)
+@click.option(
+    "--trace-memory",
+    is_flag=True,
+    help=(
+        "Add the peak of the memory allocated while reformatting each file, and "
+        "the lines which allocated the most memory, to the metrics given by "
+        "--metrics-out."
+    ),
+)
+@click.option(
+    "--profile-out",
+    type=click.Path(file_okay=False, writable=True),
+    metavar="DIR",
+    help=(
+        "Profile the run with cProfile, and write the profile of the main process "
+        "and of each worker process to a .prof file in DIR."
+    ),
+)
 @click.option(
     "--config",
     type=click.Path(
@@ -118,25 +285,66 @@ def main(
     ctx: click.Context,
     src: Tuple[str],
     check: bool,
+    quiet: bool,
+    verbose: bool,
+    report_format: str,
     alignment: Optional[str],
     newline: Optional[str],
     fast: bool,
     single_line_tags: bool,
     tab_width: int,
     use_tabs: bool,
+    line_ranges: Tuple[str, ...],
+    workers: Optional[int],
+    stdin_batch: bool,
+    fsync: bool,
+    cache: bool,
+    cache_dir: Optional[str],
+    changed_since: Optional[str],
+    staged: bool,
+    include: Pattern[str],
+    exclude: Pattern[str],
+    extend_exclude: Optional[Pattern[str]],
+    metrics_out: Optional[str],
+    trace_memory: bool,
+    profile_out: Optional[str],
     config: Optional[str],
 ) -> None:
     """
     Reformat the given SRC files and all .feature files in SRC folders. If -
     is passed as a file, reformat stdin and print the result to stdout.
     """
-    if config:
+    report = Report(
+        check=check,
+        quiet=quiet,
+        verbose=verbose,
+        format=ReportFormat(report_format),
+    )
+
+    if config and report.format is ReportFormat.TEXT and (verbose or not quiet):
         out(
             f"Using configuration from {config}.",
             bold=False,
             fg="blue",
         )
 
+    if line_ranges and (len(src) > 1 or any(Path(s).is_dir() for s in src)):
+        err("Cannot use --line-ranges to reformat multiple files.")
+        ctx.exit(1)
+
+    if trace_memory and not metrics_out:
+        # The memory traces are added to the metrics records, since stderr may
+        # already carry the JSON report
+        err(
+            "Cannot use --trace-memory without --metrics-out, which the memory "
+            "traces are written to."
+        )
+        ctx.exit(1)
+
+    # Only the modules needed by the given options are imported, so that --version
+    # and the runs with nothing to reformat start fast
+    parsed_line_ranges = get_line_ranges(ctx, line_ranges)
+
     write_back_mode = WriteBackMode.from_configuration(check)
     alignment_mode = AlignmentMode.from_configuration(alignment)
     newline_mode = NewlineMode.from_configuration(newline)
@@ -150,16 +358,115 @@ def main(
         fast=fast,
         tag_line_mode=tag_line_mode,
         indent=indent,
+        line_ranges=parsed_line_ranges,
     )
 
-    report = Report(check=check)
+    if stdin_batch:
+        reformat_stdin_batch(ctx, src, report, options=options)
+
+    from .core import reformat
+
+    metrics = None
+    if metrics_out:
+        from .metrics import MetricsWriter
+
+        metrics = MetricsWriter(Path(metrics_out))
+
     try:
-        reformat(src, report, options=options)
+        reformat(
+            src,
+            report,
+            options=options,
+            workers=workers,
+            use_cache=cache,
+            cache_dir=Path(cache_dir) if cache_dir else None,
+            changed_since=changed_since,
+            staged=staged,
+            source_filter=SourceFilter(include, exclude, extend_exclude),
+            metrics=metrics,
+            trace_memory=trace_memory,
+            profile_dir=Path(profile_out) if profile_out else None,
+            fsync=fsync,
+        )
     except EmptySources:
-        out("No paths given. Nothing to do 😴")
+        write_summary(report, no_sources=True)
         ctx.exit(0)
+    finally:
+        report.flush()
+        if metrics is not None:
+            metrics.close()
+
+    write_summary(report)
+    ctx.exit(report.return_code)
+
+
+def get_line_ranges(
+    ctx: click.Context, line_ranges: Tuple[str, ...]
+) -> Tuple[LineRange, ...]:
+    """
+    Parse the values of --line-ranges, and exit if they are invalid.
+    """
+    if not line_ranges:
+        return ()
+
+    from .ranges import parse_line_ranges
+
+    try:
+        return parse_line_ranges(line_ranges)
+    except ValueError as e:
+        err(str(e))
+        ctx.exit(1)
+
+
+def reformat_stdin_batch(
+    ctx: click.Context,
+    src: Tuple[str],
+    report: Report,
+    *,
+    options: Options,
+) -> None:
+    """
+    Reformat the documents framed in stdin, write the results to stdout, and exit.
+    """
+    if src:
+        err("Cannot use --stdin-batch with SRC.")
+        ctx.exit(1)
+
+    if options.line_ranges:
+        err("Cannot use --line-ranges with --stdin-batch.")
+        ctx.exit(1)
+
+    from .batch import InvalidFrame, reformat_batch
+
+    try:
+        reformat_batch(sys.stdin.buffer, sys.stdout.buffer, report, options=options)
+    except InvalidFrame as e:
+        err(f"Invalid batch input: {e}")
+        ctx.exit(1)
+    finally:
+        report.flush()
+
+    write_summary(report)
+    ctx.exit(report.return_code)
+
+
+def write_summary(report: Report, *, no_sources: bool = False) -> None:
+    """
+    Write the summary of the report to stderr.
+    """
+    if report.format is ReportFormat.JSON:
+        import json
+
+        click.echo(json.dumps(report.to_dict()), err=True)
+        return
+
+    if report.quiet and not report.verbose:
+        return
+
+    if no_sources:
+        out("No paths given. Nothing to do 😴")
+        return
 
     bang = "💥 💔 💥" if report.return_code else "✨ 🍰 ✨"
     out(f"All done! {bang}")
     click.secho(str(report), err=True)
-    ctx.exit(report.return_code)
@@ -2,7 +2,6 @@ from pathlib import Path
 from typing import Iterable, Optional
 
 import click
-import yaml
 
 CONFIG_FILE = ".reformat-gherkin.yaml"
 SYSTEM_ROOT = Path("/").resolve()
@@ -59,6 +58,9 @@ def read_config_file(
         else:
             return None
 
+    # PyYAML is slow to import, and most projects don't have a config file
+    import yaml
+
     try:
         with open(value, "r") as f:
             config = yaml.safe_load(f)
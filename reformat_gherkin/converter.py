@@ -0,0 +1,29 @@
+from typing import Any, Dict, Type, TypeVar
+
+from cattr.converters import Converter
+
+from .parser import normalize_text
+from .utils import camel_to_snake_case
+
+T = TypeVar("T")
+
+
+class CustomConverter(Converter):
+    def structure_attrs_fromdict(self, obj: Dict[str, Any], cls: Type[T]) -> T:
+        # Note that keys are in camelCase convention, for example, tableHeader,
+        # tableBody. Therefore, we need to convert the keys to snake_case.
+        transformed_obj = {}
+        for key, value in obj.items():
+            if isinstance(value, str):
+                value = normalize_text(value)
+
+            transformed_obj[camel_to_snake_case(key)] = value
+
+        return super(CustomConverter, self).structure_attrs_fromdict(
+            transformed_obj, cls
+        )
+
+
+# The cattrs-based converter is the reference implementation of the AST builder in
+# :mod:`reformat_gherkin.parser`. It is kept to check that both produce the same AST.
+converter = CustomConverter()
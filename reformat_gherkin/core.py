@@ -1,10 +1,28 @@
+import hashlib
+import os
 import sys
-import traceback
+from contextlib import ExitStack
 from io import TextIOWrapper
+from itertools import chain, islice, zip_longest
 from pathlib import Path
-from typing import BinaryIO, Iterable, Iterator, Set, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import attr
 
-from .ast_node import GherkinDocument
+from .cache import Cache, FileData
+from .discovery import SourceFilter, discover_sources
 from .errors import (
     BaseError,
     EmptySources,
@@ -12,12 +30,41 @@ from .errors import (
     InternalError,
     NothingChanged,
     StableError,
+    VCSError,
+)
+from .metrics import (
+    FileMetrics,
+    MetricsOptions,
+    MetricsWriter,
+    current_metrics,
+    get_stream_size,
+    recording,
+    recording_memory,
+    timed,
 )
-from .formatter import LineGenerator
 from .options import NewlineMode, Options, WriteBackMode
-from .parser import parse
+from .profiling import profiling, start_worker_profiling
 from .report import Report
-from .utils import decode_stream, diff, dump_to_file, err, open_stream_or_path
+from .utils import (
+    BoundedCache,
+    decode_bytes,
+    diff,
+    dump_to_file,
+    encode_contents,
+    err,
+    iter_lines,
+    open_stream_or_path,
+)
+from .writeback import atomic_write, sync_files, write_file
+
+# The modules which are only needed to reformat files, like the parser and the
+# formatter, and those which are only needed with some options, are imported in
+# the functions which use them. Runs where every file is found in the cache then
+# start much faster, which matters for the pre-commit hook.
+if TYPE_CHECKING:  # pragma: no cover
+    from concurrent.futures import Executor
+
+    from .ast_node import GherkinDocument
 
 REPORT_URL = "https://github.com/ducminh-phan/reformat-gherkin/issues"
 
@@ -26,40 +73,337 @@ NEWLINE_FROM_OPTION = {
     NewlineMode.LF: "\n",
 }
 
+# The digests of the reformatted contents which are known to reformat to
+# themselves, with the options they were reformatted with
+_stable_digests: "BoundedCache[Tuple[Options, bytes], bool]" = BoundedCache(1024)
 
-def find_sources(src: Iterable[str]) -> Set[Path]:
-    sources: Set[Path] = set()
 
-    for s in src:
-        path = Path(s).resolve()
-        if path.is_dir():
-            sources.update(path.rglob("*.feature"))
-        elif path.is_file():
-            # If a file was explicitly given, we don't care about its extension
-            sources.add(path)
-        else:  # pragma: no cover
-            err(f"Invalid path: {s}")
+def find_sources(
+    src: Iterable[str],
+    *,
+    changed_since: Optional[str] = None,
+    staged: bool = False,
+    source_filter: Optional[SourceFilter] = None,
+) -> Set[Path]:
+    """
+    Find the files to reformat among `src`, and in the `src` folders, see
+    :func:`~reformat_gherkin.discovery.discover_sources`. If `changed_since` is
+    given or `staged` is True, only keep the files which git reports as changed,
+    see :func:`~reformat_gherkin.vcs.find_changed_sources`. All the files are kept
+    if the changed files cannot be listed.
+    """
+    src = tuple(src)
+    if changed_since is not None or staged:
+        from .vcs import find_changed_sources
 
-    return sources
+        try:
+            return find_changed_sources(
+                src,
+                changed_since=changed_since,
+                staged=staged,
+                source_filter=source_filter,
+            )
+        except VCSError as e:
+            err(f"{e} Reformatting all the files instead.")
+
+    # Listing directories is mostly CPU-bound when they are in the file system
+    # cache, so a single CPU gains nothing from more threads.
+    return discover_sources(src, source_filter, parallel=get_worker_count() > 1)
+
+
+def get_worker_count() -> int:
+    """
+    Return the number of CPUs this process is allowed to run on.
+    """
+    try:
+        return len(os.sched_getaffinity(0))  # type: ignore
+    except AttributeError:  # pragma: no cover
+        # `sched_getaffinity` is not available on Windows and macOS
+        return os.cpu_count() or 1
+
+
+def reformat(
+    src: Tuple[str, ...],
+    report: Report,
+    *,
+    options: Options,
+    workers: Optional[int] = None,
+    use_cache: bool = False,
+    cache_dir: Optional[Path] = None,
+    changed_since: Optional[str] = None,
+    staged: bool = False,
+    source_filter: Optional[SourceFilter] = None,
+    metrics: Optional[MetricsWriter] = None,
+    trace_memory: bool = False,
+    profile_dir: Optional[Path] = None,
+    fsync: bool = False,
+):
+    """
+    Reformat the files in `src` and report the results to `report`. If `fsync`
+    is True, the files which are reformatted in place are flushed to disk at the
+    end of the run.
+    """
+    with profiling(profile_dir, "main"):
+        use_stdin = "-" in src
+        sources = find_sources(
+            filter((lambda it: it != "-"), src),
+            changed_since=changed_since,
+            staged=staged,
+            source_filter=source_filter,
+        )
 
+        if not sources and not use_stdin:
+            raise EmptySources
+
+        # Stdin is always reformatted in the main process, since the worker processes
+        # cannot read from it.
+        if use_stdin:
+            reformat_stdin_with_report(report, options=options, metrics=metrics)
+
+        cache: Optional[Cache] = None
+        # Files which are partially reformatted are not recorded in the cache
+        if use_cache and not options.line_ranges:
+            cache = Cache.read(options, cache_dir)
+            sources = filter_cached(sources, cache, report, metrics=metrics)
+
+        if workers is None:
+            workers = get_worker_count()
+
+        use_cache = cache is not None
+        metrics_options = None
+        if metrics is not None:
+            metrics_options = MetricsOptions(
+                # The files which are reformatted were not found in the cache
+                cache=None if cache is None else "miss",
+                trace_memory=trace_memory,
+            )
+
+        if len(sources) > 1 and workers > 1:
+            formatted = reformat_many(
+                sources,
+                report,
+                options=options,
+                workers=workers,
+                metrics=metrics,
+                metrics_options=metrics_options,
+                use_cache=use_cache,
+                profile_dir=profile_dir,
+            )
+        else:
+            formatted = reformat_sequentially(
+                sources,
+                report,
+                options=options,
+                metrics=metrics,
+                metrics_options=metrics_options,
+                use_cache=use_cache,
+            )
+
+        if fsync and options.write_back == WriteBackMode.INPLACE:
+            changed = set(report.changed)
+            sync_files(path for path in sources if str(path) in changed)
+
+        # The cache is up to date if every file was found in it
+        if cache is not None and formatted:
+            cache.write(formatted)
+
+
+def filter_cached(
+    sources: Set[Path],
+    cache: Cache,
+    report: Report,
+    *,
+    metrics: Optional[MetricsWriter] = None,
+) -> Set[Path]:
+    """
+    Report the files which are found in the cache as unchanged, and return the
+    other files.
+    """
+    sources, cached = cache.filtered_cached(sources)
+    for path in sorted(cached):
+        report.done(str(path), False)
+        if metrics is not None:
+            metrics.write(FileMetrics(str(path), cache="hit", changed=False))
 
-def reformat(src: Tuple[str], report: Report, *, options: Options):
-    use_stdin = "-" in src
-    sources = find_sources(filter((lambda it: it != "-"), src))
+    return sources
 
-    if not sources and not use_stdin:
-        raise EmptySources
 
-    if use_stdin:
+def reformat_stdin_with_report(
+    report: Report,
+    *,
+    options: Options,
+    metrics: Optional[MetricsWriter] = None,
+) -> None:
+    stdin_metrics = None if metrics is None else FileMetrics("stdin")
+    with recording(stdin_metrics):
         changed = reformat_stdin(options=options)
-        report.done("stdin", changed)
+
+    report.done("stdin", changed)
+    if metrics is not None and stdin_metrics is not None:
+        stdin_metrics.changed = changed
+        metrics.write(stdin_metrics)
+
+
+def reformat_sequentially(
+    sources: Set[Path],
+    report: Report,
+    *,
+    options: Options,
+    metrics: Optional[MetricsWriter] = None,
+    metrics_options: Optional[MetricsOptions] = None,
+    use_cache: bool = False,
+) -> Dict[Path, FileData]:
+    """
+    Reformat multiple files one by one. If `use_cache` is True, return the data of
+    the files which are known to be formatted afterwards, to record them in the
+    cache.
+    """
+    formatted: Dict[Path, FileData] = {}
 
     for path in sources:
-        try:
-            changed = reformat_single_file(path, options=options)
+        changed, error, file_metrics, file_data = _try_reformat_single_file(
+            path, options, metrics_options, use_cache
+        )
+        if error is None:
             report.done(str(path), changed)
+            if file_data is not None:
+                formatted[path] = file_data
+        else:
+            report.failed(path, error)
+
+        if metrics is not None and file_metrics is not None:
+            metrics.write(file_metrics)
+
+    return formatted
+
+
+def reformat_many(
+    sources: Set[Path],
+    report: Report,
+    *,
+    options: Options,
+    workers: int,
+    metrics: Optional[MetricsWriter] = None,
+    metrics_options: Optional[MetricsOptions] = None,
+    use_cache: bool = False,
+    profile_dir: Optional[Path] = None,
+) -> Dict[Path, FileData]:
+    """
+    Reformat multiple files using a pool of worker processes. The results are
+    collected in the main process, so that only the main process writes to `report`
+    and `metrics`. If `use_cache` is True, return the data of the files which are
+    known to be formatted afterwards, to record them in the cache.
+
+    If `profile_dir` is given, each worker process writes its profile there.
+    """
+    from concurrent.futures import as_completed
+
+    # Windows doesn't support more than 61 workers in a process pool
+    if sys.platform == "win32":  # pragma: no cover
+        workers = min(workers, 60)
+
+    executor = get_executor(min(workers, len(sources)), profile_dir=profile_dir)
+    formatted: Dict[Path, FileData] = {}
+
+    with executor:
+        futures = {
+            executor.submit(
+                _try_reformat_single_file, path, options, metrics_options, use_cache
+            ): path
+            for path in sorted(sources)
+        }
+
+        for future in as_completed(futures):
+            path = futures[future]
+            changed, error, file_metrics, file_data = future.result()
+
+            if error is None:
+                report.done(str(path), changed)
+                if file_data is not None:
+                    formatted[path] = file_data
+            else:
+                report.failed(path, error)
+
+            if metrics is not None and file_metrics is not None:
+                metrics.write(file_metrics)
+
+    return formatted
+
+
+def is_formatted(changed: bool, *, options: Options) -> bool:
+    """
+    Check if a file is formatted after it was successfully processed.
+    """
+    return not changed or options.write_back == WriteBackMode.INPLACE
+
+
+def get_executor(workers: int, *, profile_dir: Optional[Path] = None) -> "Executor":
+    """
+    Return a pool of `workers` worker processes, if the system supports it. The
+    worker processes are profiled if `profile_dir` is given.
+    """
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    try:
+        if profile_dir is not None:
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=start_worker_profiling,
+                initargs=(profile_dir,),
+            )
+        return ProcessPoolExecutor(max_workers=workers)
+    except (ImportError, NotImplementedError, OSError):  # pragma: no cover
+        # We arrive here if the underlying system does not support multi-processing,
+        # like in AWS Lambda or Termux, in which case we gracefully fall back to
+        # a single worker thread.
+        return ThreadPoolExecutor(max_workers=1)
+
+
+def _try_reformat_single_file(
+    path: Path,
+    options: Options,
+    metrics_options: Optional[MetricsOptions],
+    use_cache: bool = False,
+) -> Tuple[bool, Optional[str], Optional[FileMetrics], Optional[FileData]]:
+    """
+    Reformat a file, in a worker process or in the main process. Exceptions are
+    converted to their messages here, since not every exception raised while
+    reformatting can be pickled. The metrics of the file are recorded if
+    `metrics_options` is given, and the data to record it in the cache if
+    `use_cache` is True.
+    """
+    if metrics_options is None:
+        try:
+            changed, file_data = _reformat_single_file(path, options, use_cache)
         except Exception as e:
-            report.failed(path, str(e))
+            return False, str(e), None, None
+
+        return changed, None, None, file_data
+
+    file_metrics = FileMetrics(str(path), cache=metrics_options.cache)
+    changed, error, file_data = False, None, None
+    with ExitStack() as stack:
+        stack.enter_context(recording(file_metrics))
+        if metrics_options.trace_memory:
+            stack.enter_context(recording_memory(file_metrics))
+        try:
+            changed, file_data = _reformat_single_file(path, options, use_cache)
+        except Exception as e:
+            error = str(e)
+
+    file_metrics.changed = changed
+    file_metrics.error = error
+
+    return changed, error, file_metrics, file_data
+
+
+def _reformat_single_file(
+    path: Path, options: Options, use_cache: bool
+) -> Tuple[bool, Optional[FileData]]:
+    if use_cache:
+        return reformat_single_file_with_data(path, options=options)
+
+    return reformat_single_file(path, options=options), None
 
 
 def reformat_stdin(*, options: Options) -> bool:
@@ -72,9 +416,38 @@ def reformat_stdin(*, options: Options) -> bool:
     )
 
 
-def reformat_single_file(path: Path, *, options: Options) -> bool:
+def reformat_single_file(
+    path: Path, *, options: Options, src_bytes: Optional[bytes] = None
+) -> bool:
     out_path = path if options.write_back == WriteBackMode.INPLACE else None
-    return reformat_stream_or_path(path, out_path, options=options)
+    return reformat_stream_or_path(path, out_path, src_bytes=src_bytes, options=options)
+
+
+def reformat_single_file_with_data(
+    path: Path, *, options: Options
+) -> Tuple[bool, Optional[FileData]]:
+    """
+    Reformat a file, and return whether it was changed, and the data to record it
+    in the cache, or None if it is not formatted afterwards.
+
+    The data describe the contents which were reformatted, as read before, or as
+    written, so that a file which is changed by someone else in the meantime is
+    not recorded as formatted.
+    """
+    with timed("decode"):
+        with path.open("rb") as src:
+            stat = os.fstat(src.fileno())
+            src_bytes = src.read()
+
+    changed = reformat_single_file(path, options=options, src_bytes=src_bytes)
+    if not changed:
+        return False, FileData.from_contents(stat, src_bytes)
+
+    if is_formatted(changed, options=options):
+        # The file was just reformatted in place
+        return True, FileData.from_path(path)
+
+    return True, None
 
 
 def reformat_stream_or_path(
@@ -82,14 +455,37 @@ def reformat_stream_or_path(
     out_stream_or_path: Union[None, BinaryIO, Path],
     *,
     force_write: bool = False,
+    src_bytes: Optional[bytes] = None,
     options: Options,
 ) -> bool:
-    with open_stream_or_path(in_stream_or_path, "rb") as in_stream:
-        src_contents, encoding, existing_newline = decode_stream(in_stream)
+    """
+    Reformat the contents of a stream or a file. `src_bytes` are the contents of
+    the input, if they were already read.
+    """
+    file_metrics = current_metrics()
+    with timed("decode"):
+        if src_bytes is None:
+            with open_stream_or_path(in_stream_or_path, "rb") as in_stream:
+                src_bytes = in_stream.read()
+        src_contents, encoding, existing_newline = decode_bytes(src_bytes)
+        if file_metrics is not None:
+            file_metrics.bytes_in = len(src_bytes)
+            file_metrics.lines = src_contents.count("\n") + 1
 
     newline = NEWLINE_FROM_OPTION.get(options.newline, existing_newline)
     newline_changed = newline != existing_newline
 
+    if options.fast and not options.line_ranges:
+        content_changed = reformat_streaming(
+            src_contents,
+            out_stream_or_path,
+            encoding=encoding,
+            newline=newline,
+            force_write=force_write or newline_changed,
+            options=options,
+        )
+        return content_changed or newline_changed
+
     content_changed = True
     try:
         dst_contents = format_file_contents(src_contents, options=options)
@@ -100,17 +496,125 @@ def reformat_stream_or_path(
     will_write = force_write or content_changed or newline_changed
 
     if will_write and out_stream_or_path is not None:
-        with open_stream_or_path(out_stream_or_path, "wb") as out_stream:
-            tiow = TextIOWrapper(out_stream, encoding=encoding, newline=newline)
-            tiow.write(dst_contents)
-            # Ensures that the underlying stream is not closed when the
-            # TextIOWrapper is garbage collected. We don't want to close a
-            # stream that was passed to us.
-            tiow.detach()
+        with timed("write"):
+            dst_bytes = encode_contents(dst_contents, encoding, newline)
+            if file_metrics is not None:
+                file_metrics.bytes_out = len(dst_bytes)
+
+            if not isinstance(out_stream_or_path, Path):
+                out_stream_or_path.write(dst_bytes)
+            elif out_stream_or_path == in_stream_or_path:
+                write_file(out_stream_or_path, dst_bytes, current=src_bytes)
+            else:
+                write_file(out_stream_or_path, dst_bytes)
 
     return content_changed or newline_changed
 
 
+def reformat_streaming(
+    src_contents: str,
+    out_stream_or_path: Union[None, BinaryIO, Path],
+    *,
+    encoding: str,
+    newline: str,
+    force_write: bool = False,
+    options: Options,
+) -> bool:
+    """
+    Reformat the contents of a file without building the reformatted contents in
+    memory. The reformatted lines are compared with the source lines as they are
+    generated, and written to the output once they differ. Return whether the
+    contents were changed.
+
+    The reformatted contents are not checked, so this is only used in fast mode.
+    The contents are parsed and the lines are generated while they are compared
+    and written, so the time spent doing so is split between the "format" and
+    "write" phases of the metrics.
+    """
+    src_lines = iter_lines(src_contents)
+    dst_lines = iter_reformatted_lines(src_contents, options=options)
+
+    n_common_lines = 0
+    first_changed_line: List[str] = []
+    with timed("format"):
+        for dst_line in dst_lines:
+            if dst_line != next(src_lines, None):
+                first_changed_line.append(dst_line)
+                break
+            n_common_lines += 1
+
+    content_changed = bool(first_changed_line) or next(src_lines, None) is not None
+
+    if out_stream_or_path is not None and (force_write or content_changed):
+        with timed("write"):
+            write_lines(
+                chain(
+                    islice(iter_lines(src_contents), n_common_lines),
+                    first_changed_line,
+                    dst_lines,
+                ),
+                out_stream_or_path,
+                encoding=encoding,
+                newline=newline,
+            )
+
+    return content_changed
+
+
+def write_lines(
+    lines: Iterable[str],
+    out_stream_or_path: Union[BinaryIO, Path],
+    *,
+    encoding: str,
+    newline: str,
+) -> None:
+    """
+    Write lines, separated by `newline`, to a stream or a file. A file is only
+    replaced after all the lines have been written to a temporary file next to it,
+    so that it is left intact if an error occurs in the meantime.
+    """
+    if isinstance(out_stream_or_path, Path):
+        with atomic_write(out_stream_or_path) as tmp_stream:
+            write_lines(lines, tmp_stream, encoding=encoding, newline=newline)
+            file_metrics = current_metrics()
+            if file_metrics is not None:
+                file_metrics.bytes_out = get_stream_size(tmp_stream)
+        return
+
+    tiow = TextIOWrapper(out_stream_or_path, encoding=encoding, newline=newline)
+    for i, line in enumerate(lines):
+        if i:
+            tiow.write("\n")
+        tiow.write(line)
+    # Ensures that the underlying stream is not closed when the TextIOWrapper is
+    # garbage collected. We don't want to close a stream that was passed to us.
+    tiow.detach()
+
+
+def iter_reformatted_lines(src_contents: str, *, options: Options) -> Iterator[str]:
+    """
+    Lazily generate the lines of the reformatted contents of a string, like
+    `format_str(src_contents, options=options).split("\n")`. A document consisting
+    of whitespace only is kept as it is.
+    """
+    from .parser import parse
+
+    if src_contents.strip() == "":
+        yield from iter_lines(src_contents)
+        return
+
+    ast = parse(src_contents)
+    file_metrics = current_metrics()
+    if file_metrics is not None:
+        file_metrics.nodes = sum(1 for _ in ast)
+
+    for line in generate_lines(ast, options=options):
+        if "\n" in line:
+            yield from line.split("\n")
+        else:
+            yield line
+
+
 def format_file_contents(src_contents: str, *, options: Options) -> str:
     """
     Reformat the contents of a file and return new contents. Raise NothingChanged
@@ -118,17 +622,56 @@ def format_file_contents(src_contents: str, *, options: Options) -> str:
 
     If `options.fast` is False, additionally confirm that the reformatted file is
     valid by calling :func:`assert_equivalent` and :func:`assert_stable` on it.
+    Each of the source and the reformatted contents is parsed only once, and the
+    ASTs are shared between the checks.
     """
+    from .parser import parse
+
     if src_contents.strip() == "":
         raise NothingChanged
 
-    dst_contents = format_str(src_contents, options=options)
+    with timed("parse"):
+        src_ast = parse(src_contents)
+    file_metrics = current_metrics()
+    if file_metrics is not None:
+        file_metrics.nodes = sum(1 for _ in src_ast)
+
+    with timed("format"):
+        if options.line_ranges:
+            from .ranges import format_line_ranges
+
+            dst_contents, dst_line_ranges = format_line_ranges(
+                src_contents,
+                src_ast,
+                options.line_ranges,
+                options=options,
+            )
+            # The reformatted blocks can move, so the second pass needs to
+            # reformat the blocks at their new positions.
+            stable_options = attr.evolve(options, line_ranges=dst_line_ranges)
+        else:
+            dst_contents = format_ast(src_ast, options=options)
+            stable_options = options
+
     if src_contents == dst_contents:
         raise NothingChanged
 
     if not options.fast:
-        assert_equivalent(src_contents, dst_contents)
-        assert_stable(src_contents, dst_contents, options=options)
+        with timed("equivalent"):
+            dst_ast = _parse_reformatted(dst_contents)
+            assert_equivalent(
+                src_contents,
+                dst_contents,
+                src_ast=src_ast,
+                dst_ast=dst_ast,
+            )
+        with timed("stable"):
+            assert_stable(
+                src_contents,
+                dst_contents,
+                options=stable_options,
+                dst_ast=dst_ast,
+            )
 
     return dst_contents
 
@@ -137,36 +680,38 @@ def format_str(src_contents: str, *, options: Options) -> str:
     """
     Reformat a string and return new contents.
     """
-    ast = parse(src_contents)
+    from .parser import parse
 
-    line_generator = LineGenerator(
-        ast,
-        options.step_keyword_alignment,
-        options.tag_line_mode,
-        options.indent,
-    )
-    lines = line_generator.generate()
+    return format_ast(parse(src_contents), options=options)
 
-    return "\n".join(lines)
+
+def format_ast(ast: "GherkinDocument", *, options: Options) -> str:
+    """
+    Reformat an AST and return new contents.
+    """
+    return "\n".join(generate_lines(ast, options=options))
 
 
-def assert_equivalent(src: str, dst: str) -> None:
+def generate_lines(ast: "GherkinDocument", *, options: Options) -> Iterator[str]:
     """
-    Raise EquivalentError if `src` and `dst` aren't equivalent.
+    Generate the reformatted lines of an AST, without line separators.
     """
+    from .formatter import LineGenerator
 
-    def _v(ast: GherkinDocument) -> Iterator[str]:
-        """
-        Simple visitor generating strings to compare ASTs by content
-        """
-        for node in ast:
-            yield repr(node)
+    return LineGenerator.from_options(ast, options).generate()
 
-    src_ast = parse(src)
+
+def _parse_reformatted(dst: str) -> "GherkinDocument":
+    """
+    Parse the reformatted contents. Raise InternalError if they are invalid.
+    """
+    from .parser import parse
 
     try:
-        dst_ast = parse(dst)
+        return parse(dst)
     except BaseError as exc:
+        import traceback
+
         log = dump_to_file("".join(traceback.format_tb(exc.__traceback__)), dst)
         raise InternalError(
             f"INTERNAL ERROR: Invalid file contents are produced:\n"
@@ -176,24 +721,142 @@ def assert_equivalent(src: str, dst: str) -> None:
             f"{log}\n"
         ) from exc
 
-    src_ast_str = "\n".join(_v(src_ast))
-    dst_ast_str = "\n".join(_v(dst_ast))
 
-    if src_ast_str != dst_ast_str:
-        log = dump_to_file(diff(src_ast_str, dst_ast_str, "src", "dst"))
-        raise EquivalentError(
-            f"INTERNAL ERROR: The new content produced is not equivalent to "
-            f"the source.\n"
-            f"Please report a bug on {REPORT_URL}.\n"
-            f"This diff might be helpful: {log}\n"
-        )
+def assert_equivalent(
+    src: str,
+    dst: str,
+    *,
+    src_ast: Optional["GherkinDocument"] = None,
+    dst_ast: Optional["GherkinDocument"] = None,
+) -> None:
+    """
+    Raise EquivalentError if `src` and `dst` aren't equivalent. The ASTs of `src`
+    and `dst` can be given if they are already parsed.
+    """
+    from .parser import parse
+
+    if src_ast is None:
+        src_ast = parse(src)
+
+    if dst_ast is None:
+        dst_ast = _parse_reformatted(dst)
+
+    # Compare the contents of the nodes one by one, and stop at the first mismatch
+    for src_node, dst_node in zip_longest(
+        _iter_node_contents(src_ast), _iter_node_contents(dst_ast)
+    ):
+        if src_node != dst_node:
+            break
+    else:
+        return
+
+    src_ast_str = "\n".join(_iter_node_reprs(src_ast))
+    dst_ast_str = "\n".join(_iter_node_reprs(dst_ast))
+
+    log = dump_to_file(diff(src_ast_str, dst_ast_str, "src", "dst"))
+    raise EquivalentError(
+        f"INTERNAL ERROR: The new content produced is not equivalent to "
+        f"the source.\n"
+        f"Please report a bug on {REPORT_URL}.\n"
+        f"This diff might be helpful: {log}\n"
+    )
 
 
-def assert_stable(src: str, dst: str, *, options: Options) -> None:
+def _iter_node_contents(ast: "GherkinDocument") -> Iterator[Tuple[Any, ...]]:
     """
-    Raise StableError if `dst` reformats differently the second time.
+    Generate the contents of the nodes in an AST. The contents of a node include
+    its text values, and the number of its children, but not the children
+    themselves, since they are generated separately. Therefore, the total size
+    of the generated contents is linear in the size of the AST.
     """
-    new_dst = format_str(dst, options=options)
+    from .ast_node import TableRow
+
+    for node in ast:
+        if isinstance(node, TableRow):
+            # The cells are not generated when iterating over the AST
+            yield TableRow, tuple(cell.value for cell in node.cells)
+            continue
+
+        contents: List[Any] = [type(node)]
+        for name in _get_compared_fields(type(node)):
+            value = getattr(node, name)
+
+            if isinstance(value, str):
+                contents.append(value)
+            elif isinstance(value, tuple):
+                contents.append(len(value))
+            else:
+                contents.append(value is None)
+
+        yield tuple(contents)
+
+
+# The names of the fields compared for each class of nodes
+_compared_fields: Dict[type, Tuple[str, ...]] = {}
+
+
+def _get_compared_fields(cls: type) -> Tuple[str, ...]:
+    fields = _compared_fields.get(cls)
+    if fields is None:
+        # Locations are excluded from the representations of the nodes
+        fields = tuple(field.name for field in attr.fields(cls) if field.repr)
+        _compared_fields[cls] = fields
+
+    return fields
+
+
+def _iter_node_reprs(ast: "GherkinDocument") -> Iterator[str]:
+    """
+    Generate human-readable representations of the nodes in an AST, to show the
+    differences between two ASTs.
+    """
+    for node in ast:
+        yield repr(node)
+
+
+def assert_stable(
+    src: str,
+    dst: str,
+    *,
+    options: Options,
+    dst_ast: Optional["GherkinDocument"] = None,
+) -> None:
+    """
+    Raise StableError if `dst` reformats differently the second time. The AST of
+    `dst` can be given if it is already parsed.
+
+    The lines of the second pass are compared with `dst` as they are generated,
+    so that the second pass is never joined into a new document unless it
+    differs. Contents which were already found to be stable are not checked again.
+    """
+    from .parser import parse
+
+    digest = (options, hashlib.sha256(dst.encode("utf-8", "surrogatepass")).digest())
+    if _stable_digests.get(digest):
+        return
+
+    if dst_ast is None:
+        dst_ast = parse(dst)
+
+    if options.line_ranges:
+        from .ranges import format_line_ranges
+
+        new_dst, _ = format_line_ranges(
+            dst,
+            dst_ast,
+            options.line_ranges,
+            options=options,
+        )
+    elif all(
+        new_line == line
+        for new_line, line in zip_longest(
+            generate_lines(dst_ast, options=options), iter_lines(dst)
+        )
+    ):
+        new_dst = dst
+    else:
+        new_dst = format_ast(dst_ast, options=options)
+
     if dst != new_dst:
         log = dump_to_file(
             diff(src, dst, "source", "first pass"),
@@ -205,3 +868,5 @@ def assert_stable(src: str, dst: str, *, options: Options) -> None:
             f"Please report a bug on {REPORT_URL}.\n"
             f"This diff might be helpful: {log}\n"
         ) from None
+
+    _stable_digests.put(digest, True)
@@ -0,0 +1,249 @@
+from concurrent.futures import Executor
+from email.message import Message
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Mapping, Optional, Tuple, Union
+
+import click
+
+from .core import (
+    NEWLINE_FROM_OPTION,
+    format_file_contents,
+    get_executor,
+    get_worker_count,
+)
+from .errors import BaseError, DeserializeError, InvalidInput, NothingChanged
+from .options import (
+    AlignmentMode,
+    NewlineMode,
+    Options,
+    TagLineMode,
+    WriteBackMode,
+    get_indent_from_configuration,
+)
+from .utils import decode_bytes, encode_contents, out
+from .version import __version__
+
+PROTOCOL_VERSION = "1"
+
+# Request headers
+CONTENT_LENGTH_HEADER = "Content-Length"
+PROTOCOL_VERSION_HEADER = "X-Protocol-Version"
+ALIGNMENT_HEADER = "X-Alignment"
+NEWLINE_HEADER = "X-Newline"
+FAST_OR_SAFE_HEADER = "X-Fast-Or-Safe"
+TAG_LINE_MODE_HEADER = "X-Tag-Line-Mode"
+TAB_WIDTH_HEADER = "X-Tab-Width"
+USE_TABS_HEADER = "X-Use-Tabs"
+
+# Response headers
+VERSION_HEADER = "X-Reformat-Gherkin-Version"
+
+# The headers of a request, or the headers of a frame in a batch
+Headers = Union[Mapping[str, str], Message]
+Response = Tuple[HTTPStatus, bytes]
+
+# The options used when no header is given, which are the defaults of the
+# command-line options
+DEFAULT_OPTIONS = Options(
+    write_back=WriteBackMode.CHECK,
+    step_keyword_alignment=AlignmentMode.NONE,
+    newline=NewlineMode.KEEP,
+    tag_line_mode=TagLineMode.SINGLELINE,
+    fast=False,
+    indent=get_indent_from_configuration(2, False),
+)
+
+
+class InvalidHeader(BaseError):
+    """
+    Raised when the value of a request header is invalid.
+    """
+
+
+@click.command(context_settings={"help_option_names": ["-h", "--help"]})
+@click.option(
+    "--bind-host",
+    type=str,
+    default="localhost",
+    show_default=True,
+    help="Address to bind the server to.",
+)
+@click.option(
+    "--bind-port",
+    type=int,
+    default=45484,
+    show_default=True,
+    help="Port to listen on.",
+)
+@click.option(
+    "-W",
+    "--workers",
+    type=click.IntRange(min=1),
+    help=(
+        "Number of worker processes used to reformat the requests. "
+        "[default: number of CPUs available]"
+    ),
+)
+@click.version_option(version=__version__)
+def main(bind_host: str, bind_port: int, workers: Optional[int]) -> None:
+    """
+    Run a server which reformats the Gherkin documents sent to it.
+
+    POST a document to the server, and set the X-Alignment, X-Newline,
+    X-Fast-Or-Safe, X-Tag-Line-Mode, X-Tab-Width, and X-Use-Tabs headers to
+    the values of the corresponding command-line options to configure the
+    formatting. The server responds with 200 and the reformatted document,
+    204 if nothing changed, 400 if the request or the document is invalid,
+    and 500 if an internal error occurred.
+    """
+    executor = get_executor(workers or get_worker_count())
+
+    with executor, make_server(bind_host, bind_port, executor) as server:
+        host, port = server.server_address[:2]
+        out(f"reformat-gherkind listening on {host}:{port}", bold=False)
+        server.serve_forever()
+
+
+class DaemonServer(ThreadingHTTPServer):
+    """
+    An HTTP server which handles each request in a thread, and reformats the
+    documents in `executor`.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, server_address: Tuple[str, int], executor: Executor):
+        super().__init__(server_address, DaemonRequestHandler)
+        self.executor = executor
+
+
+def make_server(host: str, port: int, executor: Executor) -> DaemonServer:
+    return DaemonServer((host, port), executor)
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    server: DaemonServer
+
+    def do_POST(self) -> None:
+        try:
+            options = parse_options(self.headers)
+            content_length = get_content_length(self.headers)
+        except InvalidHeader as e:
+            self.send_result(HTTPStatus.BAD_REQUEST, str(e).encode())
+            return
+
+        body = self.rfile.read(content_length)
+
+        try:
+            future = self.server.executor.submit(reformat_request_body, body, options)
+            status, result = future.result()
+        except Exception as e:
+            # The executor cannot reformat the document, for example if it was shut
+            # down or one of its worker processes died
+            self.send_result(HTTPStatus.INTERNAL_SERVER_ERROR, str(e).encode())
+            return
+
+        self.send_result(status, result)
+
+    def send_result(self, status: HTTPStatus, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header(VERSION_HEADER, __version__)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # pragma: no cover
+        # Only log the errors, not every request
+        pass
+
+
+def get_content_length(headers: Headers) -> int:
+    """
+    Read the length of the body of a request. It is required, since the body
+    could only be read until the client closes the connection otherwise.
+    """
+    try:
+        content_length = int(headers.get(CONTENT_LENGTH_HEADER, ""))
+    except ValueError:
+        raise InvalidHeader(
+            f"Missing or invalid {CONTENT_LENGTH_HEADER} header."
+        ) from None
+
+    if content_length < 0:
+        raise InvalidHeader(f"Invalid {CONTENT_LENGTH_HEADER}: {content_length}")
+
+    return content_length
+
+
+def parse_options(headers: Headers, defaults: Options = DEFAULT_OPTIONS) -> Options:
+    """
+    Read the formatting options from the request headers. The options which are
+    not given are taken from `defaults`, which are the defaults of the
+    command-line options unless specified.
+    """
+    protocol_version = headers.get(PROTOCOL_VERSION_HEADER, PROTOCOL_VERSION)
+    if protocol_version != PROTOCOL_VERSION:
+        raise InvalidHeader(f"Unsupported protocol version: {protocol_version}")
+
+    default_use_tabs = defaults.indent == "\t"
+    default_tab_width = 2 if default_use_tabs else len(defaults.indent)
+
+    try:
+        alignment = AlignmentMode.from_configuration(
+            headers.get(ALIGNMENT_HEADER, defaults.step_keyword_alignment.value)
+        )
+        newline = NewlineMode.from_configuration(
+            headers.get(NEWLINE_HEADER, defaults.newline.value)
+        )
+        tag_line_mode = TagLineMode(
+            headers.get(TAG_LINE_MODE_HEADER, defaults.tag_line_mode.value)
+        )
+        tab_width = int(headers.get(TAB_WIDTH_HEADER, default_tab_width))
+    except ValueError as e:
+        raise InvalidHeader(f"Invalid header value: {e}") from e
+
+    fast_or_safe = headers.get(FAST_OR_SAFE_HEADER, "fast" if defaults.fast else "safe")
+    if fast_or_safe not in ("fast", "safe"):
+        raise InvalidHeader(f"Invalid value for {FAST_OR_SAFE_HEADER}: {fast_or_safe}")
+
+    use_tabs = headers.get(USE_TABS_HEADER, str(default_use_tabs)).lower()
+    if use_tabs not in ("true", "false"):
+        raise InvalidHeader(f"Invalid value for {USE_TABS_HEADER}: {use_tabs}")
+
+    return Options(
+        write_back=WriteBackMode.CHECK,
+        step_keyword_alignment=alignment,
+        newline=newline,
+        tag_line_mode=tag_line_mode,
+        fast=fast_or_safe == "fast",
+        indent=get_indent_from_configuration(tab_width, use_tabs == "true"),
+    )
+
+
+def reformat_request_body(body: bytes, options: Options) -> Response:
+    """
+    Reformat the body of a request. This runs in the worker processes, so that
+    the formatting of a document doesn't block the other requests.
+    """
+    try:
+        src_contents, encoding, existing_newline = decode_bytes(body)
+    except (SyntaxError, UnicodeDecodeError) as e:
+        return HTTPStatus.BAD_REQUEST, f"Cannot decode the document: {e}".encode()
+
+    newline = NEWLINE_FROM_OPTION.get(options.newline, existing_newline)
+
+    try:
+        dst_contents = format_file_contents(src_contents, options=options)
+    except NothingChanged:
+        if newline == existing_newline:
+            return HTTPStatus.NO_CONTENT, b""
+
+        dst_contents = src_contents
+    except (InvalidInput, DeserializeError) as e:
+        return HTTPStatus.BAD_REQUEST, str(e).encode()
+    except Exception as e:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, str(e).encode()
+
+    return HTTPStatus.OK, encode_contents(dst_contents, encoding, newline)
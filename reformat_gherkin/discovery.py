@@ -0,0 +1,335 @@
+import os
+import re
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Pattern, Set, Tuple, Union
+
+from attr import dataclass
+
+from .config import find_project_root
+from .utils import err
+
+DEFAULT_INCLUDES = r"\.feature$"
+DEFAULT_EXCLUDES = (
+    r"/(\.direnv|\.eggs|\.git|\.hg|\.mypy_cache|\.nox|\.pytest_cache|\.svn|\.tox"
+    r"|\.venv|__pycache__|_build|build|dist|node_modules|venv)/"
+)
+
+GITIGNORE_FILE = ".gitignore"
+
+# The number of directories left to list above which they are listed in parallel
+PARALLEL_WALK_THRESHOLD = 32
+
+_glob_token_re = re.compile(r"\*\*/|/\*\*$|\*\*|\*|\?|\[(?:\\.|[^\]])+\]|\\.|.", re.S)
+
+
+def translate_glob(glob: str) -> str:
+    """
+    Translate a glob of a .gitignore file to a regular expression. The path
+    separator is only matched by `**`.
+    """
+    parts = []
+    for token in _glob_token_re.findall(glob):
+        if token == "**/":
+            parts.append("(?:.*/)?")
+        elif token == "/**":
+            parts.append("/.*")
+        elif token == "**":
+            parts.append(".*")
+        elif token == "*":
+            parts.append("[^/]*")
+        elif token == "?":
+            parts.append("[^/]")
+        elif token.startswith("[") and len(token) > 1:
+            body = token[1:-1]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+        elif token.startswith("\\") and len(token) > 1:
+            parts.append(re.escape(token[1]))
+        else:
+            parts.append(re.escape(token))
+
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class IgnorePattern:
+    """
+    A pattern of a .gitignore file, which matches the paths relative to the
+    directory of the file.
+    """
+
+    regex: Pattern[str]
+    negated: bool
+    directory_only: bool
+
+    @classmethod
+    def from_line(cls, line: str) -> Optional["IgnorePattern"]:
+        line = line.rstrip("\n")
+        # Trailing spaces are ignored unless they are escaped
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            stripped += " "
+        line = stripped
+
+        if not line or line.startswith("#"):
+            return None
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+
+        # A pattern with a separator is relative to the directory of the file,
+        # otherwise it matches at any level below it.
+        if "/" in line:
+            regex = translate_glob(line.lstrip("/"))
+        else:
+            regex = "(?:.*/)?" + translate_glob(line)
+
+        return cls(re.compile(regex + r"\Z", re.S), negated, directory_only)
+
+
+@dataclass(frozen=True)
+class GitIgnore:
+    """
+    The patterns of a .gitignore file. `base` is the path of its directory
+    relative to the project root, with a leading and a trailing `/`.
+    """
+
+    base: str
+    patterns: Tuple[IgnorePattern, ...]
+
+    @classmethod
+    def read(cls, directory: Union[str, Path], base: str) -> Optional["GitIgnore"]:
+        try:
+            with open(
+                os.path.join(directory, GITIGNORE_FILE),
+                encoding="utf-8",
+                errors="surrogateescape",
+            ) as f:
+                patterns = tuple(
+                    pattern
+                    for pattern in map(IgnorePattern.from_line, f)
+                    if pattern is not None
+                )
+        except OSError:
+            return None
+
+        if not patterns:
+            return None
+
+        return cls(base, patterns)
+
+    def match(self, relative: str, is_dir: bool) -> Optional[bool]:
+        """
+        Return whether the path `relative` to the project root is ignored, or None
+        if no pattern matches it. The last pattern which matches a path decides
+        whether it is ignored.
+        """
+        path = relative[len(self.base) :].rstrip("/")
+
+        for pattern in reversed(self.patterns):
+            if pattern.directory_only and not is_dir:
+                continue
+            if pattern.regex.match(path):
+                return not pattern.negated
+
+        return None
+
+
+def is_ignored(relative: str, is_dir: bool, gitignores: Tuple[GitIgnore, ...]) -> bool:
+    """
+    Return whether a path is ignored by the .gitignore files of its directory and
+    of its parents. The files closer to the path take precedence.
+    """
+    for gitignore in reversed(gitignores):
+        ignored = gitignore.match(relative, is_dir)
+        if ignored is not None:
+            return ignored
+
+    return False
+
+
+def to_relative(path: str, root: str) -> str:
+    """
+    Return the path relative to the project root, with a leading `/`.
+    """
+    relative = os.path.relpath(path, root).replace(os.sep, "/")
+
+    return "/" if relative == "." else f"/{relative}"
+
+
+@dataclass(frozen=True)
+class SourceFilter:
+    """
+    Select the files to reformat in the SRC folders. The regular expressions match
+    the paths relative to the project root, with a leading `/`, and with a trailing
+    `/` for directories. A path is excluded if it matches `exclude` or
+    `extend_exclude`, or if it is ignored by a .gitignore file. Only the files
+    matching `include` are reformatted.
+    """
+
+    include: Pattern[str] = re.compile(DEFAULT_INCLUDES)
+    exclude: Pattern[str] = re.compile(DEFAULT_EXCLUDES)
+    extend_exclude: Optional[Pattern[str]] = None
+
+    def is_excluded(self, relative: str) -> bool:
+        return bool(
+            self.exclude.search(relative)
+            or (self.extend_exclude and self.extend_exclude.search(relative))
+        )
+
+    def is_selected(
+        self, relative: str, is_dir: bool, gitignores: Tuple[GitIgnore, ...] = ()
+    ) -> bool:
+        if not is_dir and not self.include.search(relative):
+            return False
+
+        return not (
+            self.is_excluded(relative) or is_ignored(relative, is_dir, gitignores)
+        )
+
+
+# A directory to list, its path relative to the project root, and the .gitignore
+# files of its parents
+Directory = Tuple[Path, str, Tuple[GitIgnore, ...]]
+# The files and the directories to descend into, found by listing a directory
+Listing = Tuple[List[Path], List[Directory]]
+
+
+def is_directory_entry(entry: "os.DirEntry[str]") -> Optional[bool]:
+    """
+    Return whether an entry is a directory, or None if it is neither a directory
+    nor a file. Symbolic links to directories are not followed, like in
+    Path.rglob.
+    """
+    try:
+        if entry.is_dir(follow_symlinks=False):
+            return True
+        if entry.is_file():
+            return False
+    except OSError:  # pragma: no cover
+        pass
+
+    return None
+
+
+def list_directory(directory: Directory, source_filter: SourceFilter) -> Listing:
+    """
+    List the sources in a directory, and its subdirectories which are neither
+    excluded nor ignored.
+    """
+    path, relative, gitignores = directory
+    try:
+        with os.scandir(path) as iterator:
+            entries = list(iterator)
+    except OSError:
+        return [], []
+
+    if any(entry.name == GITIGNORE_FILE for entry in entries):
+        gitignore = GitIgnore.read(path, relative)
+        if gitignore is not None:
+            gitignores += (gitignore,)
+
+    files: List[Path] = []
+    directories: List[Directory] = []
+    for entry in entries:
+        is_dir = is_directory_entry(entry)
+        if is_dir is None:
+            continue
+
+        if is_dir:
+            entry_relative = f"{relative}{entry.name}/"
+            if source_filter.is_selected(entry_relative, True, gitignores):
+                directories.append((path / entry.name, entry_relative, gitignores))
+        elif source_filter.is_selected(relative + entry.name, False, gitignores):
+            files.append(path / entry.name)
+
+    return files, directories
+
+
+def get_top_directory(path: str, root: str) -> Directory:
+    """
+    Return a directory given in SRC, with the .gitignore files from the project
+    root down to its parent.
+    """
+    relative = to_relative(path, root)
+    parts = relative.strip("/").split("/") if relative != "/" else []
+
+    gitignores = []
+    for index in range(len(parts)):
+        base = "/" + "".join(f"{part}/" for part in parts[:index])
+        gitignore = GitIgnore.read(os.path.join(root, *parts[:index]), base)
+        if gitignore is not None:
+            gitignores.append(gitignore)
+
+    return Path(path), relative.rstrip("/") + "/", tuple(gitignores)
+
+
+def walk_directories(
+    directories: Iterable[Directory], source_filter: SourceFilter, *, parallel: bool
+) -> Iterator[Path]:
+    """
+    Generate the sources in the `directories`. If `parallel` is True, the
+    directories of a large tree are listed in parallel, one level of the tree at a
+    time.
+    """
+    pending = list(directories)
+
+    # Listing a directory is fast when it is in the file system cache, so a small
+    # tree is listed in the current thread.
+    while pending and (not parallel or len(pending) < PARALLEL_WALK_THRESHOLD):
+        files, subdirectories = list_directory(pending.pop(), source_filter)
+        yield from files
+        pending.extend(subdirectories)
+
+    if not pending:
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    list_sources = partial(list_directory, source_filter=source_filter)
+    with ThreadPoolExecutor() as executor:
+        while pending:
+            level, pending = pending, []
+            for files, subdirectories in executor.map(list_sources, level):
+                yield from files
+                pending.extend(subdirectories)
+
+
+def discover_sources(
+    src: Iterable[str],
+    source_filter: Optional[SourceFilter] = None,
+    *,
+    parallel: bool = True,
+) -> Set[Path]:
+    """
+    Find the files to reformat among `src`, and in the `src` folders. A file which
+    is explicitly given is always reformatted, whatever its name. The folders are
+    listed with multiple threads if `parallel` is True.
+    """
+    if source_filter is None:
+        source_filter = SourceFilter()
+
+    src = tuple(src)
+    root = str(find_project_root(src))
+    sources: Set[Path] = set()
+    directories: List[Directory] = []
+    for s in src:
+        path = os.path.realpath(s)
+        if os.path.isdir(path):
+            directories.append(get_top_directory(path, root))
+        elif os.path.isfile(path):
+            sources.add(Path(path))
+        else:  # pragma: no cover
+            err(f"Invalid path: {s}")
+
+    sources.update(walk_directories(directories, source_filter, parallel=parallel))
+
+    return sources
@@ -38,6 +38,12 @@ class EmptySources(BaseError):
     """
 
 
+class VCSError(BaseError):
+    """
+    Raised when the changed files cannot be listed with git.
+    """
+
+
 class BaseWarning(Warning):
     pass
 
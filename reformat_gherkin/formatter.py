@@ -1,15 +1,14 @@
-from itertools import chain, groupby
+import math
 from typing import (
     Any,
-    Callable,
-    Dict,
+    Iterable,
     Iterator,
     List,
     Mapping,
     Optional,
-    Set,
+    Sequence,
+    Tuple,
     Union,
-    overload,
 )
 
 from attr import attrib, dataclass
@@ -29,10 +28,10 @@ from .ast_node import (
     Step,
     TableRow,
     Tag,
-    TagGroup,
 )
-from .options import AlignmentMode, TagLineMode
-from .utils import camel_to_snake_case, extract_beginning_spaces, get_display_width
+from .options import AlignmentMode, Options, TagLineMode
+from .table import iter_table_lines
+from .utils import get_display_width
 
 INDENT_LEVEL_MAP: Mapping[Any, int] = {
     Feature: 0,
@@ -108,6 +107,20 @@ def format_step_keyword(
         return padding + keyword
 
 
+def find_max_step_keyword_width(nodes: Iterable[Node]) -> int:
+    """
+    Find the width of the longest keyword of the steps among `nodes`.
+    """
+    return max(
+        (
+            get_display_width(node.keyword.strip())
+            for node in nodes
+            if isinstance(node, Step)
+        ),
+        default=0,
+    )
+
+
 def generate_keyword_line(
     keyword: str,
     name: str,
@@ -142,33 +155,7 @@ def generate_table_lines(
     Generate lines for table. The columns in a table need to have the same width.
     """
 
-    if not rows:
-        return []
-
-    n_columns = len(rows[0])
-
-    # Find the max width of a cell in a column, so that every cell in the same column
-    # has the same width
-    column_widths = [
-        max(get_display_width(row[column_index].value) for row in rows)
-        for column_index in range(n_columns)
-    ]
-
-    lines = []
-    for row in rows:
-        line = "|"
-
-        for column_index in range(n_columns):
-            # Left-align the content of each cell, fix the width of the cell
-            content = row[column_index].value
-            column_width = column_widths[column_index]
-            content_width = get_display_width(content)
-            padding = " " * (column_width - content_width)
-            line += f" {content}{padding} |"
-
-        lines.append(line)
-
-    return [f"{indent * indent_level}{line}" for line in lines]
+    return list(iter_table_lines(rows, indent * indent_level))
 
 
 def extract_rows(node: Union[DataTable, Examples]) -> List[TableRow]:
@@ -205,187 +192,96 @@ def generate_doc_string_lines(
     return [f"{indent * indent_level}{line}" if line else "" for line in raw_lines]
 
 
-ContextMap = Dict[Union[Comment, Tag, TagGroup, TableRow], Any]
-Lines = Iterator[str]
-
-
 @dataclass
-class LineGenerator:
-    ast: GherkinDocument
-    step_keyword_alignment: AlignmentMode
-    tag_line_mode: TagLineMode
-    indent: str
-
-    __nodes: List[Node] = attrib(init=False)
-    __contexts: ContextMap = attrib(init=False)
-    __nodes_with_newline: Set[Node] = attrib(init=False)
-    __nodes_within_rules: Set[Node] = attrib(init=False)
-    __max_step_keyword_width: int = attrib(init=False)
-
-    def __attrs_post_init__(self):
-        # Use `__attrs_post_init__` instead of `property` to avoid re-computing attributes
+class CommentIndex:
+    """
+    Place the comments of a document, which are kept apart from the tree, between
+    the nodes.
 
-        self.__nodes = list(self.ast)
+    Both the comments and the nodes are in document order, so they are merged in a
+    single pass. A comment is indented like the line after it, so the comments
+    before a node are placed when the node is generated.
+    """
 
-        if self.tag_line_mode is TagLineMode.SINGLELINE:
-            self.__group_tags()
+    comments: Sequence[Comment]
 
-        self.__nodes.sort(key=lambda node: node.location)
+    # The line of the next comment to place
+    next_line: float = attrib(init=False)
+    __position: int = attrib(init=False, default=0)
 
-        self.__nodes_within_rules = self.__find_nodes_within_rules()
-        self.__contexts = self.__construct_contexts()
-        self.__nodes_with_newline = self.__find_nodes_with_newline()
-        self.__max_step_keyword_width = self.__find_max_step_keyword_width()
-        self.__add_language_header()
-
-    def __group_tags(self):
-        """
-        Group the tags of a node, so that we can render them on a single line.
-        """
+    def __attrs_post_init__(self):
+        self.next_line = self.__get_line(0)
 
-        tag_groups: List[TagGroup] = []
-        node: Node
-        for node in self.ast:
-            if hasattr(node, "tags"):
-                tags = node.tags
-
-                if tags:
-                    tag_group = TagGroup(
-                        members=tags,
-                        context=node,
-                        # The tag group should be placed
-                        # at the position of the last tag
-                        location=tags[-1].location,
-                    )
-                    tag_groups.append(tag_group)
+    def __get_line(self, position: int) -> float:
+        if position < len(self.comments):
+            return self.comments[position].location.line
 
-        # After grouping the tags, we need to include the tag groups into
-        # the list of nodes and remove the tags from the list.
-        self.__nodes = [
-            node for node in self.__nodes if not isinstance(node, Tag)
-        ] + tag_groups
+        return math.inf
 
-    def __construct_contexts(self) -> ContextMap:
-        """
-        Construct the information about the context a certain line might need to know to
-        properly format these lines.
+    def place_before(self, line: float, indent: str) -> Iterator["Chunk"]:
         """
+        Place the comments before the line `line` with the given indentation.
 
-        contexts: ContextMap = {}
-        nodes = self.__nodes
-
-        for node in nodes:
-            if hasattr(node, "context"):
-                contexts[node] = node.context  # type: ignore
-
-            # We want tags to have the same indentation level with their parents
-            for tag in getattr(node, "tags", []):
-                contexts[tag] = node
-
-            if isinstance(node, (DataTable, Examples)):
-                # We need to know all rows in a table, so that the columns can be padded
-                # to have the same widths across all rows. The context of a row is its
-                # reformatted line.
-                rows = extract_rows(node)
-                indent_level = 0
-                if rows:
-                    indent_level = self.get_indent_level(rows[0])
-
-                lines = generate_table_lines(
-                    rows,
-                    self.indent,
-                    indent_level,
-                )
-
-                for row, line in zip(rows, lines):
-                    contexts[row] = line
-
-        contexts.update(self.__construct_contexts_for_comments(nodes))
-
-        return contexts
-
-    @staticmethod
-    def __construct_contexts_for_comments(nodes: List[Node]) -> ContextMap:
-        # The context of each comment line is the next non-comment line.
-        #
-        # The steps of the algorithm:
-        # 1. Group the nodes into comments and non-comments
-        # 2. The first node in each group of non-comments is the context of every node
-        #    in the previous group, which consists of comments only.
-        #
-        # We start with a context of None, this lets us know if the document ends
-        # with a block of comments.
-        #
-        # In the original algorithm, we simply set the context of each comment line
-        # to be the next line. This leads to a RecursionError if there are too many
-        # consecutive comments.
-
-        contexts: ContextMap = {}
-        current_context = None
-
-        groups = groupby(reversed(nodes), lambda n: isinstance(n, Comment))
-
-        for key, group in groups:
-            if key is False:
-                # The current group consists of non-comments, we set the current context
-                # to be the last node in the group, since we grouped in the reverse order
-                current_context = list(group)[-1]
-            else:
-                # The current group consists of comments. These comments should have the
-                # same indent level, which is the indent level of the current context.
-                for node in group:
-                    contexts[node] = current_context  # type: ignore
-
-        return contexts
-
-    def __find_nodes_with_newline(self) -> Set[Node]:
+        Each comment is a chunk at its own line, so that it belongs to the same block
+        as the line, even when the node after it is at a later line, like tags
+        rendered on a single line.
         """
-        Find all nodes in the AST that needs a new line after it.
-        """
-
-        nodes_with_newline: Set[Node] = set()
+        comments = self.comments
+        position = self.__position
+        while position < len(comments) and comments[position].location.line < line:
+            comment = comments[position]
+            yield comment.location.line, [f"{indent}{comment.text}"], False
+            position += 1
 
-        node: Optional[Node] = None
+        self.__position = position
+        self.next_line = self.__get_line(position)
 
-        for node in self.__nodes:
-            # We want to add a newline after the Feature/Rule line, even
-            # if it does not have a description. If the feature/rule has
-            # a description, we already add a newline after each description.
-            if isinstance(node, (Feature, Rule)) and not node.description:
-                nodes_with_newline.add(node)
 
-            children: List[Node] = []
-
-            # Add an empty line after the last step, including its argument, if any
-            if isinstance(node, (Background, Scenario)):
-                children = list(chain.from_iterable(node.steps))
+# The line of a node in the source document, its reformatted lines, and whether an
+# empty line follows it
+Chunk = Tuple[int, List[str], bool]
+Lines = Iterator[str]
 
-            # Add an empty line after an examples table
-            if isinstance(node, Examples):
-                children = list(node)
 
-            if children:
-                last_child = children[-1]
-                nodes_with_newline.add(last_child)
+@dataclass
+class LineGenerator:
+    """
+    Generate the reformatted lines of a document.
 
-        # Add the last node in the AST so that we have an empty line at the end
-        if node is not None:
-            nodes_with_newline.add(node)
+    The AST is walked once, in document order. The indentation of each node is
+    known from its position in the tree, and the comments, which are kept apart
+    from the tree, are merged with the nodes by their lines.
+    """
 
-        return nodes_with_newline
+    ast: GherkinDocument
+    step_keyword_alignment: AlignmentMode
+    tag_line_mode: TagLineMode
+    indent: str
+    # The width of the longest step keyword of the whole document. It needs to be
+    # given when `ast` only contains a part of the document.
+    step_keyword_width: Optional[int] = attrib(default=None, kw_only=True)
 
-    def __find_nodes_within_rules(self) -> Set[Node]:
-        nodes_within_rules: Set[Node] = set()
+    __max_step_keyword_width: int = attrib(init=False)
 
-        feature = self.ast.feature
-        if feature is not None:
-            for child in feature.children:
-                if child.rule is not None:
-                    for node in child.rule:
-                        if not isinstance(node, Rule):
-                            nodes_within_rules.add(node)
+    @classmethod
+    def from_options(
+        cls,
+        ast: GherkinDocument,
+        options: Options,
+        *,
+        step_keyword_width: Optional[int] = None,
+    ) -> "LineGenerator":
+        return cls(
+            ast,
+            options.step_keyword_alignment,
+            options.tag_line_mode,
+            options.indent,
+            step_keyword_width=step_keyword_width,
+        )
 
-        return nodes_within_rules
+    def __attrs_post_init__(self):
+        # Use `__attrs_post_init__` instead of `property` to avoid re-computing attributes
+        self.__max_step_keyword_width = self.__find_max_step_keyword_width()
 
     def __find_max_step_keyword_width(self) -> int:
         """
@@ -397,141 +293,305 @@ class LineGenerator:
             # We don't need to align step keywords in this case.
             return 0
 
-        step_keyword_widths = [
-            get_display_width(node.keyword.strip())
-            for node in self.ast
-            if isinstance(node, Step)
-        ]
-        if not step_keyword_widths:
-            return 0
+        if self.step_keyword_width is not None:
+            return self.step_keyword_width
 
-        return max(step_keyword_widths)
+        return find_max_step_keyword_width(self.ast)
 
-    def __add_language_header(self) -> None:
+    def generate(self) -> Lines:
+        for _, lines in self.__generate_chunks():
+            yield from lines
+
+    def generate_blocks(
+        self, block_starts: Sequence[int], end_line: int
+    ) -> Iterator[List[str]]:
         """
-        Add a language header if the Feature language is not English.
+        Generate the lines of consecutive blocks of the source document, which start
+        at the lines `block_starts`. The last block ends at the line `end_line`. The
+        nodes outside of the blocks are skipped.
         """
-
-        # Exit if the language is English or if there is no Feature node
-        feature = self.ast.feature
-        if not feature:
-            return
-        language = feature.language
-        if language == "en":
+        if not block_starts:
             return
 
-        # Register the language header
-        language_header = generate_language_header(language)
-        self.__nodes.insert(0, language_header)
-        self.__nodes_with_newline.add(language_header)
-        self.__contexts[language_header] = self.ast.feature
+        block_lines: List[str] = []
+        next_index = 1
+        next_start = block_starts[1] if len(block_starts) > 1 else end_line + 1
+
+        for line, lines in self.__generate_chunks():
+            if line < block_starts[0]:
+                continue
+
+            while line >= next_start and next_index < len(block_starts):
+                yield block_lines
+                block_lines = []
+                next_index += 1
+                next_start = (
+                    block_starts[next_index]
+                    if next_index < len(block_starts)
+                    else end_line + 1
+                )
 
-    @overload
-    def get_indent_level(self, node: Node) -> int:
-        pass
+            if line > end_line:
+                break
 
-    @overload
-    def get_indent_level(self, node: Node, *, default: Optional[int]) -> Optional[int]:
-        pass
+            block_lines.extend(lines)
 
-    def get_indent_level(self, node: Node, *, default=0):
-        indent_level = INDENT_LEVEL_MAP.get(type(node), default)
+        yield block_lines
+        # Yield the remaining blocks, which are empty
+        for _ in range(next_index, len(block_starts)):
+            yield []
 
-        if indent_level is not None and node in self.__nodes_within_rules:
-            indent_level += 1
+    def __generate_chunks(self) -> Iterator[Tuple[int, List[str]]]:
+        chunks = self.__walk_document()
 
-        return indent_level
+        previous = next(chunks, None)
+        if previous is None:
+            return
 
-    def generate(self) -> Lines:
-        for node in self.__nodes:
-            yield from self.visit(node)
+        for chunk in chunks:
+            line, lines, newline = previous
+            if newline:
+                lines.append("")
+            yield line, lines
+
+            previous = chunk
 
-            if node in self.__nodes_with_newline:
-                yield ""
+        # Add an empty line after the last node, so that we have an empty line at the
+        # end of the document
+        line, lines, _ = previous
+        lines.append("")
+        yield line, lines
 
-    def visit(self, node: Node) -> Lines:
-        class_name = type(node).__name__
+    def __walk_document(self) -> Iterator[Chunk]:
+        comments = CommentIndex(self.ast.comments)
 
-        visit_method: Callable[[Node], Lines] = getattr(
-            self,
-            f"visit_{camel_to_snake_case(class_name)}",
-            self.visit_default,
+        feature = self.ast.feature
+        if feature is not None:
+            # Add a language header if the Feature language is not English
+            if feature.language != "en":
+                language_header = generate_language_header(feature.language)
+                yield language_header.location.line, [language_header.text], True
+
+            yield from self.__walk_feature(feature, comments)
+
+        # The comments at the end of the document are not indented
+        if comments.next_line < math.inf:
+            yield from comments.place_before(math.inf, "")
+
+    def __chunk(
+        self,
+        comments: "CommentIndex",
+        line: int,
+        indent_level: int,
+        lines: List[str],
+        newline: bool = False,
+    ) -> Iterator[Chunk]:
+        """
+        Generate a chunk for a node, after the comments before it. The comments
+        have the same indent level as the node.
+        """
+        if comments.next_line < line:
+            yield from comments.place_before(line, self.indent * indent_level)
+
+        yield line, lines, newline
+
+    def __keyword_chunk(
+        self,
+        comments: "CommentIndex",
+        node: Union[Feature, Rule, Background, Scenario, Examples],
+        indent_level: int,
+        newline: bool = False,
+    ) -> Iterator[Chunk]:
+        lines = [
+            generate_keyword_line(node.keyword, node.name, self.indent, indent_level)
+        ]
+        lines.extend(
+            generate_description_lines(node.description, self.indent, indent_level + 1)
         )
 
-        yield from visit_method(node)
+        return self.__chunk(comments, node.location.line, indent_level, lines, newline)
 
-    def visit_default(self, node: Node) -> Lines:
-        indent_level = self.get_indent_level(node)
+    def __walk_tags(
+        self,
+        comments: "CommentIndex",
+        tags: Sequence[Tag],
+        indent_level: int,
+    ) -> Iterator[Chunk]:
+        """
+        The tags have the same indentation as the node they belong to.
+        """
+        if not tags:
+            return
 
-        if hasattr(node, "keyword") and hasattr(node, "name"):
-            yield generate_keyword_line(
-                node.keyword,  # type: ignore
-                node.name,  # type: ignore
-                self.indent,
+        indent = self.indent * indent_level
+
+        if self.tag_line_mode is TagLineMode.SINGLELINE:
+            # Render the tags on a single line, at the position of the last tag
+            line_content = " ".join(tag.name for tag in tags)
+            yield from self.__chunk(
+                comments,
+                tags[-1].location.line,
                 indent_level,
+                [f"{indent}{line_content}"],
             )
+        else:
+            for tag in tags:
+                yield from self.__chunk(
+                    comments,
+                    tag.location.line,
+                    indent_level,
+                    [f"{indent}{tag.name}"],
+                )
 
-        if hasattr(node, "description"):
-            yield from generate_description_lines(
-                node.description,  # type: ignore
-                self.indent,
-                indent_level + 1,
-            )
+    def __walk_feature(
+        self, feature: Feature, comments: "CommentIndex"
+    ) -> Iterator[Chunk]:
+        indent_level = INDENT_LEVEL_MAP[Feature]
 
-    def visit_step(self, step: Step) -> Lines:
-        yield generate_step_line(
-            step,
-            self.step_keyword_alignment,
-            self.indent,
-            self.get_indent_level(step),
-            keyword_padding_width=self.__max_step_keyword_width,
+        yield from self.__walk_tags(comments, feature.tags, indent_level)
+        # We want to add a newline after the Feature line, even if it does not have
+        # a description. If it has a description, we already add a newline after it.
+        yield from self.__keyword_chunk(
+            comments, feature, indent_level, newline=not feature.description
         )
 
-    def visit_tag(self, tag: Tag) -> Lines:
-        context = self.__contexts[tag]
-
-        indent_level = self.get_indent_level(context)
+        for child in feature.children:
+            if child.background is not None:
+                yield from self.__walk_background(child.background, comments, 0)
+            if child.scenario is not None:
+                yield from self.__walk_scenario(child.scenario, comments, 0)
+            if child.rule is not None:
+                yield from self.__walk_rule(child.rule, comments)
 
-        yield f"{self.indent * indent_level}{tag.name}"
+    def __walk_rule(self, rule: Rule, comments: "CommentIndex") -> Iterator[Chunk]:
+        indent_level = INDENT_LEVEL_MAP[Rule]
 
-    def visit_tag_group(self, tag_group: TagGroup) -> Lines:
-        context = self.__contexts[tag_group]
+        yield from self.__walk_tags(comments, rule.tags, indent_level)
+        yield from self.__keyword_chunk(
+            comments, rule, indent_level, newline=not rule.description
+        )
 
-        indent_level = self.get_indent_level(context)
+        # The nodes within a rule are indented one more level
+        for child in rule.children:
+            if child.background is not None:
+                yield from self.__walk_background(child.background, comments, 1)
+            if child.scenario is not None:
+                yield from self.__walk_scenario(child.scenario, comments, 1)
+
+    def __walk_background(
+        self,
+        background: Background,
+        comments: "CommentIndex",
+        rule_level: int,
+    ) -> Iterator[Chunk]:
+        indent_level = INDENT_LEVEL_MAP[Background] + rule_level
+
+        yield from self.__keyword_chunk(comments, background, indent_level)
+        yield from self.__walk_steps(background.steps, comments, rule_level)
+
+    def __walk_scenario(
+        self,
+        scenario: Scenario,
+        comments: "CommentIndex",
+        rule_level: int,
+    ) -> Iterator[Chunk]:
+        indent_level = INDENT_LEVEL_MAP[Scenario] + rule_level
+
+        yield from self.__walk_tags(comments, scenario.tags, indent_level)
+        yield from self.__keyword_chunk(comments, scenario, indent_level)
+        yield from self.__walk_steps(scenario.steps, comments, rule_level)
+
+        for examples in scenario.examples:
+            yield from self.__walk_examples(examples, comments, rule_level)
+
+    def __walk_steps(
+        self,
+        steps: Sequence[Step],
+        comments: "CommentIndex",
+        rule_level: int,
+    ) -> Iterator[Chunk]:
+        """
+        Add an empty line after the last step, including its argument, if any.
+        """
+        indent_level = INDENT_LEVEL_MAP[Step] + rule_level
+        last_step = steps[-1] if steps else None
 
-        line_content = " ".join(tag.name for tag in tag_group.members)
+        for step in steps:
+            is_last = step is last_step
+            doc_string = step.doc_string
+            data_table = step.data_table
 
-        yield f"{self.indent * indent_level}{line_content}"
+            yield from self.__chunk(
+                comments,
+                step.location.line,
+                indent_level,
+                [
+                    generate_step_line(
+                        step,
+                        self.step_keyword_alignment,
+                        self.indent,
+                        indent_level,
+                        keyword_padding_width=self.__max_step_keyword_width,
+                    )
+                ],
+                newline=is_last and doc_string is None and data_table is None,
+            )
 
-    def visit_table_row(self, row: TableRow) -> Lines:
-        context = self.__contexts[row]
+            if doc_string is not None:
+                doc_string_indent_level = INDENT_LEVEL_MAP[DocString] + rule_level
+                yield from self.__chunk(
+                    comments,
+                    doc_string.location.line,
+                    doc_string_indent_level,
+                    generate_doc_string_lines(
+                        doc_string, self.indent, doc_string_indent_level
+                    ),
+                    newline=is_last and data_table is None,
+                )
 
-        yield context
+            if data_table is not None:
+                yield from self.__walk_table(
+                    data_table.rows, comments, rule_level, newline=is_last
+                )
 
-    def visit_comment(self, comment: Comment) -> Lines:
-        context = self.__contexts[comment]
+    def __walk_examples(
+        self,
+        examples: Examples,
+        comments: "CommentIndex",
+        rule_level: int,
+    ) -> Iterator[Chunk]:
+        """
+        Add an empty line after an examples table.
+        """
+        indent_level = INDENT_LEVEL_MAP[Examples] + rule_level
+        rows = extract_rows(examples)
 
-        # Find the indent level of this comment line
-        if context is None:
-            # In this case, this comment line is the last line of the document
-            indent_level: Optional[int] = 0
-        else:
-            # Try to look for the indent level of the context in the mapping. If not
-            # successful, then we use the same amount of white spaces to indent as
-            # the next line.
-            indent_level = self.get_indent_level(context, default=None)
-
-        if indent_level is None:
-            next_line = next(self.visit(context))
-            indent = extract_beginning_spaces(next_line)
-        else:
-            indent = self.indent * indent_level
+        yield from self.__walk_tags(comments, examples.tags, indent_level)
+        yield from self.__keyword_chunk(
+            comments, examples, indent_level, newline=not rows
+        )
+        yield from self.__walk_table(rows, comments, rule_level, newline=True)
+
+    def __walk_table(
+        self,
+        rows: Sequence[TableRow],
+        comments: "CommentIndex",
+        rule_level: int,
+        *,
+        newline: bool,
+    ) -> Iterator[Chunk]:
+        """
+        The columns in a table are padded to have the same widths across all rows,
+        so the widths of all cells are computed before the first row is generated.
+        The rows themselves are reformatted one by one.
+        """
+        indent = self.indent * (INDENT_LEVEL_MAP[TableRow] + rule_level)
+        last_row = rows[-1] if rows else None
 
-        yield f"{indent}{comment.text}"
+        for row, line in zip(rows, iter_table_lines(rows, indent)):
+            # The same as `self.__chunk`, inlined since tables can be very large
+            row_line = row.location.line
+            if comments.next_line < row_line:
+                yield from comments.place_before(row_line, indent)
 
-    def visit_doc_string(self, docstring: DocString) -> Lines:
-        yield from generate_doc_string_lines(
-            docstring,
-            self.indent,
-            self.get_indent_level(docstring),
-        )
+            yield row_line, [line], newline and row is last_row
@@ -0,0 +1,296 @@
+from bisect import bisect_right
+from itertools import chain
+from typing import List, Optional, Sequence, Tuple
+
+from attr import attrib, dataclass
+
+from .ast_node import Background, GherkinDocument, Rule
+from .errors import DeserializeError, InvalidInput
+from .formatter import LineGenerator, find_max_step_keyword_width
+from .options import AlignmentMode, Options
+from .parser import parse
+from .ranges import BlockNode, iter_blocks
+
+# The first line, the node, and the keyword of the parent Rule of a block
+BlockSpec = Tuple[int, Optional[BlockNode], Optional[str]]
+
+
+@dataclass(frozen=True)
+class Block:
+    """
+    A top-level block of a document, as described in
+    :func:`~reformat_gherkin.ranges.find_block_starts`, and its reformatted lines.
+    """
+
+    # The first line of the block in the source document
+    start: int
+    # `None` for the first block, which contains the Feature line
+    node: Optional[BlockNode]
+    # The keyword of the Rule which contains the block, if any
+    rule_keyword: Optional[str]
+    step_keyword_width: int
+    lines: List[str]
+
+
+@dataclass
+class IncrementalFormatter:
+    """
+    Reformat successive versions of a document, for example, while it is edited.
+
+    The formatter keeps the source lines, and the reformatted lines of each
+    top-level block of the previous version. When a new version is given, only the
+    blocks which overlap the changed lines are parsed and reformatted again. The
+    whole document is parsed and reformatted when a change is not limited to
+    Scenario and Background blocks, or when it changes the width of the longest step
+    keyword, which is used to align the step keywords of the whole document.
+    """
+
+    options: Options
+
+    _src_lines: List[str] = attrib(init=False, factory=list)
+    _blocks: List[Block] = attrib(init=False, factory=list)
+    _dst_contents: str = attrib(init=False, default="")
+    _language: str = attrib(init=False, default="en")
+    _feature_keyword: str = attrib(init=False, default="Feature")
+    _step_keyword_width: int = attrib(init=False, default=0)
+
+    def format_str(self, src_contents: str) -> str:
+        """
+        Reformat a string and return the new contents, like
+        :func:`~reformat_gherkin.core.format_str`. The same errors are raised if
+        the string is not a valid Gherkin document, and the state of the formatter
+        is left unchanged in that case.
+        """
+        src_lines = src_contents.split("\n")
+        if self._blocks and src_lines == self._src_lines:
+            return self._dst_contents
+
+        if not self._blocks or not self.__format_changed_blocks(src_lines):
+            self.__format_all(src_contents, src_lines)
+
+        self._src_lines = src_lines
+        self._dst_contents = "\n".join(
+            chain.from_iterable(block.lines for block in self._blocks)
+        )
+
+        return self._dst_contents
+
+    def __format_all(self, src_contents: str, src_lines: List[str]) -> None:
+        ast = parse(src_contents)
+
+        specs: List[BlockSpec] = [(1, None, None)]
+        specs.extend(
+            (first_line, node, None if rule is None else rule.keyword)
+            for first_line, node, rule in iter_blocks(ast)
+        )
+        step_keyword_width = max(get_step_keyword_width(node) for _, node, _ in specs)
+
+        self._blocks = self.__render_blocks(
+            ast, specs, len(src_lines), step_keyword_width
+        )
+        self._step_keyword_width = step_keyword_width
+
+        feature = ast.feature
+        if feature is not None:
+            self._language = feature.language
+            self._feature_keyword = feature.keyword
+
+    def __format_changed_blocks(self, src_lines: List[str]) -> bool:
+        """
+        Reformat the blocks which overlap the lines changed since the previous
+        version. Return False if the whole document needs to be reformatted instead.
+        """
+        old_src_lines = self._src_lines
+        blocks = self._blocks
+
+        prefix, suffix = find_changed_lines(old_src_lines, src_lines)
+
+        # Also reformat the blocks of the lines right before and after the change.
+        # The comments at the end of a block are indented like the first line of
+        # the next block, and a change can split a block, or merge it with the next
+        # one.
+        block_starts = [block.start for block in blocks]
+        first = bisect_right(block_starts, max(prefix, 1)) - 1
+        last = bisect_right(block_starts, len(old_src_lines) - suffix + 1) - 1
+
+        # The first block can change the language of the document, and a Rule
+        # changes the indentation of the blocks after it.
+        if first == 0 or any(
+            isinstance(block.node, Rule) for block in blocks[first : last + 1]
+        ):
+            return False
+
+        offset = len(src_lines) - len(old_src_lines)
+        next_start: Optional[int] = None
+        end_line = context_end_line = len(src_lines)
+        if last + 1 < len(blocks):
+            next_block = blocks[last + 1]
+            next_start = next_block.start + offset
+            end_line = next_start - 1
+            # The next block is parsed up to its keyword line, which is what the
+            # comments at the end of the changed blocks need.
+            context_end_line = next_block.node.location.line + offset  # type: ignore
+
+        parsed = self.__parse_blocks(
+            src_lines, first, end_line, context_end_line, next_start
+        )
+        if parsed is None:
+            return False
+        ast, specs = parsed
+
+        step_keyword_width = max(
+            chain(
+                (get_step_keyword_width(node) for _, node, _ in specs),
+                (block.step_keyword_width for block in blocks[:first]),
+                (block.step_keyword_width for block in blocks[last + 1 :]),
+            )
+        )
+        if (
+            self.options.step_keyword_alignment is not AlignmentMode.NONE
+            and step_keyword_width != self._step_keyword_width
+        ):
+            return False
+
+        changed_blocks = self.__render_blocks(ast, specs, end_line, step_keyword_width)
+
+        next_blocks = blocks[last + 1 :]
+        if offset:
+            next_blocks = [
+                Block(
+                    block.start + offset,
+                    block.node,
+                    block.rule_keyword,
+                    block.step_keyword_width,
+                    block.lines,
+                )
+                for block in next_blocks
+            ]
+
+        self._blocks = blocks[:first] + changed_blocks + next_blocks
+        self._step_keyword_width = step_keyword_width
+
+        return True
+
+    def __parse_blocks(
+        self,
+        src_lines: List[str],
+        first: int,
+        end_line: int,
+        context_end_line: int,
+        next_start: Optional[int],
+    ) -> Optional[Tuple[GherkinDocument, List[BlockSpec]]]:
+        """
+        Parse the blocks from the start of the block at the index `first` to
+        `end_line`, and the beginning of the next block, which starts at
+        `next_start`. Return None if the blocks cannot be parsed on their own, or
+        don't fit between the blocks around them.
+        """
+        blocks = self._blocks
+        start_line = blocks[first].start
+
+        # The blocks need to be wrapped in a Feature, and in a Rule if they belong
+        # to one. The locations of the nodes are the same as in the whole document.
+        rule_keyword = blocks[first].rule_keyword
+        header_lines = [f"{self._feature_keyword}:"]
+        if self._language != "en":
+            header_lines.insert(0, f"# language: {self._language}")
+        if rule_keyword is not None:
+            header_lines.append(f"{rule_keyword}:")
+
+        try:
+            ast = parse(
+                "\n".join(header_lines + src_lines[start_line - 1 : context_end_line]),
+                first_line=start_line - len(header_lines),
+            )
+        except (InvalidInput, DeserializeError):
+            # The error is reported by parsing the whole document
+            return None
+
+        specs: List[BlockSpec] = []
+        context_starts = []
+        for first_line, node, _ in iter_blocks(ast):
+            if first_line < start_line:
+                # This is the Rule which wraps the blocks
+                continue
+            if first_line > end_line:
+                context_starts.append(first_line)
+            else:
+                specs.append((first_line, node, rule_keyword))
+
+        expected_context_starts = [] if next_start is None else [next_start]
+        if (
+            not specs
+            or specs[0][0] != start_line
+            or context_starts != expected_context_starts
+            or any(isinstance(node, Rule) for _, node, _ in specs)
+        ):
+            return None
+
+        # A Background is only valid as the first block of a Feature or a Rule
+        if isinstance(specs[0][1], Background) and not (
+            isinstance(blocks[first - 1].node, Rule)
+            or (first == 1 and rule_keyword is None)
+        ):
+            return None
+
+        return ast, specs
+
+    def __render_blocks(
+        self,
+        ast: GherkinDocument,
+        specs: Sequence[BlockSpec],
+        end_line: int,
+        step_keyword_width: int,
+    ) -> List[Block]:
+        """
+        Reformat the blocks starting at the given lines of `ast`. The last block
+        ends at `end_line`.
+        """
+        line_generator = LineGenerator.from_options(
+            ast, self.options, step_keyword_width=step_keyword_width
+        )
+        blocks = line_generator.generate_blocks(
+            [first_line for first_line, _, _ in specs], end_line
+        )
+
+        return [
+            Block(
+                first_line,
+                node,
+                rule_keyword,
+                get_step_keyword_width(node),
+                block_lines,
+            )
+            for (first_line, node, rule_keyword), block_lines in zip(specs, blocks)
+        ]
+
+
+def get_step_keyword_width(node: Optional[BlockNode]) -> int:
+    """
+    Get the width of the longest step keyword in a Background or a Scenario.
+    """
+    if node is None or isinstance(node, Rule):
+        return 0
+
+    return find_max_step_keyword_width(node)
+
+
+def find_changed_lines(old_lines: List[str], new_lines: List[str]) -> Tuple[int, int]:
+    """
+    Count the lines which are common to the beginning, and to the end of two
+    versions of a document. The lines in between have changed.
+    """
+    max_common = min(len(old_lines), len(new_lines))
+
+    prefix = 0
+    while prefix < max_common and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while (
+        suffix < max_common - prefix
+        and old_lines[-suffix - 1] == new_lines[-suffix - 1]
+    ):
+        suffix += 1
+
+    return prefix, suffix
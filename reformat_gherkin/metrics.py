@@ -0,0 +1,198 @@
+import heapq
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from attr import asdict, attrib, dataclass
+
+from .profiling import memory_checkpoint, tracing_memory
+
+# The number of slowest files listed in the summary of a run
+SLOWEST_FILE_COUNT = 10
+
+
+@dataclass
+class FileMetrics:
+    """
+    The metrics of reformatting a single file. The time spent in each phase is in
+    seconds.
+    """
+
+    path: str
+    worker: int = attrib(factory=os.getpid)
+    # "hit" or "miss" if the cache of formatted files is used
+    cache: Optional[str] = None
+    changed: Optional[bool] = None
+    error: Optional[str] = None
+    bytes_in: int = 0
+    bytes_out: int = 0
+    lines: int = 0
+    nodes: int = 0
+    phases: Dict[str, float] = attrib(factory=dict)
+    # The peak of the traced memory, and the sites which allocated the most memory,
+    # if the memory is traced
+    memory_peak: Optional[int] = None
+    memory_top: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.phases.values())
+
+
+@dataclass(frozen=True)
+class MetricsOptions:
+    """
+    What to record in the metrics of the files reformatted by a worker.
+    """
+
+    # The state of the files in the cache of formatted files, if it is used
+    cache: Optional[str] = None
+    trace_memory: bool = False
+
+
+_current_metrics: "ContextVar[Optional[FileMetrics]]" = ContextVar(
+    "current_metrics", default=None
+)
+
+
+def current_metrics() -> Optional[FileMetrics]:
+    """
+    Return the metrics of the file being reformatted, or None if the metrics are
+    not recorded.
+    """
+    return _current_metrics.get()
+
+
+@contextmanager
+def recording(metrics: Optional[FileMetrics]) -> Iterator[Optional[FileMetrics]]:
+    """
+    Record the metrics of the code in the context to `metrics`. Nothing is
+    recorded if `metrics` is None.
+    """
+    token = _current_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_metrics.reset(token)
+
+
+@contextmanager
+def recording_memory(metrics: FileMetrics) -> Iterator[None]:
+    """
+    Record the peak of the memory allocated in the context, and the sites which
+    allocated the most memory, to `metrics`.
+    """
+    with tracing_memory() as trace:
+        yield
+
+    metrics.memory_peak = trace.peak_size
+    metrics.memory_top = trace.top_sites
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """
+    Add the time spent in the context to a phase of the current metrics.
+    """
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.phases[phase] = metrics.phases.get(phase, 0.0) + elapsed
+        memory_checkpoint()
+
+
+def get_stream_size(stream: IO[Any]) -> int:
+    """
+    Return the position of a stream, which is its size once it has been read or
+    written, or 0 if the stream is not seekable.
+    """
+    try:
+        return stream.tell()
+    except (OSError, ValueError):
+        return 0
+
+
+class MetricsWriter:
+    """
+    Write the metrics of each reformatted file as a line of JSON, followed by a
+    summary of the run when closed.
+    """
+
+    def __init__(self, path: Path):
+        self._file = open(path, "w", encoding="utf-8")
+        self._start = time.perf_counter()
+        self._totals: Dict[str, int] = dict.fromkeys(
+            [
+                "files",
+                "changed",
+                "failed",
+                "cache_hits",
+                "cache_misses",
+                "bytes_in",
+                "bytes_out",
+                "lines",
+                "nodes",
+            ],
+            0,
+        )
+        self._memory_peak: Optional[int] = None
+        self._phases: Dict[str, float] = {}
+        self._slowest: List[Tuple[float, str]] = []
+
+    def write(self, metrics: FileMetrics) -> None:
+        record = {"type": "file", **asdict(metrics), "seconds": metrics.seconds}
+        self._file.write(json.dumps(record) + "\n")
+
+        totals = self._totals
+        totals["files"] += 1
+        totals["changed"] += bool(metrics.changed)
+        totals["failed"] += metrics.error is not None
+        totals["cache_hits"] += metrics.cache == "hit"
+        totals["cache_misses"] += metrics.cache == "miss"
+        totals["bytes_in"] += metrics.bytes_in
+        totals["bytes_out"] += metrics.bytes_out
+        totals["lines"] += metrics.lines
+        totals["nodes"] += metrics.nodes
+        if metrics.memory_peak is not None:
+            self._memory_peak = max(self._memory_peak or 0, metrics.memory_peak)
+        for phase, seconds in metrics.phases.items():
+            self._phases[phase] = self._phases.get(phase, 0.0) + seconds
+
+        item = (metrics.seconds, metrics.path)
+        if len(self._slowest) < SLOWEST_FILE_COUNT:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heappushpop(self._slowest, item)
+
+    def close(self) -> None:
+        summary = {
+            "type": "summary",
+            **self._totals,
+            "seconds": sum(self._phases.values()),
+            "wall_seconds": time.perf_counter() - self._start,
+            "phases": self._phases,
+            "memory_peak": self._memory_peak,
+            "slowest": [
+                {"path": path, "seconds": seconds}
+                for seconds, path in sorted(self._slowest, reverse=True)
+            ],
+        }
+        self._file.write(json.dumps(summary) + "\n")
+        self._file.close()
+
+    def __enter__(self) -> "MetricsWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
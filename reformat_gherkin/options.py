@@ -1,8 +1,11 @@
 from enum import Enum, unique
-from typing import Optional
+from typing import Optional, Tuple
 
 from attr import dataclass
 
+# A range of lines, 1-based and inclusive
+LineRange = Tuple[int, int]
+
 
 @unique
 class WriteBackMode(Enum):
@@ -58,3 +61,5 @@ class Options:
     tag_line_mode: TagLineMode
     fast: bool
     indent: str
+    # If not empty, only the blocks overlapping these ranges are reformatted
+    line_ranges: Tuple[LineRange, ...] = ()
@@ -1,41 +1,210 @@
 import io
+import re
 import textwrap
-from typing import Any, Dict, Type, TypeVar
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
-from cattr.converters import Converter
 from gherkin.errors import ParserError
 from gherkin.parser import Parser
 from gherkin.token_scanner import TokenScanner
 
-from .ast_node.gherkin_document import GherkinDocument
+from .ast_node import (
+    Background,
+    Comment,
+    DataTable,
+    DocString,
+    Examples,
+    Feature,
+    GherkinDocument,
+    Location,
+    Rule,
+    Scenario,
+    Step,
+    TableCell,
+    TableRow,
+    Tag,
+)
+from .ast_node.feature import FeatureChildren
+from .ast_node.rule import RuleChildren
 from .errors import DeserializeError, InvalidInput
-from .utils import camel_to_snake_case, remove_trailing_spaces
+from .utils import remove_trailing_spaces
 
 T = TypeVar("T")
 
 
-class CustomConverter(Converter):
-    def structure_attrs_fromdict(self, obj: Dict[str, Any], cls: Type[T]) -> T:
-        # Note that keys are in camelCase convention, for example, tableHeader,
-        # tableBody. Therefore, we need to convert the keys to snake_case.
-        transformed_obj = {}
-        for key, value in obj.items():
-            if isinstance(value, str):
-                # For some types of node, the indentation of the lines is included
-                # in the value of such nodes. Then the indentation can be changed after
-                # formatting. Therefore, we need to dedent the value here for consistent
-                # results. We also need to remove trailing spaces.
-                value = remove_trailing_spaces(value)
-                value = textwrap.dedent(value)
-
-            transformed_obj[camel_to_snake_case(key)] = value
-
-        return super(CustomConverter, self).structure_attrs_fromdict(
-            transformed_obj, cls
-        )
+# The characters which are considered line boundaries by `str.splitlines`
+_line_boundary_re = re.compile("[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+
 
+def normalize_text(value: str) -> str:
+    """
+    Remove trailing spaces and the common indentation of the lines in a value.
 
-converter = CustomConverter()
+    For some types of node, the indentation of the lines is included in the value
+    of such nodes. Then the indentation can be changed after formatting. Therefore,
+    we need to dedent the value for consistent results.
+    """
+    return textwrap.dedent(remove_trailing_spaces(value))
+
+
+def normalize_line(value: str) -> str:
+    """
+    A faster equivalent of :func:`normalize_text` for values that usually consist of
+    a single line, such as names, keywords, and table cells.
+    """
+    if _line_boundary_re.search(value) is None:
+        return value.rstrip().lstrip(" \t")
+
+    return normalize_text(value)
+
+
+# The attrs plugin of mypy doesn't see that the classes decorated by `prepare` are
+# attrs classes, so their constructors are not type checked.
+def build_document(obj: Dict[str, Any]) -> GherkinDocument:
+    """
+    Build an AST from the result of the Gherkin parser. This is equivalent to
+    `converter.structure(obj, GherkinDocument)`, but much faster, since only the
+    values which can span multiple lines are dedented.
+    """
+    feature = obj.get("feature")
+
+    return GherkinDocument(  # type: ignore
+        comments=tuple(_build_comment(comment) for comment in obj["comments"]),
+        feature=None if feature is None else _build_feature(feature),
+    )
+
+
+def _build_location(obj: Dict[str, Any]) -> Location:
+    return Location(obj["line"], obj["column"])  # type: ignore
+
+
+def _build_comment(obj: Dict[str, Any]) -> Comment:
+    return Comment(  # type: ignore
+        location=_build_location(obj["location"]),
+        text=normalize_line(obj["text"]),
+    )
+
+
+def _build_tags(objs: List[Dict[str, Any]]) -> Tuple[Tag, ...]:
+    return tuple(
+        Tag(  # type: ignore
+            location=_build_location(obj["location"]),
+            name=normalize_line(obj["name"]),
+        )
+        for obj in objs
+    )
+
+
+def _build_feature(obj: Dict[str, Any]) -> Feature:
+    return Feature(  # type: ignore
+        location=_build_location(obj["location"]),
+        language=normalize_line(obj["language"]),
+        keyword=normalize_line(obj["keyword"]),
+        name=normalize_line(obj["name"]),
+        children=tuple(
+            FeatureChildren(  # type: ignore
+                background=_build_optional(_build_background, child.get("background")),
+                scenario=_build_optional(_build_scenario, child.get("scenario")),
+                rule=_build_optional(_build_rule, child.get("rule")),
+            )
+            for child in obj["children"]
+        ),
+        tags=_build_tags(obj["tags"]),
+        description=normalize_text(obj["description"]),
+    )
+
+
+def _build_rule(obj: Dict[str, Any]) -> Rule:
+    return Rule(  # type: ignore
+        location=_build_location(obj["location"]),
+        keyword=normalize_line(obj["keyword"]),
+        name=normalize_line(obj["name"]),
+        tags=_build_tags(obj["tags"]),
+        children=tuple(
+            RuleChildren(  # type: ignore
+                background=_build_optional(_build_background, child.get("background")),
+                scenario=_build_optional(_build_scenario, child.get("scenario")),
+            )
+            for child in obj["children"]
+        ),
+        description=normalize_text(obj["description"]),
+    )
+
+
+def _build_background(obj: Dict[str, Any]) -> Background:
+    return Background(  # type: ignore
+        location=_build_location(obj["location"]),
+        keyword=normalize_line(obj["keyword"]),
+        name=normalize_line(obj["name"]),
+        steps=tuple(_build_step(step) for step in obj["steps"]),
+        description=normalize_text(obj["description"]),
+    )
+
+
+def _build_scenario(obj: Dict[str, Any]) -> Scenario:
+    return Scenario(  # type: ignore
+        location=_build_location(obj["location"]),
+        keyword=normalize_line(obj["keyword"]),
+        name=normalize_line(obj["name"]),
+        steps=tuple(_build_step(step) for step in obj["steps"]),
+        tags=_build_tags(obj["tags"]),
+        description=normalize_text(obj["description"]),
+        examples=tuple(_build_examples(examples) for examples in obj["examples"]),
+    )
+
+
+def _build_examples(obj: Dict[str, Any]) -> Examples:
+    return Examples(  # type: ignore
+        location=_build_location(obj["location"]),
+        keyword=normalize_line(obj["keyword"]),
+        name=normalize_line(obj["name"]),
+        tags=_build_tags(obj["tags"]),
+        description=normalize_text(obj["description"]),
+        table_body=tuple(_build_table_row(row) for row in obj["tableBody"]),
+        table_header=_build_optional(_build_table_row, obj.get("tableHeader")),
+    )
+
+
+def _build_step(obj: Dict[str, Any]) -> Step:
+    return Step(  # type: ignore
+        location=_build_location(obj["location"]),
+        keyword=normalize_line(obj["keyword"]),
+        text=normalize_line(obj["text"]),
+        data_table=_build_optional(_build_data_table, obj.get("dataTable")),
+        doc_string=_build_optional(_build_doc_string, obj.get("docString")),
+    )
+
+
+def _build_doc_string(obj: Dict[str, Any]) -> DocString:
+    return DocString(  # type: ignore
+        location=_build_location(obj["location"]),
+        content=normalize_text(obj["content"]),
+    )
+
+
+def _build_data_table(obj: Dict[str, Any]) -> DataTable:
+    return DataTable(  # type: ignore
+        location=_build_location(obj["location"]),
+        rows=tuple(_build_table_row(row) for row in obj["rows"]),
+    )
+
+
+def _build_table_row(obj: Dict[str, Any]) -> TableRow:
+    return TableRow(  # type: ignore
+        location=_build_location(obj["location"]),
+        cells=tuple(
+            TableCell(  # type: ignore
+                location=_build_location(cell["location"]),
+                value=normalize_line(cell["value"]),
+            )
+            for cell in obj["cells"]
+        ),
+    )
+
+
+def _build_optional(
+    build: Callable[[Dict[str, Any]], T], obj: Optional[Dict[str, Any]]
+) -> Optional[T]:
+    return None if obj is None else build(obj)
 
 
 # noinspection PyMissingConstructor
@@ -47,24 +216,36 @@ class StringOnlyTokenScanner(TokenScanner):
     treats large feature files as paths on the file system (bug #34).
     """
 
-    def __init__(self, content):
+    def __init__(self, content, first_line=1):
         self.io = io.StringIO(content)
-        self.line_number = 0
+        self.line_number = first_line - 1
+
+
+def __getattr__(name: str) -> Any:
+    # The cattrs-based converter is only used to check the AST builder, and cattrs
+    # is slow to import, so it is only imported when it is first used.
+    if name == "converter":
+        from .converter import converter
+
+        return converter
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def parse(content: str) -> GherkinDocument:
+def parse(content: str, *, first_line: int = 1) -> GherkinDocument:
     """
-    Parse the content of a file to an AST.
+    Parse the content of a file to an AST. The locations of the nodes are numbered
+    from `first_line`, which lets us parse a part of a document.
     """
     parser = Parser()
 
     try:
-        parse_result = parser.parse(StringOnlyTokenScanner(content))
+        parse_result = parser.parse(StringOnlyTokenScanner(content, first_line))
     except ParserError as e:
         raise InvalidInput(e) from e
 
     try:
-        result = converter.structure(parse_result, GherkinDocument)
+        result = build_document(parse_result)
     except Exception as e:
         raise DeserializeError(f"{type(e).__name__}: {e}") from e
 
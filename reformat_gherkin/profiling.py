@@ -0,0 +1,149 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+# cProfile and tracemalloc are imported in the functions which use them, since
+# this module is imported on every run, but they are only used with --profile-out
+# and --trace-memory.
+if TYPE_CHECKING:  # pragma: no cover
+    import cProfile
+    import tracemalloc
+
+# The number of allocation sites recorded for each file when tracing memory
+TOP_ALLOCATION_SITES = 10
+
+# Keeps the profiler of a worker process alive until the process exits
+_worker_profiler: "Optional[cProfile.Profile]" = None
+
+
+def get_profile_path(directory: Path, name: str) -> Path:
+    return directory / f"{name}-{os.getpid()}.prof"
+
+
+@contextmanager
+def profiling(directory: Optional[Path], name: str) -> Iterator[None]:
+    """
+    Profile the code in the context, and write the profile to a file in
+    `directory`. Nothing is profiled if `directory` is None.
+    """
+    if directory is None:
+        yield
+        return
+
+    import cProfile
+
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(get_profile_path(directory, name))
+
+
+def start_worker_profiling(directory: Path) -> None:
+    """
+    Profile a worker process until it exits, and write the profile to a file in
+    `directory`. This is meant to be the initializer of a process pool.
+    """
+    global _worker_profiler
+    import cProfile
+    from multiprocessing.util import Finalize
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    _worker_profiler = profiler
+
+    def write_profile() -> None:
+        profiler.disable()
+        profiler.dump_stats(get_profile_path(directory, "worker"))
+
+    # The finalizers are run when a worker process exits, unlike the atexit hooks
+    Finalize(None, write_profile, exitpriority=0)
+
+
+def get_top_sites(snapshot: "tracemalloc.Snapshot") -> List[Dict[str, Any]]:
+    """
+    Return the lines which allocated the most memory in a snapshot.
+    """
+    import tracemalloc
+
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    return [
+        {
+            "file": statistic.traceback[0].filename,
+            "line": statistic.traceback[0].lineno,
+            "size": statistic.size,
+            "count": statistic.count,
+        }
+        for statistic in snapshot.statistics("lineno")[:TOP_ALLOCATION_SITES]
+    ]
+
+
+class MemoryTrace:
+    """
+    Keep the top allocation sites at the end of the phase which holds the most
+    memory, since the memory is freed once a file is reformatted.
+    """
+
+    def __init__(self) -> None:
+        self.largest_size = -1
+        self.peak_size = 0
+        self.top_sites: List[Dict[str, Any]] = []
+
+    def checkpoint(self) -> None:
+        import tracemalloc
+
+        size, peak = tracemalloc.get_traced_memory()
+        self.peak_size = max(self.peak_size, peak)
+        if size <= self.largest_size:
+            return
+
+        self.largest_size = size
+        self.top_sites = get_top_sites(tracemalloc.take_snapshot())
+        # Leave the memory allocated to take the snapshot out of the peak. Before
+        # Python 3.9, the peak can include it.
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+
+_current_memory_trace: "ContextVar[Optional[MemoryTrace]]" = ContextVar(
+    "current_memory_trace", default=None
+)
+
+
+def memory_checkpoint() -> None:
+    """
+    Take a snapshot of the traced memory if it is the largest one of the current
+    memory trace.
+    """
+    trace = _current_memory_trace.get()
+    if trace is not None:
+        trace.checkpoint()
+
+
+@contextmanager
+def tracing_memory() -> Iterator[MemoryTrace]:
+    """
+    Trace the memory allocated in the context. The tracing is restarted, so that
+    the peak only covers the context.
+    """
+    import tracemalloc
+
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    tracemalloc.start()
+
+    trace = MemoryTrace()
+    token = _current_memory_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_memory_trace.reset(token)
+        _, peak = tracemalloc.get_traced_memory()
+        trace.peak_size = max(trace.peak_size, peak)
+        tracemalloc.stop()
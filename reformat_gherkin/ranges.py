@@ -0,0 +1,129 @@
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .ast_node import Background, GherkinDocument, Rule, Scenario
+from .formatter import LineGenerator
+from .options import LineRange, Options
+from .utils import iter_lines
+
+
+def parse_line_ranges(values: Iterable[str]) -> Tuple[LineRange, ...]:
+    """
+    Parse line ranges in the form of START-END, for example, 120-180. Raise
+    ValueError if a range is invalid.
+    """
+    line_ranges = []
+
+    for value in values:
+        start, sep, end = value.partition("-")
+        if not sep:
+            raise ValueError(
+                f"Incorrect --line-ranges format, expected START-END: {value}"
+            )
+
+        try:
+            line_range = int(start), int(end)
+        except ValueError:
+            raise ValueError(
+                f"Incorrect --line-ranges value, expected integer lines: {value}"
+            ) from None
+
+        if not 1 <= line_range[0] <= line_range[1]:
+            raise ValueError(
+                f"Incorrect --line-ranges value, expected 1 <= START <= END: {value}"
+            )
+
+        line_ranges.append(line_range)
+
+    return tuple(line_ranges)
+
+
+def find_block_starts(ast: GherkinDocument) -> List[int]:
+    """
+    Find the first lines of the top-level blocks of a document. The first block
+    consists of the Feature line, its tags and its description. Each Background,
+    Scenario, and Rule line, together with its tags, starts a new block. A block
+    ends right before the next block starts, so the comments and blank lines
+    between two blocks belong to the former one.
+    """
+    return [1] + [first_line for first_line, _, _ in iter_blocks(ast)]
+
+
+BlockNode = Union[Background, Scenario, Rule]
+
+
+def iter_blocks(
+    ast: GherkinDocument,
+) -> Iterator[Tuple[int, BlockNode, Optional[Rule]]]:
+    """
+    Iterate over the blocks after the Feature line and its description. For each
+    block, yield its first line, its node, and the Rule which contains the node, if
+    any.
+    """
+    feature = ast.feature
+    if feature is None:
+        return
+
+    for child in feature.children:
+        rule = child.rule
+        if rule is not None:
+            yield _get_first_line(rule), rule, None
+            for rule_child in rule.children:
+                node = rule_child.background or rule_child.scenario
+                if node is not None:
+                    yield _get_first_line(node), node, rule
+            continue
+
+        node = child.background or child.scenario
+        if node is not None:
+            yield _get_first_line(node), node, None
+
+
+def _get_first_line(node) -> int:
+    tags = getattr(node, "tags", ())
+    if tags:
+        return min(node.location.line, tags[0].location.line)
+
+    return node.location.line
+
+
+def format_line_ranges(
+    src_contents: str,
+    ast: GherkinDocument,
+    line_ranges: Sequence[LineRange],
+    *,
+    options: Options,
+) -> Tuple[str, Tuple[LineRange, ...]]:
+    """
+    Reformat the top-level blocks which overlap `line_ranges`, and keep the other
+    lines of `src_contents` as they are. `ast` is the AST of `src_contents`.
+
+    Return the new contents, and line ranges which overlap exactly the reformatted
+    blocks in the new contents, so that the same blocks can be reformatted again.
+    """
+    src_lines = list(iter_lines(src_contents))
+    block_starts = find_block_starts(ast)
+    block_ends = [start - 1 for start in block_starts[1:]] + [len(src_lines)]
+
+    line_generator = LineGenerator.from_options(ast, options)
+    blocks = line_generator.generate_blocks(block_starts, len(src_lines))
+
+    dst_lines: List[str] = []
+    dst_line_ranges: List[LineRange] = []
+
+    for start, end, block_lines in zip(block_starts, block_ends, blocks):
+        if end < start:
+            continue
+
+        if any(
+            range_start <= end and start <= range_end
+            for range_start, range_end in line_ranges
+        ):
+            dst_lines.extend(block_lines)
+            # Comments can be moved before the tags of a block after reformatting,
+            # which would then belong to the previous block. The last line always
+            # stays in the reformatted block, so we use it to identify the block.
+            dst_line_ranges.append((len(dst_lines), len(dst_lines)))
+        else:
+            dst_lines.extend(src_lines[start - 1 : end])
+
+    return "\n".join(dst_lines), tuple(dst_line_ranges)
@@ -1,34 +1,85 @@
+import time
+from enum import Enum, unique
 from pathlib import Path
+from typing import Any, Dict, List, Tuple
 
 import click
-from attr import dataclass
+from attr import attrib, dataclass
 
-from .utils import err, out
+# The messages about each file are written in batches, once this many messages
+# are buffered, or once the last batch was written this many seconds ago
+REPORT_BUFFER_SIZE = 256
+REPORT_FLUSH_INTERVAL = 0.5
+
+
+@unique
+class ReportFormat(Enum):
+    TEXT = "text"
+    JSON = "json"
 
 
 @dataclass
 class Report:
-    """Provides a reformatting counter. Can be rendered with `str(report)`."""
+    """Provides a reformatting counter. Can be rendered with `str(report)`.
+
+    The messages about each file are buffered, call `flush` to write them out.
+    """
 
     check: bool
+    quiet: bool = False
+    verbose: bool = False
+    format: ReportFormat = ReportFormat.TEXT
     change_count: int = 0
     same_count: int = 0
     failure_count: int = 0
+    # The paths are listed in the JSON summary. They are in the order the files
+    # were reformatted in, which depends on the worker processes.
+    changed: List[str] = attrib(factory=list, eq=False, repr=False)
+    unchanged: List[str] = attrib(factory=list, eq=False, repr=False)
+    failures: List[Tuple[str, str]] = attrib(factory=list, eq=False, repr=False)
+    _buffer: List[str] = attrib(factory=list, init=False, eq=False, repr=False)
+    _last_flush: float = attrib(factory=time.monotonic, init=False, eq=False)
 
     def done(self, path: str, changed: bool) -> None:
         """Increment the counter for successful reformatting. Write out a message."""
         if changed:
-            reformatted = "Would reformat" if self.check else "Reformatted"
-            out(f"{reformatted} {path}")
+            if self.verbose or not self.quiet:
+                reformatted = "Would reformat" if self.check else "Reformatted"
+                self._write(click.style(f"{reformatted} {path}", bold=True))
 
             self.change_count += 1
+            self.changed.append(path)
         else:
+            if self.verbose:
+                self._write(click.style(f"{path} is already well formatted", bold=True))
+
             self.same_count += 1
+            self.unchanged.append(path)
 
     def failed(self, path: Path, message: str) -> None:
         """Increment the counter for failed reformatting. Write out a message."""
-        err(f"Error: cannot format {path}: {message}")
+        self._write(click.style(f"Error: cannot format {path}: {message}", fg="red"))
         self.failure_count += 1
+        self.failures.append((str(path), message))
+
+    def _write(self, message: str) -> None:
+        if self.format is not ReportFormat.TEXT:
+            return
+
+        self._buffer.append(message)
+        if (
+            len(self._buffer) >= REPORT_BUFFER_SIZE
+            or time.monotonic() - self._last_flush >= REPORT_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Write out the buffered messages."""
+        if self._buffer:
+            click.echo("\n".join(self._buffer), err=True)
+            self._buffer.clear()
+
+        self._last_flush = time.monotonic()
 
     @property
     def return_code(self) -> int:
@@ -78,3 +129,21 @@ class Report:
                 click.style(f"{self.failure_count} file{s} {failed}", fg="red")
             )
         return ", ".join(report_lines) + "."
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a summary of the report, which can be serialized to JSON."""
+        return {
+            "check": self.check,
+            "changed": sorted(self.changed),
+            "unchanged": sorted(self.unchanged),
+            "failed": [
+                {"path": path, "message": message}
+                for path, message in sorted(self.failures)
+            ],
+            "counts": {
+                "changed": self.change_count,
+                "unchanged": self.same_count,
+                "failed": self.failure_count,
+            },
+            "exit_code": self.return_code,
+        }
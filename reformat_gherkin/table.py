@@ -0,0 +1,47 @@
+from array import array
+from typing import Iterator, List, Sequence
+
+from .ast_node import TableRow
+from .utils import get_display_width
+
+
+def measure_columns(rows: Sequence[TableRow]) -> List["array[int]"]:
+    """
+    Compute the display width of every cell of a table, once. The widths are kept
+    in a compact array per column.
+    """
+    if not rows:
+        return []
+
+    return [
+        array("L", [get_display_width(row.cells[column].value) for row in rows])
+        for column in range(len(rows[0].cells))
+    ]
+
+
+def iter_table_lines(rows: Sequence[TableRow], indent: str) -> Iterator[str]:
+    """
+    Generate the lines of a table, with `indent` before each line. The columns in a
+    table need to have the same width, so every cell is left-aligned and padded to
+    the width of the widest cell in its column.
+
+    The widths of the cells are computed before the first line is generated, and the
+    lines are generated one by one, so that a large table is never rendered in
+    memory as a whole.
+    """
+    cell_widths = measure_columns(rows)
+    column_widths = [max(widths) for widths in cell_widths]
+    columns = list(zip(column_widths, cell_widths))
+
+    for index, row in enumerate(rows):
+        if not columns:
+            yield f"{indent}|"
+            continue
+
+        cells = " | ".join(
+            [
+                cell.value + " " * (column_width - widths[index])
+                for cell, (column_width, widths) in zip(row.cells, columns)
+            ]
+        )
+        yield f"{indent}| {cells} |"
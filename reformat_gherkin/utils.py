@@ -1,19 +1,36 @@
-import difflib
+import codecs
 import io
 import re
-import tempfile
-import tokenize
+import threading
+from collections import OrderedDict
 from contextlib import nullcontext
 from functools import lru_cache, partial
 from pathlib import Path
-from typing import IO, AnyStr, BinaryIO, Tuple, Union
+from typing import (
+    IO,
+    AnyStr,
+    BinaryIO,
+    Generic,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 import click
-from wcwidth import wcswidth
+
+# difflib, tempfile, tokenize, and wcwidth are slow to import and only needed on
+# some paths, so they are imported in the functions which use them, to keep the
+# start-up of the command line fast.
 
 out = partial(click.secho, bold=True, err=True)
 err = partial(click.secho, fg="red", err=True)
 
+K = TypeVar("K")
+V = TypeVar("V")
+
 _first_cap_re = re.compile(r"(.)([A-Z][a-z]+)")
 _all_cap_re = re.compile(r"([a-z\d])([A-Z])")
 
@@ -32,6 +49,8 @@ def dump_to_file(*output: str) -> str:
     """
     Dump `output` to a temporary file. Return path to the file.
     """
+    import tempfile
+
     with tempfile.NamedTemporaryFile(
         mode="w",
         prefix="rfmt-ghk_",
@@ -48,6 +67,8 @@ def dump_to_file(*output: str) -> str:
 
 def diff(a: str, b: str, a_name: str, b_name: str) -> str:
     """Return a unified diff string between strings `a` and `b`."""
+    import difflib
+
     a_lines = [line + "\n" for line in a.split("\n")]
     b_lines = [line + "\n" for line in b.split("\n")]
     return "".join(
@@ -78,6 +99,21 @@ def remove_trailing_spaces(string: str) -> str:
     return "\n".join(line.rstrip() for line in lines)
 
 
+def iter_lines(text: str) -> Iterator[str]:
+    """
+    Lazily generate the lines of a string, like `text.split("\\n")`.
+    """
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end < 0:
+            yield text[start:]
+            return
+
+        yield text[start:end]
+        start = end + 1
+
+
 def decode_stream(src: BinaryIO) -> Tuple[str, str, str]:
     """
     Return a tuple of (decoded_contents, encoding, newline).
@@ -86,18 +122,68 @@ def decode_stream(src: BinaryIO) -> Tuple[str, str, str]:
     universal newlines (i.e. only contains LF).
     """
     # in case the source is not seekable, read into memory now
-    src = io.BytesIO(src.read())
-    encoding, lines = tokenize.detect_encoding(src.readline)
+    return decode_bytes(src.read())
+
+
+def decode_bytes(src: bytes) -> Tuple[str, str, str]:
+    """
+    Like :func:`decode_stream`, but decode contents which are already read.
+
+    Most files are encoded in UTF-8 without an encoding declaration, and are
+    decoded in a single pass. The other files are decoded like Python sources.
+    """
+    # Only the first two lines can declare an encoding
+    first_end = src.find(b"\n")
+    second_end = src.find(b"\n", first_end + 1) if first_end >= 0 else -1
+    if second_end < 0:
+        second_end = len(src)
+    if src.find(b"coding", 0, second_end) >= 0:
+        return _decode_source(src)
+
+    encoding = "utf-8-sig" if src.startswith(codecs.BOM_UTF8) else "utf-8"
+    try:
+        contents = src.decode(encoding)
+    except UnicodeDecodeError:
+        # Let tokenize report the error
+        return _decode_source(src)
+
+    if not contents:
+        return "", encoding, "\n"
+
+    newline = "\r\n" if src[first_end - 1 : first_end + 1] == b"\r\n" else "\n"
+    if "\r" in contents:
+        # Translate the newlines in a single pass, like a text file does
+        decoder = io.IncrementalNewlineDecoder(None, translate=True)
+        contents = decoder.decode(contents, final=True)
+
+    return contents, encoding, newline
+
+
+def _decode_source(src: bytes) -> Tuple[str, str, str]:
+    import tokenize
+
+    stream = io.BytesIO(src)
+    encoding, lines = tokenize.detect_encoding(stream.readline)
     if not lines:
         return "", encoding, "\n"
 
     newline = "\r\n" if b"\r\n" == lines[0][-2:] else "\n"
-    src.seek(0)
-    with io.TextIOWrapper(src, encoding) as tiow:
+    stream.seek(0)
+    with io.TextIOWrapper(stream, encoding) as tiow:
         return tiow.read(), encoding, newline
 
 
-@lru_cache()
+def encode_contents(contents: str, encoding: str, newline: str) -> bytes:
+    """
+    Encode contents decoded by :func:`decode_stream`, with `newline` as the line
+    separator. This is the inverse of :func:`decode_stream`.
+    """
+    if newline != "\n":
+        contents = contents.replace("\n", newline)
+
+    return contents.encode(encoding)
+
+
 def get_display_width(text: str) -> int:
     """
     Get the display width of a string.
@@ -111,15 +197,92 @@ def get_display_width(text: str) -> int:
     the bell character). If a string contains any such characters, then
     wcwidth.wcswidth returns -1. In this case, use the number of code points as
     a fallback.
+
+    Every printable ASCII character has a width of 1, so the width of such
+    strings is their length. The widths of the other strings are kept in a
+    bounded cache, see :func:`get_display_width_cache_stats`.
     """
-    width = wcswidth(text)
-    if width < 0:
-        width = len(text)
+    if text.isascii() and text.isprintable():
+        return len(text)
+
+    width = _display_widths.get(text)
+    if width is None:
+        from wcwidth import wcswidth
+
+        width = wcswidth(text)
+        if width < 0:
+            width = len(text)
+        _display_widths.put(text, width)
+
     return width
 
 
+def get_display_width_cache_stats() -> "CacheStats":
+    """
+    Get the statistics of the cache used by :func:`get_display_width`, in the
+    current process. Strings of printable ASCII characters are not counted.
+    """
+    return _display_widths.stats()
+
+
 def open_stream_or_path(stream_or_path: Union[IO[AnyStr], Path], mode: str):
     if isinstance(stream_or_path, Path):
         return open(stream_or_path, mode)
     else:
         return nullcontext(stream_or_path)
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+    max_size: int
+
+
+class BoundedCache(Generic[K, V]):
+    """
+    A thread-safe mapping which keeps at most `max_size` of the most recently
+    used items.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[K, V]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: K) -> Optional[V]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._items.move_to_end(key)
+
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(self._hits, self._misses, len(self._items), self.max_size)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+# The display widths of the strings which are not made of printable ASCII
+# characters
+_display_widths: "BoundedCache[str, int]" = BoundedCache(4096)
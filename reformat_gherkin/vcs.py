@@ -0,0 +1,124 @@
+import os
+import subprocess
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .config import find_project_root
+from .discovery import SourceFilter, to_relative
+from .errors import VCSError
+
+
+def run_git(*args: str, cwd: Path) -> bytes:
+    """
+    Run a git command in `cwd`, and return its output.
+    """
+    try:
+        result = subprocess.run(
+            ["git", *args],
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            check=False,
+        )
+    except OSError as e:
+        raise VCSError(f"Cannot run git: {e}.") from e
+
+    if result.returncode != 0:
+        message = os.fsdecode(result.stderr).strip().splitlines()
+        raise VCSError(
+            f"git {args[0]} failed in {cwd}: {message[-1] if message else 'error'}."
+        )
+
+    return result.stdout
+
+
+def run_git_paths(command: str, *args: str, cwd: Path) -> List[str]:
+    """
+    Run a git command with the -z option in `cwd`, and return the NUL-separated
+    paths it prints.
+    """
+    output = run_git(command, "-z", *args, cwd=cwd)
+
+    return [os.fsdecode(path) for path in output.split(b"\0") if path]
+
+
+def find_repository_root(path: Path) -> Path:
+    """
+    Return the top-level directory of the git working tree containing `path`.
+    """
+    directory = path if path.is_dir() else path.parent
+    root = run_git("rev-parse", "--show-toplevel", cwd=directory)
+
+    return Path(os.fsdecode(root.rstrip(b"\n"))).resolve()
+
+
+def list_changed_files(
+    root: Path, paths: Iterable[Path], *, changed_since: Optional[str], staged: bool
+) -> Set[Path]:
+    """
+    List the files under `paths` which differ from `changed_since`, in the working
+    tree of the repository at `root`. If `staged` is True, only the changes added
+    to the index are considered, and `changed_since` defaults to HEAD.
+    """
+    pathspecs = ["--", *(str(path) for path in paths)]
+
+    diff_args = ["diff", "--name-only", "--no-renames", "--diff-filter=d"]
+    if staged:
+        diff_args.append("--cached")
+    if changed_since is not None:
+        diff_args.append(changed_since)
+    names = run_git_paths(*diff_args, *pathspecs, cwd=root)
+
+    if not staged:
+        names.extend(
+            run_git_paths(
+                "ls-files", "--others", "--exclude-standard", *pathspecs, cwd=root
+            )
+        )
+
+    return {root / name for name in names}
+
+
+def find_changed_sources(
+    src: Iterable[str],
+    *,
+    changed_since: Optional[str],
+    staged: bool,
+    source_filter: Optional[SourceFilter] = None,
+) -> Set[Path]:
+    """
+    Find the files among `src` and the files selected by `source_filter` in the
+    `src` folders which git reports as modified, added, or untracked since the
+    `changed_since` ref, or as staged if `staged` is True.
+
+    Raise VCSError if git is not available, if a path is not in a git repository,
+    or if git fails, for example, because the ref does not exist.
+    """
+    if source_filter is None:
+        source_filter = SourceFilter()
+
+    src = tuple(src)
+    project_root = str(find_project_root(src))
+    paths_by_root: Dict[Path, List[Path]] = defaultdict(list)
+    for s in src:
+        path = Path(s).resolve()
+        paths_by_root[find_repository_root(path)].append(path)
+
+    sources: Set[Path] = set()
+    for root, paths in paths_by_root.items():
+        files = {path for path in paths if not path.is_dir()}
+        for changed in list_changed_files(
+            root, paths, changed_since=changed_since, staged=staged
+        ):
+            # If a file was explicitly given, we don't care about its name. Git
+            # already leaves out the ignored files.
+            if changed in files or (
+                changed.is_file()
+                and source_filter.is_selected(
+                    to_relative(str(changed), project_root), is_dir=False
+                )
+            ):
+                sources.add(changed)
+
+    return sources
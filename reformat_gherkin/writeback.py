@@ -0,0 +1,103 @@
+import os
+import stat
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, Optional, Set
+
+
+@contextmanager
+def atomic_write(path: Path) -> Iterator[BinaryIO]:
+    """
+    Open a temporary file next to `path` for writing, and replace `path` with it
+    once the context exits without an error. The file is never left truncated or
+    half-written: if an error occurs, it is left intact and the temporary file is
+    removed. The permissions of the file are kept, and a symbolic link is kept
+    pointing to the replaced file.
+    """
+    import tempfile
+
+    path = Path(os.path.realpath(path))
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with open(fd, "wb") as tmp_stream:
+            yield tmp_stream
+        os.chmod(tmp_name, get_file_mode(path))
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def get_file_mode(path: Path) -> int:
+    """
+    Return the permissions of a file, or the default permissions of a new file if
+    it doesn't exist.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def read_if_size(path: Path, size: int) -> Optional[bytes]:
+    """
+    Return the contents of a file if it has the given size, and None otherwise,
+    so that a file which cannot have the given contents is not read.
+    """
+    try:
+        if os.stat(path).st_size != size:
+            return None
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def write_file(path: Path, data: bytes, *, current: Optional[bytes] = None) -> bool:
+    """
+    Atomically replace the contents of a file with `data`, unless it already
+    contains them, so that the modification time of an unchanged file is kept.
+    `current` is the contents of the file, if they are already known. Return
+    True if the file was written.
+    """
+    if current is None:
+        current = read_if_size(path, len(data))
+
+    if current == data:
+        return False
+
+    with atomic_write(path) as stream:
+        stream.write(data)
+
+    return True
+
+
+def sync_files(paths: Iterable[Path]) -> None:
+    """
+    Flush the given files, and then the directories containing them, to disk.
+    The files are synced together at the end of a run, instead of after each
+    write, and each directory is only synced once.
+    """
+    directories: Set[Path] = set()
+    for path in paths:
+        path = Path(os.path.realpath(path))
+        # Windows only flushes a file which is opened for writing
+        _sync(path, os.O_RDWR)
+        directories.add(path.parent)
+
+    for directory in sorted(directories):
+        try:
+            _sync(directory, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+        except OSError:  # pragma: no cover
+            # Directories cannot be opened on Windows, where a replaced file does
+            # not need its directory to be synced.
+            pass
+
+
+def _sync(path: Path, flags: int) -> None:
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
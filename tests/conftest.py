@@ -5,13 +5,25 @@ from pathlib import Path
 import pytest
 from click.testing import CliRunner
 
+from reformat_gherkin.cache import CACHE_DIR_ENV
 from reformat_gherkin.config import CONFIG_FILE
-from tests.helpers import FILENAME_OPTION_MAP, TEST_DIR
+from tests.helpers import FILENAME_OPTION_MAP, FORMATTED, TEST_DIR, UNFORMATTED
 
 VALID_DATA_DIR = TEST_DIR / "data" / "valid"
 INVALID_DATA_DIR = TEST_DIR / "data" / "invalid"
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """
+    Keep the cache of formatted files away from the user cache directory.
+    """
+    _cache_dir = tmp_path / "cache"
+    monkeypatch.setenv(CACHE_DIR_ENV, str(_cache_dir))
+
+    return _cache_dir
+
+
 @pytest.fixture
 def valid_contents():
     def _valid_contents(*, with_expected=False, with_options=False):
@@ -122,6 +134,20 @@ def source_with_newline(tmp_file):
     return construct_source_with_newline
 
 
+@pytest.fixture
+def project(tmp_path):
+    """
+    A project folder with a file to reformat, a.feature, and a formatted file,
+    b.feature.
+    """
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / "a.feature").write_text(UNFORMATTED)
+    (root / "b.feature").write_text(FORMATTED)
+
+    return root
+
+
 @pytest.fixture
 def runner():
     return CliRunner(mix_stderr=False)
@@ -11,6 +11,10 @@ from reformat_gherkin.options import (
 TEST_DIR = Path("tests")
 GHERKIN_TEST_DATA_DIR = TEST_DIR / "gherkin_test_data"
 
+# A small document, before and after it is reformatted with the default options
+UNFORMATTED = "Feature: F\n  Scenario: S\n  Given a step\n"
+FORMATTED = "Feature: F\n\n  Scenario: S\n    Given a step\n"
+
 
 def make_options(
     *,
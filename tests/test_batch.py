@@ -0,0 +1,143 @@
+import json
+from io import BytesIO
+
+import pytest
+
+from reformat_gherkin import batch
+from reformat_gherkin.cli import main
+from reformat_gherkin.report import Report
+from tests import helpers
+from tests.helpers import OPTIONS
+
+UNFORMATTED = helpers.UNFORMATTED.encode()
+FORMATTED = helpers.FORMATTED.encode()
+
+
+def frame(body, **headers):
+    lines = [f"{name.replace('_', '-')}: {value}\n" for name, value in headers.items()]
+    lines.append(f"Content-Length: {len(body)}\n\n")
+
+    return "".join(lines).encode() + body
+
+
+def read_frames(stream):
+    frames = []
+    while True:
+        headers = batch.read_headers(stream)
+        if headers is None:
+            return frames
+
+        frames.append((headers, batch.read_body(stream, headers)))
+
+
+def test_stdin_batch(runner):
+    documents = [
+        frame(UNFORMATTED, X_Filename="a.feature"),
+        frame(FORMATTED, X_Filename="b.feature"),
+        frame(b"Feature: F\n  Scenario: S\n    Given a step\n      Oops\n"),
+        frame(UNFORMATTED, X_Filename="é.feature", X_Use_Tabs="true"),
+    ]
+
+    result = runner.invoke(main, ["--stdin-batch"], input=b"".join(documents))
+
+    assert result.exit_code == 123
+    frames = read_frames(BytesIO(result.stdout_bytes))
+    assert [headers.get("X-Filename") for headers, _ in frames] == [
+        "a.feature",
+        "b.feature",
+        None,
+        "é.feature",
+    ]
+    assert [headers["X-Status"] for headers, _ in frames] == [
+        "changed",
+        "unchanged",
+        "error",
+        "changed",
+    ]
+    assert frames[0][1] == FORMATTED
+    assert frames[1][1] == b""
+    assert frames[2][1]
+    assert frames[3][1] == FORMATTED.replace(b"  ", b"\t")
+    assert "Reformatted a.feature" in result.stderr
+    assert "Error: cannot format stdin" in result.stderr
+
+
+def test_stdin_batch_options(runner):
+    documents = [
+        frame(UNFORMATTED),
+        frame(UNFORMATTED, x_tab_width="2"),
+        frame(UNFORMATTED, X_Fast_Or_Safe="slow"),
+    ]
+
+    result = runner.invoke(
+        main,
+        ["--stdin-batch", "--tab-width", "4", "--report-format", "json"],
+        input=b"".join(documents),
+    )
+
+    frames = read_frames(BytesIO(result.stdout_bytes))
+    assert frames[0][1] == FORMATTED.replace(b"  ", b"    ")
+    assert frames[1][1] == FORMATTED
+    assert frames[2][0]["X-Status"] == "error"
+    assert json.loads(result.stderr)["counts"] == {
+        "changed": 2,
+        "unchanged": 0,
+        "failed": 1,
+    }
+
+
+def test_stdin_batch_empty(runner):
+    result = runner.invoke(main, ["--stdin-batch", "--check"], input=b"")
+
+    assert result.exit_code == 0
+    assert result.stdout_bytes == b""
+
+
+@pytest.mark.parametrize(
+    "src, message",
+    [
+        (b"Content-Length: 10\n\nFeature", "Unexpected end of input in a document."),
+        (b"X-Filename: a.feature\n", "Unexpected end of input in the headers."),
+        (b"X-Filename: a.feature\n\n", "Missing or invalid Content-Length header."),
+        (b"Content-Length: -1\n\n", "Invalid Content-Length: -1"),
+        (b"Feature: F\n  Scenario: S\n\n", "Missing or invalid Content-Length"),
+        (b"Feature\n\n", "Invalid header line"),
+        (b"X" * (batch.MAX_HEADER_LINE + 1), "Header line too long."),
+    ],
+)
+def test_stdin_batch_invalid_frame(runner, src, message):
+    result = runner.invoke(main, ["--stdin-batch"], input=frame(FORMATTED) + src)
+
+    assert result.exit_code == 1
+    assert len(read_frames(BytesIO(result.stdout_bytes))) == 1
+    assert f"Invalid batch input: {message}" in result.stderr
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["-"], "Cannot use --stdin-batch with SRC."),
+        (["--line-ranges", "1-2"], "Cannot use --line-ranges with --stdin-batch."),
+    ],
+)
+def test_stdin_batch_invalid_args(runner, args, message):
+    result = runner.invoke(main, ["--stdin-batch", *args], input=frame(FORMATTED))
+
+    assert result.exit_code == 1
+    assert message in result.stderr
+
+
+def test_reformat_batch_crlf():
+    dst = BytesIO()
+
+    batch.reformat_batch(
+        BytesIO(frame(UNFORMATTED.replace(b"\n", b"\r\n"))),
+        dst,
+        Report(check=False),
+        options=OPTIONS[0],
+    )
+
+    dst.seek(0)
+    ((headers, body),) = read_frames(dst)
+    assert headers["X-Status"] == "changed"
+    assert body == FORMATTED.replace(b"\n", b"\r\n")
@@ -0,0 +1,27 @@
+from benchmarks.suite import PHASES, main, run_benchmarks
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(["valid_data"], list(PHASES), repeat=1, scale=1)
+
+    assert [result["phase"] for result in results["results"]] == list(PHASES)
+    for result in results["results"]:
+        assert result["corpus"] == "valid_data"
+        assert result["min_seconds"] <= result["median_seconds"]
+
+
+def test_main_output(tmp_path):
+    output = tmp_path / "results.json"
+    main(["--corpus", "large_file", "--phase", "generate", "--output", str(output)])
+
+    assert '"phase": "generate"' in output.read_text()
+
+
+def test_main_default_corpora(mocker):
+    run_benchmarks = mocker.patch("benchmarks.suite.run_benchmarks", return_value={})
+    mocker.patch("json.dump")
+    main([])
+
+    (corpus_names, _), _ = run_benchmarks.call_args
+    assert "synthetic_table" in corpus_names
+    assert "synthetic_table_100k" not in corpus_names
@@ -0,0 +1,130 @@
+import os
+import pickle
+from pathlib import Path
+
+import attr
+import pytest
+
+from reformat_gherkin import cache, core
+from reformat_gherkin.options import WriteBackMode
+from reformat_gherkin.report import Report
+from tests.helpers import OPTIONS, UNFORMATTED
+
+
+def test_get_cache_dir(cache_dir):
+    assert cache.get_cache_dir() == cache_dir / cache.__version__
+
+
+def test_get_cache_key():
+    options = OPTIONS[0]
+
+    assert cache.get_cache_key(options) == cache.get_cache_key(
+        attr.evolve(options, write_back=WriteBackMode.INPLACE, fast=True)
+    )
+    assert cache.get_cache_key(options) != cache.get_cache_key(
+        attr.evolve(options, indent="\t")
+    )
+    assert len({cache.get_cache_key(options) for options in OPTIONS}) == len(OPTIONS)
+
+
+def test_cache_roundtrip(tmp_file):
+    tmp_file.write_text("Feature: Cache\n")
+
+    _cache = cache.Cache.read(OPTIONS[0])
+    assert _cache.is_changed(tmp_file)
+
+    _cache.write({tmp_file: cache.FileData.from_path(tmp_file)})
+
+    _cache = cache.Cache.read(OPTIONS[0])
+    assert not _cache.is_changed(tmp_file)
+    assert _cache.filtered_cached([tmp_file]) == (set(), {tmp_file})
+
+    # The cache is specific to the options
+    assert cache.Cache.read(OPTIONS[1]).is_changed(tmp_file)
+
+
+def test_cache_mtime_changed(tmp_file):
+    tmp_file.write_text("Feature: Cache\n")
+    cache.Cache.read(OPTIONS[0]).write({tmp_file: cache.FileData.from_path(tmp_file)})
+
+    stat = tmp_file.stat()
+    os.utime(tmp_file, (stat.st_atime, stat.st_mtime + 10))
+
+    # The contents are the same, so the file is still known to be formatted
+    _cache = cache.Cache.read(OPTIONS[0])
+    assert not _cache.is_changed(tmp_file)
+    assert _cache.file_data[str(tmp_file)].st_mtime == stat.st_mtime + 10
+
+    tmp_file.write_text("Feature: Changed\n")
+    os.utime(tmp_file, (stat.st_atime, stat.st_mtime + 20))
+    assert _cache.is_changed(tmp_file)
+
+
+def test_cache_write_merges_concurrent_writes(tmp_dir):
+    first, second = tmp_dir / "first.feature", tmp_dir / "second.feature"
+    first.write_text("Feature: First\n")
+    second.write_text("Feature: Second\n")
+
+    first_cache = cache.Cache.read(OPTIONS[0])
+    second_cache = cache.Cache.read(OPTIONS[0])
+    first_cache.write({first: cache.FileData.from_path(first)})
+    second_cache.write({second: cache.FileData.from_path(second)})
+
+    _cache = cache.Cache.read(OPTIONS[0])
+    assert not _cache.is_changed(first)
+    assert not _cache.is_changed(second)
+
+
+def test_cache_corrupted(tmp_file):
+    tmp_file.write_text("Feature: Cache\n")
+
+    _cache = cache.Cache.read(OPTIONS[0])
+    _cache.write({tmp_file: cache.FileData.from_path(tmp_file)})
+    _cache.cache_file.write_bytes(pickle.dumps(["not", "a", "dict"])[:-3])
+
+    assert cache.Cache.read(OPTIONS[0]).file_data == {}
+
+
+def test_file_data_from_contents(tmp_file):
+    tmp_file.write_text("Feature: Cache\n")
+
+    assert cache.FileData.from_contents(
+        tmp_file.stat(), tmp_file.read_bytes()
+    ) == cache.FileData.from_path(tmp_file)
+
+
+def test_cache_file_changed_while_reformatted(project, mocker):
+    path = project / "b.feature"
+    reformat_single_file = core.reformat_single_file
+
+    def reformat_and_change(path, **kwargs):
+        changed = reformat_single_file(path, **kwargs)
+        path.write_text(UNFORMATTED)
+        return changed
+
+    mocker.patch(
+        "reformat_gherkin.core.reformat_single_file", side_effect=reformat_and_change
+    )
+    core.reformat((str(path),), Report(check=True), options=OPTIONS[0], use_cache=True)
+
+    # The contents which were found to be formatted are recorded, not the new ones
+    assert cache.Cache.read(OPTIONS[0]).is_changed(path)
+
+
+@pytest.mark.parametrize(
+    "write_back, expected",
+    [
+        (WriteBackMode.INPLACE, {"a.feature", "b.feature"}),
+        (WriteBackMode.CHECK, {"b.feature"}),
+    ],
+)
+def test_cache_records_formatted_files(project, write_back, expected):
+    options = attr.evolve(OPTIONS[0], write_back=write_back)
+    report = Report(check=write_back == WriteBackMode.CHECK)
+
+    core.reformat((str(project),), report, options=options, workers=1, use_cache=True)
+
+    _cache = cache.Cache.read(options)
+    assert {Path(path).name for path in _cache.file_data} == expected
+    for path in project.iterdir():
+        assert _cache.is_changed(path) is (path.name not in expected)
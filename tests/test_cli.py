@@ -1,4 +1,10 @@
+import json
+from pathlib import Path
+
+import pytest
+
 from reformat_gherkin.cli import main
+from reformat_gherkin.report import REPORT_BUFFER_SIZE, Report
 
 from .helpers import GHERKIN_TEST_DATA_DIR, options_to_cli_args
 
@@ -123,3 +129,107 @@ def test_cli_check_with_empty_config(runner, sources):
 
     assert len(result.stdout) == 0
     assert result.exit_code == 0
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_cli_check_workers(runner, sources, workers):
+    result = runner.invoke(
+        main,
+        [
+            *sources(),
+            "--check",
+            "--workers",
+            workers,
+        ],
+    )
+
+    assert len(result.stdout) == 0
+    assert result.exit_code == 123
+    assert "Would reformat" in result.stderr
+    assert "Error: cannot format" in result.stderr
+
+
+def test_cli_cache(runner, sources, mocker):
+    src = sources(contain_invalid=False)
+    result = runner.invoke(main, src)
+    assert result.exit_code == 0
+
+    reformat_stream_or_path = mocker.patch(
+        "reformat_gherkin.core.reformat_stream_or_path",
+        return_value=False,
+    )
+
+    result = runner.invoke(main, [*src, "--check", "--workers", "1"])
+    assert result.exit_code == 0
+    reformat_stream_or_path.assert_not_called()
+
+    result = runner.invoke(main, [*src, "--check", "--workers", "1", "--no-cache"])
+    assert result.exit_code == 0
+    reformat_stream_or_path.assert_called()
+
+
+def test_cli_quiet(runner, sources):
+    result = runner.invoke(main, [*sources(), "--check", "--quiet"])
+
+    assert result.exit_code == 123
+    assert result.stderr.startswith("Error: cannot format")
+    assert "Would reformat" not in result.stderr
+    assert "All done!" not in result.stderr
+
+
+def test_cli_verbose(runner, sources):
+    src = sources(contain_invalid=False)
+    runner.invoke(main, src)
+
+    result = runner.invoke(main, [*src, "--check", "--verbose", "--no-cache"])
+
+    assert result.exit_code == 0
+    assert "is already well formatted" in result.stderr
+    assert "All done!" in result.stderr
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_cli_report_format_json(runner, sources, workers):
+    src = sources()
+    result = runner.invoke(
+        main, [*src, "--check", "--workers", workers, "--report-format", "json"]
+    )
+
+    summary = json.loads(result.stderr)
+    assert result.exit_code == summary["exit_code"] == 123
+    assert summary["check"] is True
+    assert summary["changed"] == sorted(summary["changed"])
+    assert str(Path(src[0]).resolve() / "full.feature") in summary["changed"]
+    assert summary["failed"][0]["path"].endswith(".feature")
+    assert summary["failed"][0]["message"]
+    assert summary["counts"] == {
+        "changed": len(summary["changed"]),
+        "unchanged": len(summary["unchanged"]),
+        "failed": len(summary["failed"]),
+    }
+
+
+def test_cli_report_format_json_empty_sources(runner):
+    result = runner.invoke(main, ["--report-format", "json"])
+
+    assert result.exit_code == 0
+    assert json.loads(result.stderr)["counts"] == {
+        "changed": 0,
+        "unchanged": 0,
+        "failed": 0,
+    }
+
+
+def test_report_buffer(mocker):
+    echo = mocker.patch("reformat_gherkin.report.click.echo")
+    mocker.patch("reformat_gherkin.report.REPORT_FLUSH_INTERVAL", float("inf"))
+    report = Report(check=True)
+
+    for index in range(REPORT_BUFFER_SIZE + 1):
+        report.done(f"{index}.feature", changed=True)
+
+    echo.assert_called_once()
+    assert echo.call_args[0][0].count("\n") == REPORT_BUFFER_SIZE - 1
+
+    report.flush()
+    assert echo.call_count == 2
@@ -1,15 +1,18 @@
+import io
 from unittest.mock import patch
 
 import attr
 import pytest
 
-from reformat_gherkin import core
+from reformat_gherkin import core, parser, utils
 from reformat_gherkin.errors import (
     EquivalentError,
     InternalError,
     NothingChanged,
     StableError,
 )
+from reformat_gherkin.options import WriteBackMode
+from reformat_gherkin.report import Report
 from tests.helpers import OPTIONS, dump_to_stderr, get_content
 
 
@@ -96,7 +99,7 @@ def test_line_separators_changed(source_with_newline, newline_mode, newline):
     core.reformat_single_file(source, options=options)
 
     with open(source, "rb") as buf:
-        _newline = core.decode_stream(buf)[2]
+        _newline = utils.decode_stream(buf)[2]
 
         assert _newline == core.NEWLINE_FROM_OPTION[newline_mode]
 
@@ -111,7 +114,7 @@ def test_line_separators_preserved(source_with_newline, newline):
     core.reformat_single_file(source, options=options)
 
     with open(source, "rb") as buf:
-        _newline = core.decode_stream(buf)[2]
+        _newline = utils.decode_stream(buf)[2]
 
         assert _newline == newline
 
@@ -122,3 +125,116 @@ def test_format_comments():
 
     dst = core.format_file_contents("#   \n" * number_of_comments, options=OPTIONS[0])
     assert dst == "#\n" * number_of_comments
+
+
+def test_reformat_many(sources):
+    src = sources()
+    serial_report = Report(check=True)
+    parallel_report = Report(check=True)
+
+    core.reformat(src, serial_report, options=OPTIONS[0], workers=1)
+    core.reformat(src, parallel_report, options=OPTIONS[0], workers=2)
+
+    assert parallel_report == serial_report
+    assert parallel_report.return_code == 123
+
+
+def test_format_file_contents_parses_once(mocker):
+    parse = mocker.spy(parser, "parse")
+    content = get_content("full")
+
+    core.format_file_contents(content, options=OPTIONS[0])
+
+    # The source and the reformatted contents are parsed once each
+    assert parse.call_count == 2
+    assert parse.call_args_list[0] == mocker.call(content)
+
+
+@patch("reformat_gherkin.core.dump_to_file", dump_to_stderr)
+def test_assert_equivalent_structure():
+    # The same nodes, but the second step is moved to another scenario
+    src = "Feature: F\n  Scenario: A\n    Given a\n    Given b\n  Scenario: B\n"
+    dst = "Feature: F\n  Scenario: A\n    Given a\n  Scenario: B\n    Given b\n"
+
+    with pytest.raises(EquivalentError):
+        core.assert_equivalent(src, dst)
+
+
+def test_assert_stable_known_stable(mocker):
+    options = OPTIONS[0]
+    content = get_content("full")
+    formatted_content = core.format_str(content, options=options)
+
+    core.assert_stable(content, formatted_content, options=options)
+
+    generate_lines = mocker.spy(core, "generate_lines")
+    core.assert_stable(content, formatted_content, options=options)
+    generate_lines.assert_not_called()
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_reformat_streaming(mocker, valid_contents, options):
+    options = attr.evolve(options, fast=True)
+    format_ast = mocker.spy(core, "format_ast")
+
+    for content in valid_contents():
+        try:
+            expected = core.format_file_contents(content, options=options)
+        except NothingChanged:
+            expected = content
+        format_ast.reset_mock()
+
+        out = io.BytesIO()
+        changed = core.reformat_stream_or_path(
+            io.BytesIO(content.encode()),
+            out,
+            force_write=True,
+            options=options,
+        )
+
+        assert changed == (expected != content)
+        assert out.getvalue().decode() == expected
+        assert (
+            core.reformat_stream_or_path(
+                io.BytesIO(expected.encode()),
+                None,
+                options=options,
+            )
+            is False
+        )
+
+    format_ast.assert_not_called()
+
+
+def test_reformat_streaming_in_place(tmp_path):
+    options = attr.evolve(OPTIONS[0], fast=True, write_back=WriteBackMode.INPLACE)
+    content = get_content("full")
+    expected = core.format_str(content, options=options)
+
+    path = tmp_path / "full.feature"
+    path.write_text(content)
+    path.chmod(0o640)
+
+    assert core.reformat_single_file(path, options=options) is True
+    assert path.read_text() == expected
+    assert path.stat().st_mode & 0o777 == 0o640
+
+    # The file isn't replaced if it is already formatted
+    inode = path.stat().st_ino
+    assert core.reformat_single_file(path, options=options) is False
+    assert path.stat().st_ino == inode
+
+
+def test_write_lines_error(tmp_path):
+    path = tmp_path / "file.feature"
+    path.write_text("Feature: F\n")
+
+    def lines():
+        yield "Feature: G"
+        raise RuntimeError
+
+    with pytest.raises(RuntimeError):
+        core.write_lines(lines(), path, encoding="utf-8", newline="\n")
+
+    assert path.read_text() == "Feature: F\n"
+    assert list(tmp_path.iterdir()) == [path]
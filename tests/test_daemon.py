@@ -0,0 +1,168 @@
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from http.client import HTTPConnection
+
+import attr
+import pytest
+
+from reformat_gherkin import daemon
+from reformat_gherkin.options import AlignmentMode
+from tests.helpers import get_content
+
+
+@contextmanager
+def serving(executor):
+    server = daemon.make_server("localhost", 0, executor)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    def post(body, headers=None):
+        connection = HTTPConnection(*server.server_address[:2])
+        if body is None:
+            # Send the request without a body, nor a Content-Length header
+            connection.putrequest("POST", "/")
+            for name, value in (headers or {}).items():
+                connection.putheader(name, value)
+            connection.endheaders()
+        else:
+            connection.request("POST", "/", body=body, headers=headers or {})
+        response = connection.getresponse()
+        result = response.status, response.read(), response.headers
+        connection.close()
+        return result
+
+    try:
+        yield post
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+@pytest.fixture
+def client():
+    with ThreadPoolExecutor(max_workers=2) as executor, serving(executor) as post:
+        yield post
+
+
+class BrokenExecutor(Executor):
+    """
+    An executor whose workers died, like a process pool after a worker was killed.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A worker process died."))
+        return future
+
+
+def test_daemon_reformat(client, valid_contents):
+    for content, expected, options in valid_contents(
+        with_expected=True,
+        with_options=True,
+    ):
+        headers = {
+            daemon.TAG_LINE_MODE_HEADER: options.tag_line_mode.value,
+            daemon.USE_TABS_HEADER: "true" if options.indent == "\t" else "false",
+        }
+        if options.step_keyword_alignment.value is not None:
+            headers[daemon.ALIGNMENT_HEADER] = options.step_keyword_alignment.value
+
+        status, body, response_headers = client(content.encode(), headers)
+
+        assert status == 200
+        assert body.decode() == expected
+        assert response_headers[daemon.VERSION_HEADER] == daemon.__version__
+
+
+def test_daemon_no_change(client):
+    status, body, _ = client(get_content("full").encode())
+    assert status == 200
+
+    status, new_body, _ = client(body)
+    assert status == 204
+    assert new_body == b""
+
+
+def test_daemon_executor_error():
+    shut_down_executor = ThreadPoolExecutor(max_workers=1)
+    shut_down_executor.shutdown()
+
+    for executor, message in [
+        (BrokenExecutor(), b"A worker process died."),
+        (shut_down_executor, b"cannot schedule new futures after shutdown"),
+    ]:
+        with serving(executor) as post:
+            status, body, _ = post(get_content("full").encode())
+
+        assert status == 500
+        assert body == message
+
+
+def test_daemon_newline(client):
+    content = get_content("full").encode()
+
+    status, body, _ = client(content.replace(b"\n", b"\r\n"))
+    assert status == 200
+    assert body.count(b"\n") == body.count(b"\r\n")
+
+    status, new_body, _ = client(body, {daemon.NEWLINE_HEADER: "LF"})
+    assert status == 200
+    assert new_body == body.replace(b"\r\n", b"\n")
+
+
+def test_daemon_invalid_input(client, invalid_contents):
+    status, body, _ = client(next(invalid_contents).encode())
+
+    assert status == 400
+    assert body
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {daemon.PROTOCOL_VERSION_HEADER: "2"},
+        {daemon.ALIGNMENT_HEADER: "center"},
+        {daemon.FAST_OR_SAFE_HEADER: "slow"},
+        {daemon.TAB_WIDTH_HEADER: "two"},
+        {daemon.USE_TABS_HEADER: "maybe"},
+    ],
+)
+def test_daemon_invalid_headers(client, headers):
+    status, body, _ = client(get_content("full").encode(), headers)
+
+    assert status == 400
+    assert body
+
+
+@pytest.mark.parametrize(
+    "headers, message",
+    [
+        ({}, b"Missing or invalid Content-Length header."),
+        ({"Content-Length": "many"}, b"Missing or invalid Content-Length header."),
+        ({"Content-Length": "-1"}, b"Invalid Content-Length: -1"),
+    ],
+)
+def test_daemon_invalid_content_length(client, headers, message):
+    status, body, _ = client(None, headers)
+
+    assert status == 400
+    assert body == message
+
+
+def test_parse_options_defaults():
+    defaults = attr.evolve(
+        daemon.DEFAULT_OPTIONS,
+        step_keyword_alignment=AlignmentMode.LEFT,
+        fast=True,
+        indent="\t",
+    )
+
+    assert daemon.parse_options({}) == daemon.DEFAULT_OPTIONS
+    assert daemon.parse_options({}, defaults=defaults) == defaults
+    assert daemon.parse_options(
+        {daemon.USE_TABS_HEADER: "false", daemon.FAST_OR_SAFE_HEADER: "safe"},
+        defaults=defaults,
+    ) == attr.evolve(defaults, fast=False, indent="  ")
@@ -0,0 +1,154 @@
+import re
+
+import pytest
+
+from reformat_gherkin import discovery
+from reformat_gherkin.cli import main
+from reformat_gherkin.discovery import (
+    IgnorePattern,
+    SourceFilter,
+    discover_sources,
+    translate_glob,
+)
+
+
+@pytest.mark.parametrize(
+    "glob, path, matches",
+    [
+        ("*.feature", "a.feature", True),
+        ("*.feature", "a/b.feature", False),
+        ("**/b", "a/c/b", True),
+        ("**/b", "b", True),
+        ("a/**", "a/b/c", True),
+        ("a/**/c", "a/c", True),
+        ("a/**/c", "a/b/b/c", True),
+        ("?.txt", "ab.txt", False),
+        ("[!a]b", "cb", True),
+        ("[!a]b", "ab", False),
+        ("\\*b", "*b", True),
+        ("\\*b", "ab", False),
+    ],
+)
+def test_translate_glob(glob, path, matches):
+    assert bool(re.fullmatch(translate_glob(glob), path)) is matches
+
+
+@pytest.mark.parametrize(
+    "line, path, matches",
+    [
+        ("build", "a/build", True),
+        ("/build", "a/build", False),
+        ("/build", "build", True),
+        ("a/build", "b/a/build", False),
+        ("doc/*.feature", "doc/a.feature", True),
+        ("trailing  ", "trailing", True),
+        ("escaped\\ ", "escaped ", True),
+    ],
+)
+def test_ignore_pattern(line, path, matches):
+    pattern = IgnorePattern.from_line(line)
+
+    assert bool(pattern.regex.match(path)) is matches
+
+
+@pytest.mark.parametrize("line", ["", "# comment", "/", "!"])
+def test_ignore_pattern_empty(line):
+    assert IgnorePattern.from_line(line) is None
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    root.mkdir()
+    (root / ".git").mkdir()
+
+    paths = [
+        "a.feature",
+        "a.txt",
+        "node_modules/b.feature",
+        "build/c.feature",
+        "features/d.feature",
+        "features/generated/e.feature",
+        "features/fixtures/f.feature",
+        "features/fixtures/keep.feature",
+        "features/nested/g.feature",
+        "features/nested/h.feature",
+    ]
+    for path in paths:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("Feature: F\n")
+
+    (root / ".gitignore").write_text(
+        "generated/\nfeatures/fixtures/*\n!features/fixtures/keep.feature\n"
+    )
+    (root / "features" / "nested" / ".gitignore").write_text("/h.feature\n")
+
+    return root
+
+
+def relative_sources(root, sources):
+    return sorted(str(source.relative_to(root)) for source in sources)
+
+
+def test_discover_sources(project):
+    assert relative_sources(project, discover_sources([str(project)])) == [
+        "a.feature",
+        "features/d.feature",
+        "features/fixtures/keep.feature",
+        "features/nested/g.feature",
+    ]
+
+
+def test_discover_sources_in_parallel(project, monkeypatch):
+    monkeypatch.setattr(discovery, "PARALLEL_WALK_THRESHOLD", 1)
+
+    assert discover_sources([str(project)], parallel=True) == discover_sources(
+        [str(project)], parallel=False
+    )
+
+
+def test_discover_sources_with_filter(project):
+    source_filter = SourceFilter(
+        include=re.compile(r"\.(feature|txt)$"),
+        exclude=re.compile(r"/node_modules/"),
+        extend_exclude=re.compile(r"/nested/"),
+    )
+
+    sources = discover_sources([str(project / "features"), str(project)], source_filter)
+
+    assert relative_sources(project, sources) == [
+        "a.feature",
+        "a.txt",
+        "build/c.feature",
+        "features/d.feature",
+        "features/fixtures/keep.feature",
+    ]
+
+
+def test_discover_sources_from_subdirectory(project):
+    # The .gitignore files of the parent directories still apply
+    sources = discover_sources([str(project / "features" / "nested")])
+
+    assert relative_sources(project, sources) == ["features/nested/g.feature"]
+
+
+def test_discover_sources_explicit_file(project):
+    sources = discover_sources([str(project / "node_modules" / "b.feature")])
+
+    assert relative_sources(project, sources) == ["node_modules/b.feature"]
+
+
+def test_cli_extend_exclude(runner, project):
+    (project / ".reformat-gherkin.yaml").write_text("extend_exclude: /nested/\n")
+
+    result = runner.invoke(main, [str(project), "--check", "--no-cache"])
+
+    assert result.exit_code == 0
+    assert result.stderr.endswith("3 files would be left unchanged.\n")
+
+
+def test_cli_invalid_regex(runner, project):
+    result = runner.invoke(main, [str(project), "--include", "("])
+
+    assert result.exit_code == 2
+    assert "Not a valid regular expression" in result.stderr
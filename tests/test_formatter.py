@@ -1,6 +1,9 @@
+import math
+
 from reformat_gherkin.ast_node import GherkinDocument
-from reformat_gherkin.formatter import INDENT_LEVEL_MAP, LineGenerator
+from reformat_gherkin.formatter import INDENT_LEVEL_MAP, CommentIndex, LineGenerator
 from reformat_gherkin.options import AlignmentMode, TagLineMode
+from reformat_gherkin.parser import parse
 
 
 def test_indent_level_map():
@@ -33,3 +36,54 @@ def format_ast(
 
 def test_format_empty_ast():
     assert format_ast(GherkinDocument(())) == ""
+
+
+def test_format_comment_before_data_table():
+    ast = parse("Feature: F\n  Scenario: S\n    Given a\n  # c\n    | a |\n")
+
+    assert format_ast(ast) == (
+        "Feature: F\n\n  Scenario: S\n    Given a\n      # c\n      | a |\n"
+    )
+
+
+def test_generate_blocks():
+    ast = parse("# a\nFeature: F\n\n  Scenario: S\n    Given a\n  # b\n\n  Rule: R\n")
+    line_generator = LineGenerator(
+        ast, AlignmentMode.NONE, TagLineMode.SINGLELINE, "  "
+    )
+
+    assert list(line_generator.generate_blocks([1, 4, 8], 8)) == [
+        ["# a", "Feature: F", ""],
+        ["  Scenario: S", "    Given a", "", "  # b"],
+        ["  Rule: R", ""],
+    ]
+    assert list(line_generator.generate_blocks([4, 4], 5)) == [
+        [],
+        ["  Scenario: S", "    Given a", ""],
+    ]
+
+
+def test_comment_index():
+    ast = parse("# a\n# b\nFeature: F\n  # c\n  Scenario: S\n# d\n")
+    comments = CommentIndex(ast.comments)
+
+    assert comments.next_line == 1
+    assert list(comments.place_before(3, "")) == [
+        (1, ["# a"], False),
+        (2, ["# b"], False),
+    ]
+    assert comments.next_line == 4
+    assert list(comments.place_before(5, "  ")) == [(4, ["  # c"], False)]
+    assert list(comments.place_before(math.inf, "")) == [(6, ["# d"], False)]
+    assert comments.next_line == math.inf
+
+
+def test_format_commented_out_scenarios():
+    commented_out = "".join(
+        f"#  Scenario: {i}\n  #   Given step {i}\n" for i in range(1000)
+    )
+    ast = parse(f"Feature: F\n\n  Scenario: S\n{commented_out}  Scenario: T\n")
+
+    lines = format_ast(ast).split("\n")
+    assert lines[3:5] == ["  # Scenario: 0", "  # Given step 0"]
+    assert lines[-3:] == ["  # Given step 999", "  Scenario: T", ""]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from benchmarks.generator import (
+    DISTRIBUTIONS,
+    CorpusConfig,
+    FeatureMix,
+    generate_corpus,
+    main,
+)
+from reformat_gherkin.parser import parse
+
+STRESS_CONFIG = CorpusConfig(
+    files=0,
+    stress=True,
+    table_rows=50,
+    comment_lines=50,
+    doc_string_bytes=10_000,
+    rules=5,
+)
+
+
+@pytest.mark.parametrize("distribution", DISTRIBUTIONS)
+def test_generate_corpus(distribution):
+    config = CorpusConfig(
+        files=20,
+        scenarios=5,
+        distribution=distribution,
+        mix=FeatureMix(rule=0.5, non_english=0.5),
+    )
+    documents = list(generate_corpus(config))
+
+    assert len(documents) == 20
+    languages = {parse(content).feature.language for _, content in documents}
+    assert "en" in languages
+    assert len(languages) > 1
+
+
+def test_generate_corpus_is_deterministic():
+    config = CorpusConfig(files=5)
+
+    assert list(generate_corpus(config)) == list(generate_corpus(config))
+    assert list(generate_corpus(config)) != list(
+        generate_corpus(CorpusConfig(files=5, seed=1))
+    )
+    # A file does not depend on the number of files
+    assert list(generate_corpus(config))[:3] == list(
+        generate_corpus(CorpusConfig(files=3))
+    )
+
+
+def test_generate_stress_documents():
+    documents = dict(generate_corpus(STRESS_CONFIG))
+
+    table = parse(documents["stress/large_table.feature"])
+    assert len(table.feature.children[0].scenario.examples[0].table_body) == 50
+
+    comments = parse(documents["stress/comments.feature"])
+    assert len(comments.comments) == 50
+
+    assert len(documents["stress/doc_string.feature"]) >= 10_000
+    parse(documents["stress/doc_string.feature"])
+
+    rules = parse(documents["stress/rules.feature"])
+    assert sum(child.rule is not None for child in rules.feature.children) == 5
+
+
+def test_main(tmp_path, capsys):
+    main([str(tmp_path), "--files", "3", "--mix", "outline=1", "--language", "fr"])
+
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["files"] == 3
+    assert summary["config"]["mix"]["outline"] == 1
+    assert len(list(tmp_path.rglob("*.feature"))) == 3
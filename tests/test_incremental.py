@@ -0,0 +1,131 @@
+import pytest
+
+from reformat_gherkin import incremental
+from reformat_gherkin.core import format_str
+from reformat_gherkin.errors import InvalidInput
+from reformat_gherkin.incremental import IncrementalFormatter
+from tests.helpers import OPTIONS, get_content
+
+SRC = """\
+Feature: Incremental
+
+  Background:
+    Given a
+
+  Scenario: First
+    When b
+  # A comment
+
+  @tag
+  Scenario: Second
+    When c
+
+  Rule: R
+    Scenario: Third
+      Then d
+"""
+
+EDITS = [
+    "    Given an inserted step",
+    "  # An inserted comment",
+    "  Scenario: Inserted",
+    "  @inserted",
+]
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_incremental_format_str(valid_contents, options):
+    for content in valid_contents():
+        formatter = IncrementalFormatter(options)
+        assert formatter.format_str(content) == format_str(content, options=options)
+
+        lines = content.split("\n")
+        for index in range(0, len(lines), max(len(lines) // 5, 1)):
+            for edit in EDITS:
+                new_content = "\n".join(lines[:index] + [edit] + lines[index:])
+
+                try:
+                    expected = format_str(new_content, options=options)
+                except Exception as e:
+                    with pytest.raises(type(e)):
+                        formatter.format_str(new_content)
+                else:
+                    assert formatter.format_str(new_content) == expected
+
+
+def test_incremental_reformats_changed_blocks(mocker):
+    content = get_content("full")
+    formatter = IncrementalFormatter(OPTIONS[0])
+    formatter.format_str(content)
+
+    parse = mocker.spy(incremental, "parse")
+    new_content = content.replace("When I exit", "When   I exit")
+    assert formatter.format_str(new_content) == format_str(
+        new_content, options=OPTIONS[0]
+    )
+
+    parse.assert_called_once()
+    assert len(parse.call_args[0][0]) < len(content) / 2
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        # The width of the longest step keyword changes
+        ("    Given a", "    When a"),
+        # The Rule changes the indentation of the blocks after it
+        ("  Rule: R", "  Scenario: R"),
+        # The Background is moved after a Scenario
+        ("  Scenario: First", "  Background: First"),
+    ],
+)
+def test_incremental_falls_back_to_whole_document(mocker, old, new):
+    options = OPTIONS[1]
+    formatter = IncrementalFormatter(options)
+    formatter.format_str(SRC)
+
+    new_content = SRC.replace(old, new)
+    parse = mocker.spy(incremental, "parse")
+    try:
+        expected = format_str(new_content, options=options)
+    except InvalidInput:
+        with pytest.raises(InvalidInput):
+            formatter.format_str(new_content)
+    else:
+        assert formatter.format_str(new_content) == expected
+
+    assert parse.call_args[0][0] == new_content
+
+
+def test_incremental_comment_between_tags():
+    content = """\
+Feature: F
+
+  Scenario: A
+    Given x
+
+  # c1
+  @t1
+  # c2
+  @t2
+  Scenario: B
+    Given y
+"""
+    formatter = IncrementalFormatter(OPTIONS[0])
+    assert formatter.format_str(content) == format_str(content, options=OPTIONS[0])
+
+    new_content = content.replace("# c2", "# c2 edited")
+    assert formatter.format_str(new_content) == format_str(
+        new_content, options=OPTIONS[0]
+    )
+
+
+def test_incremental_invalid_input():
+    formatter = IncrementalFormatter(OPTIONS[0])
+    expected = formatter.format_str(SRC)
+
+    with pytest.raises(InvalidInput):
+        formatter.format_str(SRC.replace("When c", "When c\n    Unknown"))
+
+    assert formatter.format_str(SRC) == expected
+    assert formatter.format_str(SRC.replace("When c", "When  c")) == expected
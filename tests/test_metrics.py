@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from reformat_gherkin.cli import main
+from reformat_gherkin.metrics import FileMetrics, current_metrics, recording, timed
+from tests.helpers import FORMATTED, UNFORMATTED
+
+
+def read_records(path):
+    *files, summary = [json.loads(line) for line in path.read_text().splitlines()]
+
+    return {record["path"]: record for record in files}, summary
+
+
+@pytest.fixture
+def project(project):
+    # A file which cannot be parsed
+    (project / "c.feature").write_text(
+        "Feature: F\n  Scenario: S\n    Given a step\n      Oops\n"
+    )
+
+    return project
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_metrics_out(runner, project, tmp_path, workers):
+    metrics_out = tmp_path / "metrics.jsonl"
+
+    runner.invoke(
+        main,
+        [str(project), "--no-cache", "--workers", workers]
+        + ["--metrics-out", str(metrics_out)],
+    )
+
+    files, summary = read_records(metrics_out)
+    a, b, c = (
+        files[str(project / name)] for name in ["a.feature", "b.feature", "c.feature"]
+    )
+
+    assert a["type"] == "file"
+    assert a["changed"] is True
+    assert a["cache"] is None
+    assert a["error"] is None
+    assert a["bytes_in"] == len(UNFORMATTED)
+    assert a["bytes_out"] == len(FORMATTED)
+    assert a["lines"] == 4
+    assert a["nodes"] > 0
+    assert set(a["phases"]) == {
+        "decode",
+        "parse",
+        "format",
+        "equivalent",
+        "stable",
+        "write",
+    }
+    assert a["seconds"] == pytest.approx(sum(a["phases"].values()))
+
+    assert b["changed"] is False
+    assert b["bytes_out"] == 0
+    assert "write" not in b["phases"]
+    assert c["error"] is not None
+
+    assert summary["type"] == "summary"
+    assert summary["files"] == 3
+    assert summary["changed"] == 1
+    assert summary["failed"] == 1
+    assert summary["bytes_in"] == sum(record["bytes_in"] for record in files.values())
+    assert summary["phases"]["decode"] > 0
+    seconds = [record["seconds"] for record in summary["slowest"]]
+    assert len(seconds) == 3
+    assert seconds == sorted(seconds, reverse=True)
+
+
+def test_metrics_out_cache(runner, project, tmp_path):
+    (project / "c.feature").unlink()
+    metrics_out = tmp_path / "metrics.jsonl"
+    args = [str(project), "--workers", "1", "--metrics-out", str(metrics_out)]
+
+    runner.invoke(main, args)
+    files, summary = read_records(metrics_out)
+
+    assert {record["cache"] for record in files.values()} == {"miss"}
+    assert summary["cache_misses"] == 2
+
+    runner.invoke(main, args)
+    files, summary = read_records(metrics_out)
+
+    assert {record["cache"] for record in files.values()} == {"hit"}
+    assert all(record["phases"] == {} for record in files.values())
+    assert summary["cache_hits"] == 2
+
+
+def test_metrics_out_fast(runner, project, tmp_path):
+    (project / "c.feature").unlink()
+    metrics_out = tmp_path / "metrics.jsonl"
+
+    runner.invoke(
+        main,
+        [str(project), "--fast", "--no-cache", "--workers", "1"]
+        + ["--metrics-out", str(metrics_out)],
+    )
+    files, _ = read_records(metrics_out)
+    a = files[str(project / "a.feature")]
+
+    assert set(a["phases"]) == {"decode", "format", "write"}
+    assert a["bytes_out"] == len(FORMATTED)
+    assert a["nodes"] > 0
+
+
+def test_timed():
+    with timed("format"):
+        assert current_metrics() is None
+
+    metrics = FileMetrics("a.feature")
+    with recording(metrics):
+        assert current_metrics() is metrics
+        with timed("format"):
+            pass
+        with timed("format"):
+            pass
+
+    assert current_metrics() is None
+    assert list(metrics.phases) == ["format"]
+    assert metrics.seconds == metrics.phases["format"] >= 0
@@ -1,7 +1,17 @@
 import pytest
+from gherkin.parser import Parser
 
+from reformat_gherkin.ast_node import GherkinDocument
 from reformat_gherkin.errors import DeserializeError, InvalidInput
-from reformat_gherkin.parser import parse
+from reformat_gherkin.parser import (
+    StringOnlyTokenScanner,
+    build_document,
+    converter,
+    normalize_line,
+    normalize_text,
+    parse,
+)
+from tests.helpers import GHERKIN_TEST_DATA_DIR
 
 
 def test_invalid_input(invalid_contents):
@@ -18,7 +28,7 @@ def test_valid_input(valid_contents):
 def test_parse_with_exception(mocker, valid_contents):
     exception_message = "exception message"
     mocker.patch(
-        "reformat_gherkin.parser.converter.structure",
+        "reformat_gherkin.parser.build_document",
         side_effect=Exception(exception_message),
     )
 
@@ -27,3 +37,51 @@ def test_parse_with_exception(mocker, valid_contents):
             parse(content)
 
         assert exception_message in str(exc_info.value)
+
+
+def test_build_document(valid_contents):
+    contents = list(valid_contents())
+    contents.extend(
+        path.read_text(encoding="utf-8")
+        for path in GHERKIN_TEST_DATA_DIR.glob("*.feature")
+    )
+
+    for content in contents:
+        parse_result = Parser().parse(StringOnlyTokenScanner(content))
+
+        ast = build_document(parse_result)
+        reference_ast = converter.structure(parse_result, GherkinDocument)
+
+        assert repr(ast) == repr(reference_ast)
+        assert [node.location for node in ast] == [
+            node.location for node in reference_ast
+        ]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "",
+        " ",
+        "Given ",
+        "  # comment  ",
+        "\t@tag\t",
+        "\u3000name\u3000",
+        "a\nb",
+        "  a\n    b  \n",
+        "a\u2028  b",
+        "a\x1c",
+    ],
+)
+def test_normalize_line(value):
+    assert normalize_line(value) == normalize_text(value)
+
+
+def test_parse_first_line():
+    ast = parse("Feature: A\n  Scenario: B\n    Given c\n", first_line=10)
+
+    feature = ast.feature
+    assert feature.location.line == 10
+    scenario = feature.children[0].scenario
+    assert scenario.location.line == 11
+    assert scenario.steps[0].location.line == 12
@@ -0,0 +1,67 @@
+import json
+import pstats
+import tracemalloc
+
+import pytest
+
+from reformat_gherkin.cli import main
+from reformat_gherkin.profiling import tracing_memory
+
+
+@pytest.mark.parametrize("workers, names", [("1", ["main"]), ("2", ["main", "worker"])])
+def test_profile_out(runner, project, tmp_path, workers, names):
+    profile_dir = tmp_path / "profiles"
+
+    result = runner.invoke(
+        main,
+        [str(project), "--check", "--no-cache", "--workers", workers]
+        + ["--profile-out", str(profile_dir)],
+    )
+
+    assert result.exit_code == 1
+    profiles = sorted(profile_dir.iterdir())
+    assert sorted({path.name.split("-")[0] for path in profiles}) == names
+    for path in profiles:
+        pstats.Stats(str(path))
+
+    # The main process reformats the files when there is a single worker
+    functions = {function for _, _, function in pstats.Stats(str(profiles[0])).stats}
+    assert ("reformat_single_file" in functions) is (workers == "1")
+
+
+def test_trace_memory(runner, project, tmp_path):
+    metrics_out = tmp_path / "metrics.jsonl"
+
+    runner.invoke(
+        main,
+        [str(project), "--check", "--no-cache", "--workers", "1", "--trace-memory"]
+        + ["--metrics-out", str(metrics_out)],
+    )
+
+    *files, summary = [
+        json.loads(line) for line in metrics_out.read_text().splitlines()
+    ]
+    for record in files:
+        assert record["memory_peak"] > 0
+        assert 0 < len(record["memory_top"]) <= 10
+        assert {"file", "line", "size", "count"} == set(record["memory_top"][0])
+    assert summary["memory_peak"] == max(record["memory_peak"] for record in files)
+    assert not tracemalloc.is_tracing()
+
+
+def test_trace_memory_without_metrics(runner, project):
+    result = runner.invoke(main, [str(project), "--trace-memory"])
+
+    assert result.exit_code == 1
+    assert "Cannot use --trace-memory without --metrics-out" in result.stderr
+
+
+def test_tracing_memory():
+    with tracing_memory() as trace:
+        data = [bytearray(1000) for _ in range(100)]
+        trace.checkpoint()
+        del data
+
+    assert trace.peak_size >= 100 * 1000
+    assert trace.top_sites[0]["line"] == test_tracing_memory.__code__.co_firstlineno + 2
+    assert not tracemalloc.is_tracing()
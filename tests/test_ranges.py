@@ -0,0 +1,158 @@
+import attr
+import pytest
+
+from reformat_gherkin import core
+from reformat_gherkin.cli import main
+from reformat_gherkin.errors import NothingChanged
+from reformat_gherkin.parser import parse
+from reformat_gherkin.ranges import find_block_starts, parse_line_ranges
+from tests.helpers import OPTIONS, get_content
+
+SRC = """\
+Feature:   Ranges
+
+  Scenario:   First
+    Given   a
+
+  @tag
+  Scenario:   Second
+    Given   b
+  # A comment
+  Rule:   R
+    Scenario:   Third
+      Given   c
+"""
+
+# The comments between the tags belong to the block of the tags
+TAG_COMMENTS = """\
+Feature: F
+
+  Scenario: A
+    Given x
+
+  # c1
+  @t1
+  # c2
+  @t2
+  Scenario: B
+    Given   y
+"""
+
+
+def test_parse_line_ranges():
+    assert parse_line_ranges(["1-2", "5-5"]) == ((1, 2), (5, 5))
+
+
+@pytest.mark.parametrize("value", ["1", "a-b", "3-2", "0-1"])
+def test_parse_line_ranges_invalid(value):
+    with pytest.raises(ValueError):
+        parse_line_ranges([value])
+
+
+def test_find_block_starts():
+    assert find_block_starts(parse(SRC)) == [1, 3, 6, 10, 11]
+
+
+@pytest.mark.parametrize(
+    "line_ranges, expected",
+    [
+        (
+            ((7, 7),),
+            """\
+Feature:   Ranges
+
+  Scenario:   First
+    Given   a
+
+  @tag
+  Scenario: Second
+    Given b
+
+  # A comment
+  Rule:   R
+    Scenario:   Third
+      Given   c
+""",
+        ),
+        (
+            ((1, 1), (12, 20)),
+            """\
+Feature: Ranges
+
+  Scenario:   First
+    Given   a
+
+  @tag
+  Scenario:   Second
+    Given   b
+  # A comment
+  Rule:   R
+    Scenario: Third
+      Given c
+""",
+        ),
+    ],
+)
+def test_format_line_ranges(line_ranges, expected):
+    options = attr.evolve(OPTIONS[0], line_ranges=line_ranges)
+
+    assert core.format_file_contents(SRC, options=options) == expected
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_format_line_ranges_whole_file(valid_contents, options):
+    for content in valid_contents():
+        n_lines = content.count("\n") + 1
+        range_options = attr.evolve(options, line_ranges=((1, n_lines),))
+
+        try:
+            dst = core.format_file_contents(content, options=range_options)
+        except NothingChanged:
+            dst = content
+
+        assert dst == core.format_str(content, options=options)
+
+
+def test_format_line_ranges_each_block():
+    content = get_content("full")
+
+    for start in find_block_starts(parse(content)):
+        options = attr.evolve(OPTIONS[0], line_ranges=((start, start),))
+        try:
+            core.format_file_contents(content, options=options)
+        except NothingChanged:
+            pass
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_format_line_ranges_comment_between_tags(fast):
+    options = attr.evolve(OPTIONS[0], fast=fast, line_ranges=((10, 11),))
+
+    assert core.format_file_contents(TAG_COMMENTS, options=options) == (
+        TAG_COMMENTS.replace("  @t1\n  # c2\n  @t2", "  # c2\n  @t1 @t2").replace(
+            "Given   y", "Given y"
+        )
+    )
+
+
+def test_format_line_ranges_outside():
+    options = attr.evolve(OPTIONS[0], line_ranges=((100, 200),))
+
+    with pytest.raises(NothingChanged):
+        core.format_file_contents(SRC, options=options)
+
+
+def test_cli_line_ranges(runner, sources):
+    src, full_file, _ = sources(contain_invalid=False)
+
+    result = runner.invoke(main, [src, "--line-ranges", "1-2"])
+    assert result.exit_code == 1
+    assert "Cannot use --line-ranges" in result.stderr
+
+    result = runner.invoke(main, [full_file, "--line-ranges", "2"])
+    assert result.exit_code == 1
+    assert "Incorrect --line-ranges format" in result.stderr
+
+    result = runner.invoke(main, [full_file, "--check", "--line-ranges", "1-2"])
+    assert result.exit_code == 1
+    assert result.stderr.startswith("Would reformat")
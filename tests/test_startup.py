@@ -0,0 +1,110 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from tests.helpers import FORMATTED
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The budget for importing the command line, in microseconds. It is several times
+# the usual import time, so that only a real regression, like importing a heavy
+# dependency on start-up again, exceeds it.
+IMPORT_TIME_BUDGET = 300_000
+
+# The modules which are only needed with some options, or to check the
+# reformatted files
+OPTIONAL_MODULES = {
+    "cattr",
+    "yaml",
+    "difflib",
+    "multiprocessing",
+    "concurrent.futures.process",
+    "subprocess",
+    "cProfile",
+    "tracemalloc",
+    "reformat_gherkin.batch",
+    "reformat_gherkin.converter",
+    "reformat_gherkin.ranges",
+    "reformat_gherkin.vcs",
+}
+
+# The modules which are only needed to reformat files
+REFORMAT_MODULES = {
+    "gherkin.parser",
+    "reformat_gherkin.parser",
+    "reformat_gherkin.formatter",
+}
+
+SCRIPT = """\
+import sys
+from reformat_gherkin.cli import main
+main(sys.argv[1:])
+"""
+
+
+def import_times(*args):
+    """
+    Run the command line with `args`, and return the cumulative import time of
+    each module imported, in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT, *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+@pytest.fixture
+def formatted_file(tmp_path):
+    path = tmp_path / "formatted.feature"
+    path.write_text(FORMATTED)
+
+    return path
+
+
+def test_import_time():
+    times = min(
+        (import_times("--version") for _ in range(3)),
+        key=lambda times: times["reformat_gherkin.cli"],
+    )
+
+    assert times["reformat_gherkin.cli"] < IMPORT_TIME_BUDGET
+    assert "reformat_gherkin.core" not in times
+
+
+@pytest.mark.parametrize(
+    "args, imported",
+    [
+        ((), set()),
+        (("--no-cache", "--fast"), REFORMAT_MODULES),
+        (("--no-cache", "--safe"), REFORMAT_MODULES),
+    ],
+)
+def test_imported_modules(formatted_file, args, imported):
+    # The first run records the file in the cache
+    import_times(str(formatted_file), "--check")
+
+    times = import_times(str(formatted_file), "--check", *args)
+
+    assert "reformat_gherkin.core" in times
+    assert set(times) & (OPTIONAL_MODULES | REFORMAT_MODULES) == imported
+
+
+def test_imported_modules_empty_directory(tmp_path):
+    times = import_times(str(tmp_path), "--check")
+
+    assert set(times) & (OPTIONAL_MODULES | REFORMAT_MODULES) == set()
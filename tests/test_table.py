@@ -0,0 +1,25 @@
+from reformat_gherkin.parser import parse
+from reformat_gherkin.table import iter_table_lines, measure_columns
+
+
+def get_rows(table: str):
+    ast = parse(f"Feature: F\n  Scenario: S\n    Given a\n{table}")
+    return ast.feature.children[0].scenario.steps[0].data_table.rows  # type: ignore
+
+
+def test_measure_columns():
+    rows = get_rows("| a | bb |\n| 東京 | c |\n")
+
+    assert [list(widths) for widths in measure_columns(rows)] == [[1, 4], [2, 1]]
+    assert measure_columns(()) == []
+
+
+def test_iter_table_lines():
+    rows = get_rows("|a|bb|\n|  東京 |c|\n| \\| | |\n")
+
+    assert list(iter_table_lines(rows, "  ")) == [
+        "  | a    | bb |",
+        "  | 東京 | c  |",
+        "  | \\|   |    |",
+    ]
+    assert list(iter_table_lines((), "  ")) == []
@@ -1,7 +1,9 @@
 import os
+import re
 from io import BytesIO, StringIO
 
 import pytest
+import wcwidth
 
 from reformat_gherkin import utils
 
@@ -65,6 +67,36 @@ def test_decode_stream():
         assert _newline == newline
 
 
+@pytest.mark.parametrize(
+    "src",
+    [
+        b"",
+        b"\xef\xbb\xbf",
+        b"a",
+        b"a\r",
+        b"\n",
+        b"a\r\nb\n",
+        b"a\nb\r\n",
+        b"a\rb\r\nc\n",
+        b"\xef\xbb\xbfa\r\nb",
+        "Fonctionnalit\u00e9: \u00e9t\u00e9\n".encode(),
+        b"# language: fr\n# coding: latin-1\nFonctionnalit\xe9\n",
+        b"# encoding: utf-8\r\nFeature: F\r\n",
+        b"Feature: coding\nScenario: S\n",
+    ],
+)
+def test_decode_bytes(src):
+    assert utils.decode_bytes(src) == utils._decode_source(src)
+
+
+@pytest.mark.parametrize("src", [b"\xff\n", b"Feature: F\n\xff\n"])
+def test_decode_bytes_error(src):
+    with pytest.raises((SyntaxError, UnicodeDecodeError)) as decode_error:
+        utils._decode_source(src)
+    with pytest.raises(decode_error.type, match=re.escape(str(decode_error.value))):
+        utils.decode_bytes(src)
+
+
 @pytest.mark.parametrize(
     ["text", "width"],
     [
@@ -85,3 +117,42 @@ def test_decode_stream():
 )
 def test_get_display_width(text, width):
     assert utils.get_display_width(text) == width
+
+
+def test_get_display_width_cache(mocker):
+    wcswidth = mocker.spy(wcwidth, "wcswidth")
+    mocker.patch.object(utils, "_display_widths", utils.BoundedCache(1))
+
+    # The width of printable ASCII strings is not cached
+    assert utils.get_display_width("abc") == 3
+    wcswidth.assert_not_called()
+
+    assert utils.get_display_width("あ") == 2
+    assert utils.get_display_width("あ") == 2
+    assert utils.get_display_width("い") == 2
+    assert wcswidth.call_count == 2
+
+    assert utils.get_display_width_cache_stats() == utils.CacheStats(
+        hits=1, misses=2, size=1, max_size=1
+    )
+
+
+@pytest.mark.parametrize("text", ["", "\n", "a", "a\n", "a\nb", "\na\n\nb\n\n"])
+def test_iter_lines(text):
+    assert list(utils.iter_lines(text)) == text.split("\n")
+
+
+def test_bounded_cache():
+    cache = utils.BoundedCache(2)
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    # "b" is the least recently used item
+    cache.put("c", 3)
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats() == utils.CacheStats(hits=3, misses=1, size=2, max_size=2)
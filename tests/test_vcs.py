@@ -0,0 +1,102 @@
+import shutil
+import subprocess
+
+import pytest
+
+from reformat_gherkin.cli import main
+from reformat_gherkin.core import find_sources
+from reformat_gherkin.errors import VCSError
+from reformat_gherkin.vcs import find_changed_sources
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="requires git")
+
+CONTENT = "Feature: F\n"
+
+
+def git(repo, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _repo = tmp_path / "repo"
+    (_repo / "features").mkdir(parents=True)
+    for name in ["modified", "staged", "unchanged", "deleted"]:
+        (_repo / "features" / f"{name}.feature").write_text(CONTENT)
+    (_repo / "other.feature").write_text(CONTENT)
+
+    git(_repo, "init", "-q")
+    git(_repo, "add", ".")
+    git(_repo, "commit", "-q", "-m", "Initial commit")
+
+    features = _repo / "features"
+    (features / "modified.feature").write_text(CONTENT + "\n")
+    (features / "staged.feature").write_text(CONTENT + "\n")
+    (features / "untracked.feature").write_text(CONTENT)
+    (features / "untracked.txt").write_text(CONTENT)
+    (features / "deleted.feature").unlink()
+    (_repo / "other.feature").write_text(CONTENT + "\n")
+    git(_repo, "add", "features/staged.feature")
+
+    return _repo
+
+
+def test_find_changed_sources(repo):
+    features = repo / "features"
+
+    assert find_changed_sources(
+        [str(features)], changed_since="HEAD", staged=False
+    ) == {
+        features / "modified.feature",
+        features / "staged.feature",
+        features / "untracked.feature",
+    }
+    assert find_changed_sources([str(features)], changed_since=None, staged=True) == {
+        features / "staged.feature"
+    }
+    # An explicitly given file is kept whatever its extension
+    assert find_changed_sources(
+        [str(features / "untracked.txt"), str(repo / "other.feature")],
+        changed_since="HEAD",
+        staged=False,
+    ) == {features / "untracked.txt", repo / "other.feature"}
+
+
+def test_find_changed_sources_errors(repo, tmp_path):
+    with pytest.raises(VCSError, match="git diff failed"):
+        find_changed_sources([str(repo)], changed_since="unknown-ref", staged=False)
+
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    with pytest.raises(VCSError, match="git rev-parse failed"):
+        find_changed_sources([str(outside)], changed_since="HEAD", staged=False)
+
+
+def test_find_sources_falls_back_to_all_files(repo, mocker):
+    err = mocker.patch("reformat_gherkin.core.err")
+    mocker.patch("reformat_gherkin.vcs.subprocess.run", side_effect=FileNotFoundError)
+
+    assert len(find_sources([str(repo)], changed_since="HEAD")) == 5
+    assert "Reformatting all the files instead." in err.call_args[0][0]
+
+
+def test_cli_changed_since(runner, repo):
+    result = runner.invoke(
+        main, [str(repo), "--check", "--no-cache", "--changed-since", "HEAD"]
+    )
+
+    assert result.exit_code == 1
+    assert result.stderr.endswith(
+        "3 files would be reformatted, 1 file would be left unchanged.\n"
+    )
+
+    result = runner.invoke(main, [str(repo), "--check", "--no-cache", "--staged"])
+
+    assert result.exit_code == 1
+    assert result.stderr.startswith(f"Would reformat {repo}/features/staged.feature")
+    assert result.stderr.endswith("1 file would be reformatted.\n")
@@ -0,0 +1,128 @@
+import os
+import stat
+
+import pytest
+
+from reformat_gherkin.cli import main
+from reformat_gherkin.writeback import atomic_write, sync_files, write_file
+from tests.helpers import FORMATTED
+
+
+def get_mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_atomic_write(tmp_path):
+    path = tmp_path / "a.feature"
+    path.write_bytes(b"old")
+    path.chmod(0o640)
+    link = tmp_path / "link.feature"
+    link.symlink_to(path)
+
+    with atomic_write(link) as stream:
+        stream.write(b"new")
+
+    assert link.is_symlink()
+    assert path.read_bytes() == b"new"
+    assert get_mode(path) == 0o640
+    assert sorted(tmp_path.iterdir()) == [path, link]
+
+
+def test_atomic_write_error(tmp_path):
+    path = tmp_path / "a.feature"
+    path.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as stream:
+            stream.write(b"new")
+            raise RuntimeError
+
+    assert path.read_bytes() == b"old"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_atomic_write_new_file(tmp_path):
+    path = tmp_path / "a.feature"
+    umask = os.umask(0o022)
+    try:
+        with atomic_write(path) as stream:
+            stream.write(b"new")
+    finally:
+        os.umask(umask)
+
+    assert path.read_bytes() == b"new"
+    assert get_mode(path) == 0o644
+
+
+@pytest.mark.parametrize("current", [None, b"same"])
+def test_write_file_unchanged(tmp_path, current):
+    path = tmp_path / "a.feature"
+    path.write_bytes(b"same")
+    os.utime(path, ns=(0, 0))
+
+    assert write_file(path, b"same", current=current) is False
+    assert path.stat().st_mtime_ns == 0
+
+
+@pytest.mark.parametrize("data", [b"else", b"different"])
+def test_write_file_changed(tmp_path, data):
+    path = tmp_path / "a.feature"
+    path.write_bytes(b"same")
+
+    assert write_file(path, data) is True
+    assert path.read_bytes() == data
+
+
+def test_sync_files(tmp_path, mocker):
+    fsync = mocker.patch("os.fsync")
+    open_ = mocker.spy(os, "open")
+    directory = tmp_path / "dir"
+    directory.mkdir()
+    paths = [directory / "a.feature", directory / "b.feature"]
+    for path in paths:
+        path.write_bytes(b"")
+
+    sync_files(paths)
+
+    # Each file, and then their directory once
+    assert fsync.call_count == 3
+    # The files are opened for writing, which Windows needs to flush them
+    access_mode = os.O_RDONLY | os.O_WRONLY | os.O_RDWR
+    assert [flags & access_mode for (_, flags), _ in open_.call_args_list] == [
+        os.O_RDWR,
+        os.O_RDWR,
+        os.O_RDONLY,
+    ]
+
+
+def test_reformat_in_place(runner, project):
+    (project / "a.feature").chmod(0o600)
+
+    result = runner.invoke(main, [str(project), "--no-cache"])
+
+    assert result.exit_code == 0
+    assert (project / "a.feature").read_text() == FORMATTED
+    assert get_mode(project / "a.feature") == 0o600
+    assert sorted(path.name for path in project.iterdir()) == [
+        "a.feature",
+        "b.feature",
+    ]
+
+
+def test_fsync(runner, project, mocker):
+    sync_files = mocker.patch("reformat_gherkin.core.sync_files")
+
+    result = runner.invoke(main, [str(project), "--no-cache", "--fsync"])
+
+    assert result.exit_code == 0
+    (paths,), _ = sync_files.call_args
+    assert list(paths) == [project / "a.feature"]
+
+
+def test_no_fsync(runner, project, mocker):
+    sync_files = mocker.patch("reformat_gherkin.core.sync_files")
+
+    runner.invoke(main, [str(project), "--no-cache"])
+    runner.invoke(main, [str(project), "--no-cache", "--check", "--fsync"])
+
+    sync_files.assert_not_called()